@@ -14,20 +14,24 @@ from typing import Any
 
 from fastapi import Body, Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi import APIRouter
 
+from ..core import cache as cache_mod
+from ..core import capture as capture_mod
+from ..core import circuit as circuit_mod
+from ..core import concurrency as concurrency_mod
+from ..core import hedge as hedge_mod
 from ..core import loader
-from ..core.command_gen import inject_commands_if_changed
-from ..core.tool_gen import inject_llm_tools_if_changed
+from ..core import metrics as metrics_mod
+from ..core import trace as trace_mod
 from ..core.log_helper import logger
 from ..runtime import scheduler as scheduler_mod
 
 _ALLOWED_FILES = frozenset({"config.json", "apis.json", "schedules.json", "groups.json", "auth.json"})
 
 _PROJECT_DATA_DIR = Path(__file__).resolve().parent.parent / "data"
-_MAIN_PY_PATH = Path(__file__).resolve().parent.parent / "main.py"
 
 # Brute-force protection: lock out an IP after N failed password attempts
 _AUTH_FAIL_MAX = 5
@@ -144,6 +148,16 @@ def create_app(data_dir: Path | None = None) -> FastAPI:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to read {path.name}: {e}") from e
 
+    def _notify_apis_changed(request: Request) -> None:
+        """If the plugin registered on_apis_changed, let it re-sync standalone commands / LLM tools in process."""
+        callback = getattr(request.app.state, "on_apis_changed", None)
+        if callback is None:
+            return
+        try:
+            callback()
+        except Exception:
+            logger.exception("Failed to sync commands/LLM tools after save")
+
     def _trigger_plugin_reload(request: Request) -> None:
         """If reload_trigger is set, schedule a plugin self-reload on the main loop (non-blocking).
         Delay ~3s before reload so the response can be sent before the process exits.
@@ -207,7 +221,7 @@ def create_app(data_dir: Path | None = None) -> FastAPI:
         pwd_plain = pwd.strip()
         raw["api_pwd_hash"] = _password_hash(pwd_plain)
         _write_json_atomic(path, raw)
-        loader.invalidate_config(data_dir)
+        loader.refresh(data_dir, ["config"])
         request.app.state.config_password = raw["api_pwd_hash"]
         request.app.state.initialized = True
         return {"status": "ok"}
@@ -256,15 +270,13 @@ def create_app(data_dir: Path | None = None) -> FastAPI:
             raise HTTPException(status_code=400, detail="Invalid path")
         if not isinstance(body, dict):
             raise HTTPException(status_code=400, detail="Body must be a JSON object")
+        old_port = loader.get_api_port(data_dir)
         _write_json_atomic(path, body)
-        loader.invalidate_config(data_dir)
-        try:
-            apis = loader.load_apis(data_dir)
-            inject_commands_if_changed(_MAIN_PY_PATH, apis)
-            inject_llm_tools_if_changed(_MAIN_PY_PATH, apis)
+        loader.refresh(data_dir, ["config"])
+        _notify_apis_changed(request)
+        # the config server itself only moves to a new port on plugin reload
+        if loader.get_api_port(data_dir) != old_port:
             _trigger_plugin_reload(request)
-        except Exception:
-            logger.exception("Failed to inject commands/LLM tools into main after PUT config")
         return {"status": "ok"}
 
     @router.get("/apis")
@@ -288,26 +300,9 @@ def create_app(data_dir: Path | None = None) -> FastAPI:
         path = _path_for("apis.json", data_dir)
         if not _ensure_inside(data_dir, path):
             raise HTTPException(status_code=400, detail="Invalid path")
-        old_apis = loader.load_apis(data_dir)
         _write_json_atomic(path, {"apis": body["apis"]})
-        loader.invalidate_apis(data_dir)
-        try:
-            cmd_changed = inject_commands_if_changed(_MAIN_PY_PATH, body["apis"])
-            llm_changed = inject_llm_tools_if_changed(_MAIN_PY_PATH, body["apis"])
-            old_llm = set(
-                (a.get("id") or a.get("command") or "")
-                for a in old_apis
-                if a.get("as_tool") is True
-            )
-            new_llm = set(
-                (a.get("id") or a.get("command") or "")
-                for a in body["apis"]
-                if a.get("as_tool") is True
-            )
-            if cmd_changed or llm_changed or old_llm != new_llm:
-                _trigger_plugin_reload(request)
-        except Exception:
-            logger.exception("Failed to inject commands into main after PUT apis")
+        loader.refresh(data_dir, ["apis"])
+        _notify_apis_changed(request)
         return {"status": "ok"}
 
     @router.get("/schedules")
@@ -331,6 +326,7 @@ def create_app(data_dir: Path | None = None) -> FastAPI:
         if not _ensure_inside(data_dir, path):
             raise HTTPException(status_code=400, detail="Invalid path")
         _write_json_atomic(path, {"schedules": body["schedules"]})
+        loader.refresh(data_dir, ["schedules"])
         # Hot reload: refresh scheduled tasks after save
         try:
             scheduler_mod.reload_schedules(data_dir)
@@ -357,7 +353,7 @@ def create_app(data_dir: Path | None = None) -> FastAPI:
         if not _ensure_inside(data_dir, path):
             raise HTTPException(status_code=400, detail="Invalid path")
         _write_json_atomic(path, body)
-        loader.invalidate_groups(data_dir)
+        loader.refresh(data_dir, ["groups"])
         return {"status": "ok"}
 
     @router.get("/auth")
@@ -379,9 +375,68 @@ def create_app(data_dir: Path | None = None) -> FastAPI:
         if not _ensure_inside(data_dir, path):
             raise HTTPException(status_code=400, detail="Invalid path")
         _write_json_atomic(path, body)
-        loader.invalidate_auth(data_dir)
+        loader.refresh(data_dir, ["auth"])
         return {"status": "ok"}
 
+    @router.get("/cache/stats")
+    def get_cache_stats(
+        _: None = Depends(require_password),
+    ) -> dict[str, Any]:
+        """Per-API response cache counters (hits, misses, entries, bytes)."""
+        return cache_mod.stats()
+
+    @router.get("/capture/stats")
+    def get_capture_stats(
+        _: None = Depends(require_password),
+    ) -> dict[str, Any]:
+        """Capture files in use and their counters (recorded, skipped, replayed, misses)."""
+        return capture_mod.stats()
+
+    @router.get("/concurrency/stats")
+    def get_concurrency_stats(
+        _: None = Depends(require_password),
+    ) -> dict[str, Any]:
+        """Per-API / per-host limiter state: in-flight, queue depth, wait times, rejections."""
+        return concurrency_mod.stats()
+
+    @router.get("/circuit/stats")
+    def get_circuit_stats(
+        _: None = Depends(require_password),
+    ) -> dict[str, Any]:
+        """Circuit breaker state per API / upstream host."""
+        return circuit_mod.stats()
+
+    @router.get("/hedge/stats")
+    def get_hedge_stats(
+        _: None = Depends(require_password),
+    ) -> dict[str, Any]:
+        """Hedged request counters per API (fired, won, skipped)."""
+        return hedge_mod.stats()
+
+    @router.get("/metrics")
+    def get_metrics(
+        format: str = "json",
+        _: None = Depends(require_password),
+    ) -> Any:
+        """Per-API call/error counters and latency/size histograms; format=prometheus for the text format."""
+        if format == "prometheus":
+            return PlainTextResponse(
+                metrics_mod.prometheus_text(), media_type="text/plain; version=0.0.4; charset=utf-8"
+            )
+        return metrics_mod.stats()
+
+    @router.get("/trace/slow")
+    def get_slow_calls(
+        data_dir: Path = Depends(get_data_dir),
+        _: None = Depends(require_password),
+    ) -> dict[str, Any]:
+        """Recent calls slower than config.json slow_call_ms, newest first, with per-phase spans."""
+        return {
+            "slow_call_ms": loader.load_config(data_dir)["slow_call_seconds"] * 1000,
+            "kept": trace_mod.SLOW_CALLS_KEPT,
+            "calls": trace_mod.slow_calls(),
+        }
+
     app.include_router(router, prefix="/api")
 
     dist_dir = Path(__file__).resolve().parent.parent / "frontend" / "dist"
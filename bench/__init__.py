@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+ApiDog benchmarks: local stub upstream, synthetic data dirs, a concurrent core.run driver and
+micro-benchmarks. Run from the repository root: python -m bench --help
+
+The plugin's packages use relative imports across the repository root (runtime -> ..core), so the root is
+registered here as the package "apidog", the way AstrBot imports it as a plugin package.
+"""
+
+from __future__ import annotations
+
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "apidog"
+
+if PACKAGE not in sys.modules:
+    _pkg = types.ModuleType(PACKAGE)
+    _pkg.__path__ = [str(ROOT)]
+    sys.modules[PACKAGE] = _pkg
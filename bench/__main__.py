@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+python -m bench micro|load|all [--out FILE]   run benchmarks, write JSON (stdout by default)
+python -m bench chaos [--only a,b] [--out FILE]  fault-injection scenarios, exit 1 when a budget is blown
+python -m bench compare OLD.json NEW.json     compare two result files, exit 1 on regressions
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Any
+
+from . import ROOT
+
+
+def _meta() -> dict[str, Any]:
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        rev = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_rev": rev or None,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+    }
+
+
+def _ints(raw: str) -> list[int]:
+    return [int(x) for x in raw.split(",") if x.strip()]
+
+
+# metric name -> True when higher is better; everything else compared is lower-is-better
+_COMPARED = {
+    "ns_per_op": False,
+    "throughput_rps": True,
+    "p50": False,
+    "p95": False,
+    "p99": False,
+    "cpu_ms_per_request": False,
+}
+
+
+def _flatten(results: dict[str, Any]) -> dict[str, tuple[float, bool]]:
+    """{"micro.parse_args.ns_per_op": (value, higher_is_better), "load.apis=100.latency_ms.p99": ...}"""
+    out: dict[str, tuple[float, bool]] = {}
+
+    def walk(prefix: str, node: Any) -> None:
+        if isinstance(node, dict):
+            for k, v in node.items():
+                walk(f"{prefix}.{k}" if prefix else str(k), v)
+        elif isinstance(node, (int, float)) and not isinstance(node, bool):
+            name = prefix.rsplit(".", 1)[-1]
+            if name in _COMPARED:
+                out[prefix] = (float(node), _COMPARED[name])
+
+    walk("micro", results.get("micro") or {})
+    for scenario in results.get("load") or []:
+        walk(f"load.apis={scenario.get('apis')}", scenario)
+    return out
+
+
+def compare(old: dict[str, Any], new: dict[str, Any], threshold: float) -> int:
+    """Print per-metric change; return the number of metrics that got worse by more than threshold."""
+    a, b = _flatten(old), _flatten(new)
+    regressions = 0
+    for key in sorted(a.keys() & b.keys()):
+        (va, higher), (vb, _) = a[key], b[key]
+        if va == 0:
+            continue
+        change = (vb - va) / va
+        worse = -change if higher else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif worse < -threshold:
+            flag = "  improved"
+        print(f"{key:<55} {va:>12.2f} -> {vb:>12.2f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("micro", "load", "all"):
+        p = sub.add_parser(name)
+        p.add_argument("--out", help="write JSON here instead of stdout")
+        p.add_argument("--group-size", type=int, default=1000, help="members per group in groups.json")
+        if name in ("load", "all"):
+            p.add_argument("--scales", type=_ints, default=[10, 100, 1000, 5000], help="API counts, e.g. 10,100")
+            p.add_argument("--requests", type=int, default=2000)
+            p.add_argument("--concurrency", type=int, default=64)
+            p.add_argument("--size", type=int, default=512, help="upstream payload bytes")
+            p.add_argument("--latency-ms", type=float, default=0.0, help="upstream latency")
+            p.add_argument("--seed", type=int, default=1)
+        if name in ("micro", "all"):
+            p.add_argument("--only", type=lambda s: set(s.split(",")), help="micro cases to run, comma separated")
+    p = sub.add_parser("chaos")
+    p.add_argument("--out", help="write JSON here instead of stdout")
+    p.add_argument("--only", type=lambda s: set(s.split(",")), help="scenarios to run, comma separated")
+    p.add_argument("--seed", type=int, default=1, help="fault selection seed of the upstream")
+    p = sub.add_parser("compare")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    a = parser.parse_args(argv)
+
+    if a.cmd == "compare":
+        with open(a.old, encoding="utf-8") as f_old, open(a.new, encoding="utf-8") as f_new:
+            return 1 if compare(json.load(f_old), json.load(f_new), a.threshold) else 0
+
+    results: dict[str, Any] = {"meta": _meta()}
+    status = 0
+    if a.cmd == "chaos":
+        from . import chaos
+
+        results["chaos"] = chaos.run(a.only, a.seed)
+        status = 0 if all(r["passed"] for r in results["chaos"]) else 1
+    if a.cmd in ("micro", "all"):
+        from . import micro
+
+        results["micro"] = micro.run(a.group_size, a.only)
+    if a.cmd in ("load", "all"):
+        from . import load
+
+        results["load"] = load.run(
+            a.scales, a.requests, a.concurrency, a.group_size, a.size, a.latency_ms, a.seed
+        )
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if a.out:
+        with open(a.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
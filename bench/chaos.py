@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Chaos scenarios: replay a traffic mix through core.run and the scheduler's job runner against the
+fault-injecting stub (bench.faults, in a child process), and check each scenario's latency and error budget.
+Everything runs on localhost. python -m bench chaos [--only name,...] [--out FILE]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from . import load
+from .stub import spawn
+
+from apidog import core
+from apidog.core import metrics
+from apidog.core.types import CallResult
+from apidog.runtime import scheduler
+
+# Each scenario: the upstream fault mix (bench.faults query parameters), API / config.json overrides for the
+# resilience settings under test, the traffic shape, and the budget it must stay within.
+SCENARIOS: list[dict[str, Any]] = [
+    {
+        "name": "baseline",
+        "description": "no faults; sanity check of the harness itself",
+        "upstream": {},
+        "api": {},
+        "budget": {"p99_ms": 1000, "error_rate": 0.0},
+    },
+    {
+        "name": "latency_spikes_hedged",
+        "description": "5% of responses take 3s; hedging after 200ms hides them",
+        "upstream": {"fault": "spike:0.05", "spike_ms": "3000"},
+        "api": {"hedge": {"after_ms": 200, "max": 1}, "timeout_seconds": 5},
+        "budget": {"p99_ms": 1000, "error_rate": 0.0},
+    },
+    {
+        "name": "connection_resets",
+        "description": "20% of connections reset; only timeouts and retry_statuses are retried today, "
+        "so resets surface as errors (tighten error_rate once transport errors are retried)",
+        "upstream": {"fault": "reset:0.2"},
+        "api": {"retry": {"max_attempts": 2, "backoff_seconds": 0.02, "max_backoff_seconds": 0.1}},
+        "budget": {"p99_ms": 1000, "error_rate": 0.25},
+    },
+    {
+        "name": "rate_limited_429",
+        "description": "30% answered 429 with Retry-After: 1; retries wait as told",
+        "upstream": {"fault": "429:0.3", "retry_after": "1"},
+        "api": {"retry": {"max_attempts": 2, "backoff_seconds": 0.05, "max_backoff_seconds": 2}},
+        "budget": {"p99_ms": 2600, "error_rate": 0.06},
+    },
+    {
+        "name": "slow_drip",
+        "description": "10% of bodies trickle in 10 chunks 150ms apart; the read timeout is per chunk, so they finish",
+        "upstream": {"fault": "drip:0.1", "drip_ms": "150"},
+        "api": {"timeout_seconds": 1},
+        "budget": {"p99_ms": 2500, "error_rate": 0.0},
+    },
+    {
+        "name": "truncated_media",
+        "description": "10% of media bodies cut off mid-stream; these are not retried and surface as errors",
+        "upstream": {"fault": "truncate:0.1", "media": "png", "size": "65536"},
+        "api": {"response_type": "image", "response_media_from": "body"},
+        "budget": {"p99_ms": 1000, "error_rate": 0.2},
+    },
+    {
+        "name": "half_open",
+        "description": "5% of requests never answered; a 1s timeout plus one retry bounds the wait",
+        "upstream": {"fault": "halfopen:0.05", "hang_s": "10"},
+        "api": {"timeout_seconds": 1, "retry": {"max_attempts": 1, "backoff_seconds": 0.05}},
+        "budget": {"p99_ms": 2500, "error_rate": 0.01},
+    },
+    {
+        "name": "cascading_timeouts",
+        "description": "spikes, hangs and resets together at high concurrency with a scheduler burst; "
+        "a retry deadline caps every call",
+        "upstream": {"fault": "spike:0.1,halfopen:0.05,reset:0.05", "spike_ms": "4000", "hang_s": "10"},
+        "api": {
+            "timeout_seconds": 1.5,
+            "retry": {"max_attempts": 3, "backoff_seconds": 0.05, "deadline_seconds": 3},
+            "max_concurrency": 48,
+            "max_queue": 500,
+            "queue_timeout_seconds": 3,
+        },
+        "calls": 800,
+        "concurrency": 128,
+        "scheduled": 100,
+        "budget": {"p99_ms": 4000, "error_rate": 0.15},
+    },
+]
+
+DEFAULT_CALLS = 400
+DEFAULT_CONCURRENCY = 32
+DEFAULT_SCHEDULED = 20
+
+
+def write_scenario(data_dir: Path, base_url: str, scenario: dict[str, Any]) -> None:
+    params = {"q": "{{args.0}}", **scenario["upstream"]}
+    api = {"id": "chaos", "command": "混沌", "url": f"{base_url}/chaos", "params": params, **scenario["api"]}
+    files = {
+        "apis.json": {"apis": [api]},
+        # the scheduler calls as user "scheduler"; the chaos API has no group restriction
+        "groups.json": {},
+        "config.json": {"timeout_seconds": 10, "retry": False, "slow_call_ms": 60_000},
+    }
+    for name, content in files.items():
+        (data_dir / name).write_text(json.dumps(content, ensure_ascii=False), encoding="utf-8")
+
+
+async def _scheduled_burst(data_dir: Path, count: int) -> dict[str, Any]:
+    """count scheduled jobs firing at once, through the scheduler's own job runner."""
+    latencies: list[float] = []
+    failures = 0
+
+    async def job(i: int) -> None:
+        nonlocal failures
+        delivered: list[CallResult] = []
+
+        async def send(_: str, result: CallResult) -> None:
+            delivered.append(result)
+
+        t = time.perf_counter()
+        await scheduler._run_scheduled(data_dir, f"chaos job{i}", "chaos", send)
+        latencies.append(time.perf_counter() - t)
+        if not delivered or not delivered[0].success:
+            failures += 1
+
+    await asyncio.gather(*(job(i) for i in range(count)))
+    return {"runs": count, "failures": failures, "latency_ms": load.latency_summary(latencies)}
+
+
+async def run_scenario(base_url: str, scenario: dict[str, Any]) -> dict[str, Any]:
+    calls = scenario.get("calls", DEFAULT_CALLS)
+    concurrency = scenario.get("concurrency", DEFAULT_CONCURRENCY)
+    scheduled = scenario.get("scheduled", DEFAULT_SCHEDULED)
+    metrics.reset()
+    with tempfile.TemporaryDirectory(prefix="apidog_chaos_") as tmp:
+        data_dir = Path(tmp)
+        write_scenario(data_dir, base_url, scenario)
+        context = core.CallContext("chaos_user")
+        traffic = [f"chaos u{i}" for i in range(calls)]
+        user, sched = await asyncio.gather(
+            load.drive(data_dir, traffic, concurrency, context),
+            _scheduled_burst(data_dir, scheduled),
+        )
+        await core.close_clients()
+    stats = metrics.stats().get("chaos", {})
+    error_rate = (sum(user["errors"].values()) + sched["failures"]) / max(1, calls + scheduled)
+    budget = scenario["budget"]
+    violations = []
+    if user["latency_ms"]["p99"] > budget["p99_ms"]:
+        violations.append(f"p99 {user['latency_ms']['p99']}ms > {budget['p99_ms']}ms")
+    if sched["latency_ms"]["p99"] > budget["p99_ms"]:
+        violations.append(f"scheduler p99 {sched['latency_ms']['p99']}ms > {budget['p99_ms']}ms")
+    if error_rate > budget["error_rate"]:
+        violations.append(f"error rate {error_rate:.3f} > {budget['error_rate']}")
+    return {
+        "name": scenario["name"],
+        "description": scenario["description"],
+        "budget": budget,
+        "passed": not violations,
+        "violations": violations,
+        "error_rate": round(error_rate, 4),
+        "user": user,
+        "scheduler": sched,
+        "retries": stats.get("retries", 0),
+        "errors_by_type": stats.get("errors", {}),
+    }
+
+
+def run(only: set[str] | None = None, seed: int = 1) -> list[dict[str, Any]]:
+    # injected failures are counted in the results; their tracebacks would only bury the summary
+    logging.getLogger("apidog").setLevel(logging.CRITICAL)
+    proc, base_url = spawn("bench.faults", "--seed", str(seed))
+    try:
+        out = []
+        for scenario in SCENARIOS:
+            if only and scenario["name"] not in only:
+                continue
+            r = asyncio.run(run_scenario(base_url, scenario))
+            status = "PASS" if r["passed"] else "FAIL " + "; ".join(r["violations"])
+            print(
+                f"{r['name']:<24} p50={r['user']['latency_ms']['p50']}ms p99={r['user']['latency_ms']['p99']}ms "
+                f"errors={r['error_rate']:.3f} retries={r['retries']}  {status}",
+                file=sys.stderr,
+            )
+            out.append(r)
+        return out
+    finally:
+        proc.terminate()
+        proc.wait(5)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Fault-injecting stub upstream: the bench stub plus faults picked per request from the query string.
+
+fault=name[:probability][,name[:probability]...] picks at most one fault per request (probabilities are
+cumulative, the rest is served normally). Faults:
+  spike     sleep spike_ms (default 2000) before a normal response
+  reset     read the request, then abort the connection with a TCP RST
+  drip      normal headers, body in drip_chunks (default 10) pieces drip_ms (default 200) apart
+  429       429 Too Many Requests with Retry-After: retry_after (default 1)
+  truncate  200 media response that closes after half of the declared Content-Length
+  halfopen  read the request and never answer (for hang_s, default 30, or until shutdown)
+Run standalone with python -m bench.faults [--seed N]; it prints the bound port like bench.stub.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import socket
+import struct
+import threading
+import time
+
+from .stub import StubHandler, StubServer, add_arguments, media_payload, query_num, serve
+
+FAULTS = ("spike", "reset", "drip", "429", "truncate", "halfopen")
+
+
+def parse_fault_spec(spec: str | None) -> list[tuple[str, float]]:
+    """"reset:0.1,429:0.2" -> [("reset", 0.1), ("429", 0.2)]; a name without probability always applies."""
+    out: list[tuple[str, float]] = []
+    for part in (spec or "").split(","):
+        name, _, prob = part.strip().partition(":")
+        if name in FAULTS:
+            out.append((name, min(max(query_num(prob or None, 1.0), 0.0), 1.0)))
+    return out
+
+
+class FaultServer(StubServer):
+    """StubServer with a seeded RNG for fault selection and per-fault hit counters."""
+
+    def __init__(self, address: tuple[str, int] = ("127.0.0.1", 0), seed: int = 1, **defaults) -> None:
+        super().__init__(address, handler=FaultHandler, **defaults)
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.faults: dict[str, int] = {}
+
+    def pick(self, spec: list[tuple[str, float]]) -> str | None:
+        with self.rng_lock:
+            r = self.rng.random()
+            for name, prob in spec:
+                if r < prob:
+                    self.faults[name] = self.faults.get(name, 0) + 1
+                    return name
+                r -= prob
+        return None
+
+    def shutdown(self) -> None:
+        self.stopping.set()
+        super().shutdown()
+
+
+class FaultHandler(StubHandler):
+    server: FaultServer
+
+    def serve(self, q: dict[str, str]) -> None:
+        fault = self.server.pick(parse_fault_spec(q.get("fault")))
+        if fault is None:
+            super().serve(q)
+            return
+        self.server.count_hit()
+        getattr(self, "fault_" + fault)(q)
+
+    def _abort(self) -> None:
+        """Close with SO_LINGER 0 so the peer gets a RST instead of an orderly FIN."""
+        self.close_connection = True
+        try:
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            self.connection.close()
+        except OSError:
+            pass
+
+    def fault_spike(self, q: dict[str, str]) -> None:
+        time.sleep(query_num(q.get("spike_ms"), 2000) / 1000.0)
+        super().serve({k: v for k, v in q.items() if k != "fault"})
+
+    def fault_reset(self, q: dict[str, str]) -> None:
+        self._abort()
+
+    def fault_drip(self, q: dict[str, str]) -> None:
+        self.delay(q)
+        body = b'{"code": 0, "data": {"items": [{"id": 1, "name": "drip"}], "text": "' + b"x" * 1024 + b'"}}'
+        chunks = max(1, int(query_num(q.get("drip_chunks"), 10)))
+        pause = query_num(q.get("drip_ms"), 200) / 1000.0
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        step = -(-len(body) // chunks)
+        for i in range(0, len(body), step):
+            self.wfile.write(body[i : i + step])
+            self.wfile.flush()
+            time.sleep(pause)
+
+    def fault_429(self, q: dict[str, str]) -> None:
+        self.send_response(429)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Retry-After", q.get("retry_after") or "1")
+        body = b'{"message": "too many requests"}'
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def fault_truncate(self, q: dict[str, str]) -> None:
+        content_type, body = media_payload(q.get("media") or "png", int(query_num(q.get("size"), 64 * 1024)))
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body[: len(body) // 2])
+        self.wfile.flush()
+        self.close_connection = True
+
+    def fault_halfopen(self, q: dict[str, str]) -> None:
+        self.server.stopping.wait(query_num(q.get("hang_s"), 30))
+        self._abort()
+
+
+def start(seed: int = 1, **defaults) -> FaultServer:
+    """Fault server on a free localhost port, served from a daemon thread."""
+    server = FaultServer(seed=seed, **defaults)
+    threading.Thread(target=server.serve_forever, name="apidog-bench-faults", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--seed", type=int, default=1)
+    a = parser.parse_args()
+    serve(FaultServer(("127.0.0.1", a.port), a.seed, latency_ms=a.latency_ms, jitter_ms=a.jitter_ms, size=a.size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Concurrent core.run driver: throughput, latency percentiles, CPU time and peak RSS per scenario."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Sequence
+
+from . import synth
+from .stub import spawn
+
+from apidog import core
+from apidog.core import loader
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+BENCH_CONFIG = {"bench_token": "bench"}
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process so far (monotonic over the process lifetime)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending sequence."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def latency_summary(latencies: list[float]) -> dict[str, float]:
+    """Milliseconds: p50/p95/p99/max/mean of latencies given in seconds."""
+    s = sorted(latencies)
+    ms = 1000.0
+    return {
+        "p50": round(percentile(s, 50) * ms, 3),
+        "p95": round(percentile(s, 95) * ms, 3),
+        "p99": round(percentile(s, 99) * ms, 3),
+        "max": round((s[-1] if s else 0.0) * ms, 3),
+        "mean": round((sum(s) / len(s) if s else 0.0) * ms, 3),
+    }
+
+
+async def drive(
+    data_dir: Path,
+    calls: Sequence[str],
+    concurrency: int,
+    context: core.CallContext,
+    extra_config: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Run calls through core.run with concurrency workers; returns throughput, latency, errors and CPU time."""
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    pending = iter(calls)
+
+    async def worker() -> None:
+        for raw in pending:
+            t = time.perf_counter()
+            result = await core.run(data_dir, raw, context, extra_config)
+            latencies.append(time.perf_counter() - t)
+            if not result.success:
+                key = (result.message or "error")[:40]
+                errors[key] = errors.get(key, 0) + 1
+            if result.media_file is not None:
+                result.media_file = None
+
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": latency_summary(latencies),
+        "cpu_seconds": round(cpu, 4),
+        "cpu_ms_per_request": round(cpu * 1000 / len(latencies), 4) if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+async def run_scale(
+    base_url: str,
+    n_apis: int,
+    requests: int,
+    concurrency: int,
+    group_size: int,
+    size: int,
+    latency_ms: float,
+    seed: int,
+) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="apidog_bench_") as tmp:
+        data_dir = Path(tmp)
+        apis = synth.write_data_dir(data_dir, n_apis, base_url, group_size=group_size, seed=seed)
+        t = time.perf_counter()
+        loader.load_registry(data_dir)
+        loader.load_group_index(data_dir)
+        build_ms = (time.perf_counter() - t) * 1000
+        context = core.CallContext(synth.BENCH_USER, synth.BENCH_GROUP)
+        # warm the client pool and the lazily built per-user caches
+        warmup = synth.make_calls(apis, min(200, requests), size, latency_ms, seed + 1)
+        await drive(data_dir, warmup, concurrency, context, BENCH_CONFIG)
+        calls = synth.make_calls(apis, requests, size, latency_ms, seed)
+        result = await drive(data_dir, calls, concurrency, context, BENCH_CONFIG)
+        await core.close_clients()
+        core.close_disk_caches()
+    return {
+        "apis": n_apis,
+        "group_size": group_size,
+        "payload_bytes": size,
+        "upstream_latency_ms": latency_ms,
+        "load_ms": round(build_ms, 3),
+        **result,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run(
+    scales: Sequence[int] = (10, 100, 1000, 5000),
+    requests: int = 2000,
+    concurrency: int = 64,
+    group_size: int = 1000,
+    size: int = 512,
+    latency_ms: float = 0.0,
+    seed: int = 1,
+) -> list[dict[str, Any]]:
+    """One scenario per scale against a stub upstream in a child process."""
+    proc, base_url = spawn()
+    try:
+        out = []
+        for n in scales:
+            r = asyncio.run(run_scale(base_url, n, requests, concurrency, group_size, size, latency_ms, seed))
+            print(
+                f"apis={n:<5} rps={r['throughput_rps']:<9} p50={r['latency_ms']['p50']}ms "
+                f"p99={r['latency_ms']['p99']}ms cpu/req={r['cpu_ms_per_request']}ms errors={sum(r['errors'].values())}",
+                file=sys.stderr,
+            )
+            out.append(r)
+        return out
+    finally:
+        proc.terminate()
+        proc.wait(5)
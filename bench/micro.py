@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Micro-benchmarks of the per-call hot paths, reported as nanoseconds per operation."""
+
+from __future__ import annotations
+
+import itertools
+import sys
+import timeit
+from typing import Any, Callable
+
+from . import synth
+
+from apidog.core import loader
+from apidog.core import permission
+from apidog.core import rate_limit
+from apidog.core.parse_args import compile_template, parse_args, resolve_placeholders
+from apidog.core.request import HttpResponse
+from apidog.core.response import parse_response
+from apidog.core.types import CallContext
+
+RAW_ARGS = '天气 北京 "hello world" city=上海 days=3 tag="a b"'
+TEMPLATE = {
+    "q": "{{args.0}}",
+    "city": "{{named.city|北京}}",
+    "days": "{{named.days|1}}",
+    "token": "Bearer {{config.token}}",
+    "static": {"lang": "zh", "units": ["metric", "si"]},
+}
+ARGS = ["北京", "hello world"]
+NAMED = {"city": "上海", "days": "3"}
+CONFIG = {"token": "secret"}
+JSON_BODY = b'{"code": 0, "data": {"items": [{"id": 1, "name": "alpha"}], "text": "' + b"x" * 2048 + b'"}}'
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5) -> dict[str, float]:
+    """Best-of-repeat ns/op; the loop count is picked so one timing takes at least 0.2s."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return {"ns_per_op": round(best / number * 1e9, 1), "ops": number}
+
+
+def cases(group_size: int = 1000) -> dict[str, Callable[[], Any]]:
+    groups = synth.make_groups(group_size)
+    index = permission.GroupIndex(groups)
+    restricted = {"id": "r", "allowed_user_groups": ["ug7"], "allowed_group_groups": ["gg3"]}
+    allowed_users = permission.allowed_names(restricted["allowed_user_groups"])
+    allowed_groups = permission.allowed_names(restricted["allowed_group_groups"])
+    ctx = CallContext(synth.BENCH_USER, synth.BENCH_GROUP)
+    template = compile_template(TEMPLATE)
+    users = itertools.cycle([str(u) for u in range(1000)])
+    limit = (1000, 60)
+    text_api = {"id": "t", "response_path": "data.items[0].name"}
+    media_api = {"id": "m", "response_type": "image", "response_media_from": "body"}
+    accessor = loader.CompiledApi(text_api, {}).response_path
+    media = HttpResponse(200, content_type="image/png", is_media=True, media_bytes=b"\x89PNG" + b"\0" * 4096)
+    registry = loader.ApiRegistry(synth.make_apis(1000, "http://127.0.0.1:1"), {})
+    return {
+        "parse_args": lambda: parse_args(RAW_ARGS),
+        "resolve_placeholders": lambda: resolve_placeholders(TEMPLATE, ARGS, NAMED, CONFIG),
+        "template_render": lambda: template.render(ARGS, NAMED, CONFIG),
+        "check_permission": lambda: permission.check_permission(restricted, ctx, index),
+        "check_permission_precomputed": lambda: permission.check(allowed_users, allowed_groups, ctx, index),
+        "rate_limit": lambda: rate_limit.check_and_record_all(limit, limit, next(users), "bench"),
+        # a fresh HttpResponse each time: .data is decoded once per response and then cached
+        "parse_response_json": lambda: parse_response(
+            text_api, HttpResponse(200, content=JSON_BODY, content_type="application/json"), accessor
+        ),
+        "parse_response_media": lambda: parse_response(media_api, media),
+        "registry_find": lambda: registry.find("测试500"),
+        "suggest_miss": lambda: registry.suggest.suggest("测式50"),
+    }
+
+
+def run(group_size: int = 1000, only: set[str] | None = None) -> dict[str, dict[str, float]]:
+    out: dict[str, dict[str, float]] = {}
+    for name, fn in cases(group_size).items():
+        if only and name not in only:
+            continue
+        out[name] = measure(fn)
+        print(f"{name:<30} {out[name]['ns_per_op']:>12.1f} ns/op", file=sys.stderr)
+    rate_limit._LIMITER.clear()
+    return out
+
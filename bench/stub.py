@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Local stub upstream for benchmarks. Every response is shaped by query parameters, falling back to the
+server defaults: latency_ms, jitter_ms, size (payload bytes), status, media=png|mp4|mp3, retry_after.
+Run standalone with python -m bench.stub; it prints the bound port on the first line of stdout.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from . import ROOT
+
+MEDIA_TYPES = {
+    "png": ("image/png", b"\x89PNG\r\n\x1a\n"),
+    "mp4": ("video/mp4", b"\x00\x00\x00\x18ftypmp42"),
+    "mp3": ("audio/mpeg", b"ID3\x04\x00"),
+}
+
+
+def query_num(raw: str | None, default: float) -> float:
+    try:
+        return float(raw) if raw is not None else default
+    except ValueError:
+        return default
+
+
+@functools.lru_cache(maxsize=64)
+def json_payload(size: int) -> bytes:
+    """JSON body of about size bytes: {"code": 0, "data": {"text": ..., "items": [...]}}."""
+    items = [{"id": i, "name": f"item{i}"} for i in range(3)]
+    base = len(json.dumps({"code": 0, "data": {"text": "", "items": items}}).encode())
+    return json.dumps({"code": 0, "data": {"text": "x" * max(0, size - base), "items": items}}).encode()
+
+
+@functools.lru_cache(maxsize=64)
+def media_payload(kind: str, size: int) -> tuple[str, bytes]:
+    content_type, magic = MEDIA_TYPES.get(kind, MEDIA_TYPES["png"])
+    return content_type, magic + b"\x00" * max(0, size - len(magic))
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded HTTP/1.1 server; the attributes are the defaults for requests that do not override them."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+    # the default backlog of 5 drops connects under load and shows up as 1s+ SYN-retry latency
+    request_queue_size = 1024
+
+    def __init__(
+        self,
+        address: tuple[str, int] = ("127.0.0.1", 0),
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        size: int = 512,
+        handler: type[BaseHTTPRequestHandler] | None = None,
+    ) -> None:
+        super().__init__(address, handler or StubHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.size = size
+        self.hits = 0
+        self._hits_lock = threading.Lock()
+
+    def handle_error(self, request, client_address) -> None:
+        # clients hanging up mid-response (timeouts, cancelled hedges) are expected, not server errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count_hit(self) -> None:
+        with self._hits_lock:
+            self.hits += 1
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # keep-alive like real upstreams, so the client pool is exercised
+    protocol_version = "HTTP/1.1"
+    # headers and body go out as two small writes; with Nagle on, the body waits for the client's delayed ACK
+    # and every response gains a ~40ms floor that has nothing to do with the code under test
+    disable_nagle_algorithm = True
+    server_version = "ApiDogStub/1"
+    server: StubServer
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.serve(dict(parse_qsl(urlsplit(self.path).query)))
+
+    def do_DELETE(self) -> None:
+        self.do_GET()
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("content-length") or 0)
+        if length:
+            self.rfile.read(length)
+        self.do_GET()
+
+    do_PUT = do_PATCH = do_POST
+
+    def delay(self, q: dict[str, str]) -> None:
+        s = self.server
+        latency = query_num(q.get("latency_ms"), s.latency_ms)
+        jitter = query_num(q.get("jitter_ms"), s.jitter_ms)
+        if jitter:
+            latency += random.uniform(0, jitter)
+        if latency > 0:
+            time.sleep(latency / 1000.0)
+
+    def serve(self, q: dict[str, str]) -> None:
+        self.server.count_hit()
+        self.delay(q)
+        status = int(query_num(q.get("status"), 200))
+        size = int(query_num(q.get("size"), self.server.size))
+        media = q.get("media")
+        if media and status == 200:
+            content_type, body = media_payload(media, size)
+        else:
+            content_type, body = "application/json", json_payload(size)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if q.get("retry_after"):
+            self.send_header("Retry-After", q["retry_after"])
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start(latency_ms: float = 0.0, jitter_ms: float = 0.0, size: int = 512) -> StubServer:
+    """Stub server on a free localhost port, served from a daemon thread (for micro checks and tests)."""
+    server = StubServer(latency_ms=latency_ms, jitter_ms=jitter_ms, size=size)
+    threading.Thread(target=server.serve_forever, name="apidog-bench-stub", daemon=True).start()
+    return server
+
+
+def spawn(module: str = "bench.stub", *args: str) -> tuple[subprocess.Popen, str]:
+    """
+    Run a stub server module in a child process so its CPU time and memory stay out of the measurements.
+    Returns (process, base_url); terminate the process when done.
+    """
+    proc = subprocess.Popen(
+        [sys.executable, "-m", module, *args],
+        cwd=str(ROOT),
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = proc.stdout.readline().strip() if proc.stdout else ""
+    if not line.isdigit():
+        proc.kill()
+        raise RuntimeError(f"stub server {module} failed to start")
+    return proc, f"http://127.0.0.1:{line}"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--size", type=int, default=512)
+
+
+def serve(server: StubServer) -> None:
+    print(server.server_address[1], flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_arguments(parser)
+    a = parser.parse_args()
+    serve(StubServer(("127.0.0.1", a.port), a.latency_ms, a.jitter_ms, a.size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Synthetic data dirs (apis.json, groups.json, config.json) at a given scale, deterministic per seed."""
+
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+from typing import Any
+
+# the benchmark caller; member of every user group that restricted APIs allow
+BENCH_USER = "bench_user"
+BENCH_GROUP = "bench_group"
+
+
+def make_apis(
+    n: int,
+    base_url: str,
+    media_share: float = 0.1,
+    restricted_share: float = 0.2,
+    seed: int = 1,
+) -> list[dict[str, Any]]:
+    """
+    n enabled APIs against the stub. Text APIs extract data.items[0].name; media APIs return a PNG body.
+    Every API takes one positional arg and optional named args, so templates and parse_args do real work.
+    """
+    rng = random.Random(seed)
+    apis: list[dict[str, Any]] = []
+    for i in range(n):
+        api: dict[str, Any] = {
+            "id": f"bench_{i}",
+            "command": f"测试{i}",
+            "name": f"基准接口 {i}",
+            "description": f"synthetic api {i}",
+            "method": "GET",
+            "url": f"{base_url}/api/{i}",
+            "params": {
+                "q": "{{args.0}}",
+                "city": "{{named.city|北京}}",
+                "size": "{{named.size|512}}",
+                "latency_ms": "{{named.latency_ms|0}}",
+                "token": "{{config.bench_token}}",
+            },
+            "headers": {"X-Bench": "{{named.tag|none}}"},
+            "response_path": "data.items[0].name",
+        }
+        r = rng.random()
+        if r < media_share:
+            api["params"]["media"] = "png"
+            api["response_type"] = "image"
+            api["response_media_from"] = "body"
+            del api["response_path"]
+        if rng.random() < restricted_share:
+            api["allowed_user_groups"] = [f"ug{i % 8}"]
+            api["allowed_group_groups"] = [f"gg{i % 4}"]
+        apis.append(api)
+    return apis
+
+
+def make_groups(group_size: int = 1000, user_groups: int = 8, group_groups: int = 4) -> dict[str, Any]:
+    """groups.json with large member lists; BENCH_USER / BENCH_GROUP are the last member of every group."""
+    return {
+        "user_groups": {
+            f"ug{g}": [str(10_000_000 + g * group_size + m) for m in range(group_size - 1)] + [BENCH_USER]
+            for g in range(user_groups)
+        },
+        "group_groups": {
+            f"gg{g}": [str(20_000_000 + g * group_size + m) for m in range(group_size - 1)] + [BENCH_GROUP]
+            for g in range(group_groups)
+        },
+    }
+
+
+def write_data_dir(
+    data_dir: Path,
+    n_apis: int,
+    base_url: str,
+    group_size: int = 1000,
+    media_share: float = 0.1,
+    restricted_share: float = 0.2,
+    config: dict[str, Any] | None = None,
+    seed: int = 1,
+) -> list[dict[str, Any]]:
+    """Write the data files and return the APIs."""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    apis = make_apis(n_apis, base_url, media_share, restricted_share, seed)
+    files = {
+        "apis.json": {"apis": apis},
+        "groups.json": make_groups(group_size),
+        "auth.json": {},
+        "config.json": {"timeout_seconds": 10, "retry": False, "slow_call_ms": 60_000, **(config or {})},
+    }
+    for name, content in files.items():
+        (data_dir / name).write_text(json.dumps(content, ensure_ascii=False), encoding="utf-8")
+    return apis
+
+
+def make_calls(
+    apis: list[dict[str, Any]],
+    count: int,
+    size: int = 512,
+    latency_ms: float = 0.0,
+    seed: int = 1,
+) -> list[str]:
+    """count raw /api argument strings over random APIs (by id or command), reproducible per seed."""
+    rng = random.Random(seed)
+    calls = []
+    for _ in range(count):
+        api = rng.choice(apis)
+        name = api["command"] if rng.random() < 0.5 else api["id"]
+        calls.append(f'{name} "arg {rng.randrange(1000)}" size={size} latency_ms={latency_ms:g} tag=t{rng.randrange(8)}')
+    return calls
@@ -4,22 +4,44 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+import time
 from pathlib import Path
 from typing import Any
 
 import httpx
 
-from .parse_args import parse_args, resolve_placeholders
+from .parse_args import parse_args
 from .types import CallContext, CallResult
+from .client_pool import close_clients, close_clients_nowait
+from .disk_cache import close_all as close_disk_caches
+from .capture import close_all as close_captures
+from . import cache as cache_mod
+from . import capture as capture_mod
+from . import circuit
+from . import concurrency
+from . import hedge as hedge_mod
 from . import help as help_mod
 from . import loader
+from . import metrics
 from . import permission
 from . import rate_limit as rate_limit_mod
 from . import request as req_mod
 from . import response
+from . import retry as retry_mod
+from . import singleflight
+from . import trace as trace_mod
 from .log_helper import logger
 
-__all__ = ["run", "CallContext", "CallResult"]
+__all__ = [
+    "run",
+    "close_clients",
+    "close_clients_nowait",
+    "close_disk_caches",
+    "close_captures",
+    "CallContext",
+    "CallResult",
+]
 
 
 def _log_call(
@@ -41,9 +63,45 @@ def _log_call(
         parts.append(f"status_code={status_code}")
     if error_type:
         parts.append(f"error={error_type}")
+    tr = trace_mod.current()
+    if tr is not None:
+        parts.append(f"trace_id={tr.trace_id}")
     logger.debug(" ".join(parts))
 
 
+def _done(
+    result: CallResult,
+    api_key: str,
+    metric_key: str,
+    started: float,
+    context: CallContext,
+    status_code: int | None = None,
+    error_type: str | None = None,
+    cache_hit: bool = False,
+) -> CallResult:
+    """Log and record metrics for a call of a configured API, then hand back its result."""
+    _log_call(api_key, context, result.success, status_code=status_code, error_type=error_type)
+    if not result.success and error_type is None:
+        error_type = f"http_{status_code}" if status_code is not None and status_code >= 400 else "response"
+    metrics.record_call(metric_key, result.success, time.monotonic() - started, error_type, cache_hit)
+    return result
+
+
+def _not_found_message(
+    registry: loader.ApiRegistry,
+    api_key: str,
+    context: CallContext,
+    groups: permission.GroupIndex,
+) -> str:
+    suggestions = registry.suggest.suggest(
+        api_key,
+        lambda e: permission.check(e.allowed_user_groups, e.allowed_group_groups, context, groups)[0],
+    )
+    if not suggestions:
+        return f"未找到接口: {api_key}。可用接口请在配置中查看。"
+    return f"未找到接口: {api_key}。你是不是想找：{'、'.join(suggestions)}？发送 /api help 查看全部接口。"
+
+
 async def run(
     data_dir: Path,
     raw_args: str,
@@ -53,109 +111,256 @@ async def run(
     """
     Load config, resolve API by first token in raw_args, check permission,
     build request, execute, parse response. Returns a platform-agnostic CallResult.
+    Phases are timed on the caller's trace (trace.tracing), or on a new one covering just this call.
     """
-    apis = loader.load_apis(data_dir)
-    apis = loader.enabled_apis(apis)
-    auth = loader.load_auth(data_dir)
-    groups = loader.load_groups(data_dir)
-    global_config = loader.load_config(data_dir)
+    if trace_mod.current() is not None:
+        return await _run(data_dir, raw_args, context, extra_config)
+    with trace_mod.tracing(context):
+        return await _run(data_dir, raw_args, context, extra_config)
+
+
+async def _debug(
+    data_dir: Path,
+    raw_args: str,
+    context: CallContext,
+    extra_config: dict[str, Any] | None,
+) -> CallResult:
+    """/api debug <接口名> [参数...]: run the call under its own trace and reply with the timing breakdown."""
+    if not context.is_admin:
+        return CallResult(success=False, message="仅管理员可使用 /api debug。", result_type="text")
+    parts = raw_args.strip().split(None, 1)
+    rest = parts[1] if len(parts) > 1 else ""
+    if not rest:
+        return CallResult(success=False, message="用法: /api debug <接口名> [参数...]", result_type="text")
+    with trace_mod.tracing(context) as tr:
+        result = await _run(data_dir, rest, context, extra_config)
+    outcome = "成功" if result.success else "失败"
+    lines = [f"【调试】{tr.api_key or rest.split()[0]}", f"结果: {outcome}（{result.result_type}）", tr.format()]
+    if result.message:
+        lines.append("返回: " + result.message[:200])
+    return CallResult(success=True, message="\n".join(lines), result_type="text")
+
 
-    args, named = parse_args(raw_args.strip())
+async def _run(
+    data_dir: Path,
+    raw_args: str,
+    context: CallContext,
+    extra_config: dict[str, Any] | None,
+) -> CallResult:
+    tr = trace_mod.current()
+    with tr.span("load"):
+        registry = loader.load_registry(data_dir)
+        auth = loader.load_auth(data_dir)
+        groups = loader.load_group_index(data_dir)
+    tr.slow_seconds = registry.config.get("slow_call_seconds", trace_mod.DEFAULT_SLOW_CALL_SECONDS)
+
+    with tr.span("parse_args"):
+        args, named = parse_args(raw_args.strip())
     if not args:
         _log_call("", context, False)
         return CallResult(success=False, message="请提供接口名（第一个参数）。", result_type="text")
     api_key = args[0]
     rest_args = args[1:]
 
+    # an API whose id or command is "debug" takes precedence over the keyword
+    if api_key == "debug" and registry.find(api_key) is None:
+        return await _debug(data_dir, raw_args, context, extra_config)
+
     if api_key == "help":
         target = args[1] if len(args) > 1 else None
-        allowed_apis = [a for a in apis if permission.check_permission(a, context, groups)[0]]
-        message = help_mod.build_help_message(allowed_apis, target)
+        entries = tuple(e.help for e in permission.allowed_entries(registry, groups, context))
+        message = help_mod.render_help(entries, target, named.get("page"), named.get("q"))
         _log_call(api_key, context, True)
         return CallResult(success=True, message=message, result_type="text")
 
-    api = loader.find_api_by_id_or_command(apis, api_key)
-    if not api:
+    with tr.span("lookup"):
+        entry = registry.find(api_key)
+    if not entry:
         _log_call(api_key, context, False)
         return CallResult(
             success=False,
-            message=f"未找到接口: {api_key}。可用接口请在配置中查看。",
+            message=_not_found_message(registry, api_key, context, groups),
             result_type="text",
         )
+    api = entry.api
+    metric_key = entry.api_id or api_key
+    started = time.monotonic()
+    tr.api_key = metric_key
 
-    ok, err = permission.check_permission(api, context, groups)
+    with tr.span("permission"):
+        ok, err = permission.check(entry.allowed_user_groups, entry.allowed_group_groups, context, groups)
     if not ok:
-        _log_call(api_key, context, False)
-        return CallResult(success=False, message=err, result_type="text")
+        result = CallResult(success=False, message=err, result_type="text")
+        return _done(result, api_key, metric_key, started, context, error_type="permission")
 
-    ok, err = rate_limit_mod.check_and_record_global(api, api_key)
-    if not ok:
-        _log_call(api_key, context, False, error_type="rate_limit")
-        return CallResult(success=False, message=err, result_type="text")
-        
-    ok, err = rate_limit_mod.check_and_record(api, context.user_id, api_key)
+    with tr.span("rate_limit"):
+        ok, err = rate_limit_mod.check_and_record_all(
+            entry.rate_limit_global, entry.rate_limit, context.user_id, api_key
+        )
     if not ok:
-        _log_call(api_key, context, False, error_type="rate_limit")
-        return CallResult(success=False, message=err, result_type="text")
+        result = CallResult(success=False, message=err, result_type="text")
+        return _done(result, api_key, metric_key, started, context, error_type="rate_limit")
 
     config = loader.get_config_for_placeholders(auth, extra_config)
     url = api.get("url") or ""
     if not url:
-        _log_call(api_key, context, False)
-        return CallResult(success=False, message="该接口未配置 URL。", result_type="text")
-
-    method = (api.get("method") or "GET").upper()
-    headers = dict(api.get("headers") or {})
-    params = dict(api.get("params") or {})
-    body_raw = api.get("body")
-
-    headers = resolve_placeholders(headers, rest_args, named, config)
-    params = resolve_placeholders(params, rest_args, named, config)
-    url = resolve_placeholders(url, rest_args, named, config)
-    if isinstance(body_raw, (dict, list)):
-        body = resolve_placeholders(body_raw, rest_args, named, config)
-    elif isinstance(body_raw, str):
-        body = resolve_placeholders(body_raw, rest_args, named, config)
+        result = CallResult(success=False, message="该接口未配置 URL。", result_type="text")
+        return _done(result, api_key, metric_key, started, context, error_type="no_url")
+
+    method = entry.method
+    with tr.span("template"):
+        # headers/params get auth applied in place, so they must be fresh dicts even when the template is static
+        headers = dict(entry.headers_tpl.render(rest_args, named, config))
+        params = dict(entry.params_tpl.render(rest_args, named, config))
+        url = entry.url_tpl.render(rest_args, named, config)
+        body = entry.body_tpl.render(rest_args, named, config)
+
+    key = None
+    if entry.coalesce or entry.cache:
+        key = req_mod.request_key(entry.api_id or api_key, method, url, headers, params, body, api)
+    if entry.cache:
+        with tr.span("cache"):
+            cached = await cache_mod.lookup(data_dir, entry.api_id or api_key, entry.cache, key)
+        if cached is not None:
+            logger.debug("ApiDog cache hit api_key=%s", api_key)
+            return _done(cached, api_key, metric_key, started, context, cache_hit=True)
+
+    if entry.coalesce:
+        result, status_code, error_type = await singleflight.do(
+            key, lambda: _fetch(entry, api_key, url, method, headers, params, body, auth)
+        )
     else:
-        body = body_raw
+        result, status_code, error_type = await _fetch(
+            entry, api_key, url, method, headers, params, body, auth
+        )
+    if entry.cache:
+        cache_mod.store(data_dir, entry.api_id or api_key, entry.cache, key, result)
+    return _done(result, api_key, metric_key, started, context, status_code, error_type)
+
+
+def _retry_wait(
+    policy: retry_mod.RetryPolicy,
+    attempt: int,
+    deadline: float | None,
+    status_code: int | None = None,
+    retry_after: str | None = None,
+) -> float | None:
+    """Backoff before the next attempt, or None when the policy or the deadline budget rules out another one."""
+    delay = policy.delay(attempt, status_code, retry_after)
+    if delay is None:
+        return None
+    if deadline is not None and time.monotonic() + delay >= deadline:
+        return None
+    return delay
+
 
-    client_opts = loader.merge_client_options(global_config, api)
+async def _fetch(
+    entry: loader.CompiledApi,
+    api_key: str,
+    url: str,
+    method: str,
+    headers: dict[str, Any],
+    params: dict[str, Any],
+    body: Any,
+    auth: dict[str, Any],
+) -> tuple[CallResult, int | None, str | None]:
+    """Execute the resolved request with retries and parse it. Returns (result, status_code, error_type)."""
+    api = entry.api
+    client_opts = entry.client_opts
     timeout_seconds = client_opts.get("timeout_seconds", 30.0)
-    retry_cfg = client_opts.get("retry")
-    max_attempts = retry_cfg.get("max_attempts", 0) if isinstance(retry_cfg, dict) else 0
-    backoff_seconds = retry_cfg.get("backoff_seconds", 1.0) if isinstance(retry_cfg, dict) else 1.0
-    retry_statuses_raw = client_opts.get("retry_statuses")
-    retryable_statuses = set(retry_statuses_raw) if isinstance(retry_statuses_raw, (set, frozenset)) else (set(retry_statuses_raw) if isinstance(retry_statuses_raw, list) else {500, 502, 503, 429})
+    policy = client_opts.get("retry_policy") or retry_mod.RetryPolicy(retry_statuses=loader.DEFAULT_RETRY_STATUSES)
+    max_attempts = policy.max_attempts
+    retryable_statuses = policy.retry_statuses
+    deadline = policy.deadline(time.monotonic())
 
-    status_code, data, text, content_bytes, content_type = None, None, "", None, None
+    limiters = concurrency.limiters_for(entry.api_id or api_key, entry.concurrency, url, entry.host_concurrency)
+    breaker = circuit.get_breaker(entry.api_id or api_key, url, client_opts.get("circuit_breaker"))
+    capture = capture_mod.get_capture(client_opts.get("capture"))
+    resp = None
+    wait: float | None = None
 
     for attempt in range(1 + max_attempts):
+        if wait:
+            with trace_mod.span("retry_wait"):
+                await asyncio.sleep(wait)
+        wait = None
+        if breaker is not None and not breaker.allow():
+            logger.info("ApiDog circuit open api_key=%s breaker=%s", api_key, breaker.name)
+            return CallResult(success=False, message="上游服务暂时不可用，请稍后再试。", result_type="text"), None, "circuit_open"
+        request_timeout = None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining < timeout_seconds:
+                request_timeout = max(remaining, 0.01)
+        # upstream health for the breaker: True/False once known, None if the call never reached upstream
+        upstream_ok: bool | None = None
         try:
-            status_code, data, text, content_bytes, content_type = await req_mod.execute_request(
-                api, url, method, headers, params, body, auth, timeout=timeout_seconds
+            send = functools.partial(
+                req_mod.execute_request,
+                api, url, method, headers, params, body, auth,
+                timeout=timeout_seconds,
+                follow_redirects=client_opts.get("follow_redirects", True),
+                pool_limits=client_opts.get("http_pool"),
+                max_response_bytes=client_opts.get("max_response_bytes"),
+                request_timeout=request_timeout,
+                capture=capture,
             )
-            if status_code in retryable_statuses and attempt < max_attempts:
-                logger.info("ApiDog retry api_key=%s attempt=%s reason=status_code status_code=%s", api_key, attempt + 1, status_code)
-                await asyncio.sleep(backoff_seconds)
-                continue
+            if entry.hedge:
+                resp = await hedge_mod.run(
+                    send, entry.hedge, limiters, entry.api_id or api_key, entry.rate_limit_global,
+                    lambda r: r.status_code < 500 and r.status_code not in retryable_statuses,
+                )
+            else:
+                queued = time.perf_counter()
+                async with concurrency.hold(limiters):
+                    tr = trace_mod.current()
+                    if tr is not None:
+                        tr.add("queue", queued)
+                    resp = await send()
+            upstream_ok = resp.status_code < 500
+            metrics.record_response_size(
+                entry.api_id or api_key,
+                resp.media_file.size if resp.media_file is not None else len(resp.media_bytes or resp.content),
+            )
+            if resp.status_code in retryable_statuses and attempt < max_attempts:
+                wait = _retry_wait(policy, attempt, deadline, resp.status_code, resp.headers.get("retry-after"))
+                if wait is not None:
+                    metrics.record_retry(entry.api_id or api_key)
+                    logger.info("ApiDog retry api_key=%s attempt=%s reason=status_code status_code=%s wait=%.2f", api_key, attempt + 1, resp.status_code, wait)
+                    continue
             break
         except httpx.TimeoutException:
+            upstream_ok = False
             if attempt < max_attempts:
-                logger.info("ApiDog retry api_key=%s attempt=%s reason=timeout", api_key, attempt + 1)
-                await asyncio.sleep(backoff_seconds)
-                continue
-            _log_call(api_key, context, False, error_type="timeout")
-            return CallResult(success=False, message="请求超时。", result_type="text")
+                wait = _retry_wait(policy, attempt, deadline)
+                if wait is not None:
+                    metrics.record_retry(entry.api_id or api_key)
+                    logger.info("ApiDog retry api_key=%s attempt=%s reason=timeout wait=%.2f", api_key, attempt + 1, wait)
+                    continue
+            return CallResult(success=False, message="请求超时。", result_type="text"), None, "timeout"
+        except concurrency.LimiterBusy as e:
+            logger.info("ApiDog busy api_key=%s limiter=%s reason=%s", api_key, e.name, e.reason)
+            return CallResult(success=False, message="接口繁忙，请稍后再试。", result_type="text"), None, "busy"
+        except req_mod.ResponseTooLarge:
+            upstream_ok = True
+            logger.warning("ApiDog response too large api_key=%s", api_key)
+            return CallResult(success=False, message="响应内容过大，已放弃接收。", result_type="text"), None, "too_large"
         except Exception:
+            upstream_ok = False
             logger.exception("ApiDog request error")
-            _log_call(api_key, context, False, error_type="error")
-            return CallResult(success=False, message="请求出错，请稍后重试。", result_type="text")
+            return CallResult(success=False, message="请求出错，请稍后重试。", result_type="text"), None, "error"
+        finally:
+            if breaker is not None:
+                if upstream_ok is None:
+                    breaker.abandon()
+                else:
+                    breaker.record(upstream_ok)
 
-    if status_code is None:
-        _log_call(api_key, context, False, error_type="error")
-        return CallResult(success=False, message="请求出错，请稍后重试。", result_type="text")
-    result = response.parse_response(api, status_code, data, text, content_bytes, content_type)
+    if resp is None:
+        return CallResult(success=False, message="请求出错，请稍后重试。", result_type="text"), None, "error"
+    status_code = resp.status_code
+    with trace_mod.span("parse_response"):
+        result = response.parse_response(api, resp, entry.response_path)
     if status_code in retryable_statuses and not result.success:
         logger.warning("ApiDog retries exhausted api_key=%s final_status_code=%s", api_key, status_code)
-    _log_call(api_key, context, result.success, status_code=status_code)
-    return result
+    return result, status_code, None
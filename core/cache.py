@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""Per-API in-memory TTL response cache with LRU and size-bounded eviction. In-process only."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable
+
+from . import disk_cache
+from .log_helper import logger
+from .types import CallResult
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def parse_cache_config(raw: Any) -> tuple[float, int, int, bool] | None:
+    """
+    Return (ttl_seconds, max_entries, max_bytes, persist) or None.
+    Expects {"ttl_seconds": N, "max_entries": M, "max_bytes": B, "persist": bool}.
+    """
+    if not isinstance(raw, dict):
+        return None
+    ttl = raw.get("ttl_seconds")
+    if not isinstance(ttl, (int, float)) or ttl <= 0:
+        return None
+    max_entries = raw.get("max_entries")
+    max_bytes = raw.get("max_bytes")
+    return (
+        float(ttl),
+        int(max_entries) if isinstance(max_entries, (int, float)) and max_entries > 0 else DEFAULT_MAX_ENTRIES,
+        int(max_bytes) if isinstance(max_bytes, (int, float)) and max_bytes > 0 else DEFAULT_MAX_BYTES,
+        raw.get("persist") is True,
+    )
+
+
+def _result_size(result: CallResult) -> int:
+    size = len((result.message or "").encode("utf-8"))
+    if result.media_bytes:
+        size += len(result.media_bytes)
+    if result.media_file is not None:
+        # temp file stays on disk while the entry holds it; count it against the budget too
+        size += result.media_file.size
+    if result.media_url:
+        size += len(result.media_url)
+    return size
+
+
+def _blob_gone(result: CallResult) -> bool:
+    """A disk hit promoted to memory points at a blob that a later put or prune may have removed since."""
+    return result.media_file is None and result.media_path is not None and not os.path.isfile(result.media_path)
+
+
+class ResponseCache:
+    """LRU of successful CallResults keyed by resolved request; entries expire after ttl_seconds."""
+
+    __slots__ = ("ttl", "max_entries", "max_bytes", "_entries", "_bytes", "_lock", "hits", "misses", "evictions")
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (expires_at, size, result); most recently used at the end
+        self._entries: OrderedDict[Hashable, tuple[float, int, CallResult]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> CallResult | None:
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if item[0] <= now or _blob_gone(item[2]):
+                del self._entries[key]
+                self._bytes -= item[1]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[2]
+
+    def put(self, key: Hashable, result: CallResult, ttl: float | None = None) -> None:
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (expires_at, size, result)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "ttl_seconds": self.ttl,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_caches_lock = threading.Lock()
+# api_key -> cache; kept across registry reloads while the cache settings are unchanged
+_caches: dict[str, ResponseCache] = {}
+
+
+def get_cache(api_key: str, settings: tuple[float, int, int, bool]) -> ResponseCache:
+    """Return the memory cache for api_key, replacing it when its settings changed."""
+    settings = settings[:3]
+    cache = _caches.get(api_key)
+    if cache is not None and (cache.ttl, cache.max_entries, cache.max_bytes) == settings:
+        return cache
+    with _caches_lock:
+        cache = _caches.get(api_key)
+        if cache is None or (cache.ttl, cache.max_entries, cache.max_bytes) != settings:
+            cache = ResponseCache(*settings)
+            _caches[api_key] = cache
+        return cache
+
+
+# strong refs for fire-and-forget disk writes
+_pending_writes: set[asyncio.Task] = set()
+
+
+async def lookup(
+    data_dir: Path,
+    api_key: str,
+    settings: tuple[float, int, int, bool],
+    key: Hashable,
+) -> CallResult | None:
+    """Memory tier first, then (persist=true) the disk tier; disk hits are promoted to memory for their remaining TTL."""
+    cache = get_cache(api_key, settings)
+    result = cache.get(key)
+    if result is not None or not settings[3]:
+        return result
+    disk = disk_cache.get_disk_cache(data_dir)
+    if disk is None:
+        return None
+    try:
+        hit = await asyncio.to_thread(disk.get, api_key, disk_cache.hash_key(key))
+    except Exception:
+        logger.exception("ApiDog disk cache read failed api_key=%s", api_key)
+        return None
+    if hit is None:
+        return None
+    result, remaining = hit
+    cache.put(key, result, ttl=min(remaining, settings[0]))
+    return result
+
+
+def store(
+    data_dir: Path,
+    api_key: str,
+    settings: tuple[float, int, int, bool],
+    key: Hashable,
+    result: CallResult,
+) -> None:
+    """Cache a successful result in memory and, with persist=true, write it to disk in the background."""
+    if not result.success:
+        return
+    get_cache(api_key, settings).put(key, result)
+    if not settings[3]:
+        return
+    disk = disk_cache.get_disk_cache(data_dir)
+    if disk is None:
+        return
+
+    async def _write() -> None:
+        try:
+            await asyncio.to_thread(
+                disk.put, api_key, disk_cache.hash_key(key), result, settings[0], settings[1], settings[2]
+            )
+        except Exception:
+            logger.exception("ApiDog disk cache write failed api_key=%s", api_key)
+
+    task = asyncio.ensure_future(_write())
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+
+
+def clear_all() -> None:
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.clear()
+
+
+def stats() -> dict[str, Any]:
+    """Per-API memory-tier hit/miss/size counters plus disk-tier entry counts per data dir."""
+    with _caches_lock:
+        items = list(_caches.items())
+    return {
+        "memory": {api_key: cache.stats() for api_key, cache in items},
+        "disk": disk_cache.stats(),
+    }
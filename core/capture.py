@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+Record upstream exchanges to an append-only JSON-lines capture file and replay them through an httpx transport,
+so the full run -> parse_response pipeline can be exercised offline with real traffic shapes.
+One line per exchange: {"ts", "api", "key", "method", "url", "params", "body", "status", "headers",
+"content" | "content_b64", "ttfb_ms", "total_ms"}. key is the hash of the resolved request taken before auth is
+applied, so replay matches regardless of credentials. auth.json values that reach url/params/body anyway
+(through {{config.X}} placeholders) are replaced with REDACTED before a line is written; response bodies are
+stored as received.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import itertools
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+import httpx
+
+from . import jsonlib
+from .log_helper import logger
+
+MODES = ("record", "replay")
+DEFAULT_FILE = "captures/capture.jsonl"
+DEFAULT_MAX_BODY_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_FILE_BYTES = 256 * 1024 * 1024
+
+# request extensions carrying the capture identity from execute_request to the replay transport
+KEY_EXTENSION = "apidog_capture_key"
+API_EXTENSION = "apidog_capture_api"
+
+# set by the client / transport for the stored body, so they are dropped on record and recomputed on replay
+_HOP_HEADERS = frozenset({"content-length", "content-encoding", "transfer-encoding", "connection", "set-cookie"})
+
+REDACTED = "***"
+# auth.json fields that name things rather than hold credentials
+_AUTH_NAME_FIELDS = frozenset({"type", "in", "header", "key", "username", "user"})
+# shorter values would redact ordinary text (and are no real secret anyway)
+MIN_SECRET_LENGTH = 4
+
+
+def parse_capture_config(raw: Any, data_dir: Path) -> dict[str, Any] | None:
+    """
+    Parse config.json capture {"mode": "record"|"replay", "file": path under data_dir, "preserve_timing": bool,
+    "fallback": "api"|"none", "max_body_bytes": N, "max_file_bytes": N}. None when off or invalid.
+    """
+    if not isinstance(raw, dict) or raw.get("mode") not in MODES:
+        return None
+    file = raw.get("file")
+    path = (data_dir / (file if isinstance(file, str) and file.strip() else DEFAULT_FILE)).resolve()
+    if not path.is_relative_to(data_dir.resolve()):
+        logger.warning("ApiDog capture file must be inside the data directory, capture disabled: %s", file)
+        return None
+    out: dict[str, Any] = {
+        "mode": raw["mode"],
+        "path": str(path),
+        "preserve_timing": raw.get("preserve_timing") is True,
+        "fallback": "api" if raw.get("fallback") == "api" else "none",
+        "max_body_bytes": DEFAULT_MAX_BODY_BYTES,
+        "max_file_bytes": DEFAULT_MAX_FILE_BYTES,
+    }
+    for name in ("max_body_bytes", "max_file_bytes"):
+        val = raw.get(name)
+        if isinstance(val, (int, float)) and not isinstance(val, bool) and val > 0:
+            out[name] = int(val)
+    return out
+
+
+def auth_secrets(auth: dict[str, Any]) -> tuple[str, ...]:
+    """Credential strings of auth.json entries, longest first so overlapping values redact completely."""
+    found = set()
+    for entry in auth.values():
+        if not isinstance(entry, dict):
+            continue
+        for name, value in entry.items():
+            if name not in _AUTH_NAME_FIELDS and isinstance(value, str) and len(value) >= MIN_SECRET_LENGTH:
+                found.add(value)
+    return tuple(sorted(found, key=len, reverse=True))
+
+
+def redact(value: Any, secrets: tuple[str, ...]) -> Any:
+    """value with every occurrence of the secrets in its strings (keys included) replaced by REDACTED."""
+    if not secrets:
+        return value
+    if isinstance(value, str):
+        for secret in secrets:
+            if secret in value:
+                value = value.replace(secret, REDACTED)
+        return value
+    if isinstance(value, dict):
+        return {redact(k, secrets): redact(v, secrets) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v, secrets) for v in value]
+    return value
+
+
+def _clean_headers(headers: httpx.Headers) -> list[list[str]]:
+    return [[k, v] for k, v in headers.multi_items() if k.lower() not in _HOP_HEADERS]
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    """Stored body, optionally held back for the recorded download time."""
+
+    def __init__(self, content: bytes, delay: float) -> None:
+        self._content = content
+        self._delay = delay
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        if self._delay > 0:
+            await asyncio.sleep(self._delay)
+        yield self._content
+
+
+class _Exchange:
+    __slots__ = ("status", "headers", "content", "ttfb", "download")
+
+    def __init__(self, line: dict[str, Any]) -> None:
+        self.status = int(line["status"])
+        self.headers = [tuple(h) for h in line.get("headers") or ()]
+        if "content_b64" in line:
+            self.content = base64.b64decode(line["content_b64"])
+        else:
+            self.content = (line.get("content") or "").encode("utf-8")
+        self.ttfb = max(0.0, float(line.get("ttfb_ms") or 0) / 1000.0)
+        self.download = max(0.0, float(line.get("total_ms") or 0) / 1000.0 - self.ttfb)
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Serves captured exchanges instead of touching the network. Requests are matched by capture key; repeated keys
+    cycle through their captures in file order, so a replay is deterministic for a given call order.
+    With fallback "api", an unmatched request gets the next capture of the same API. Misses answer 504.
+    """
+
+    def __init__(self, capture: Capture) -> None:
+        self._capture = capture
+        self._by_key: dict[str, list[_Exchange]] = {}
+        self._by_api: dict[str, list[_Exchange]] = {}
+        self._cursors: dict[tuple[str, str], itertools.count] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self) -> None:
+        path = Path(self._capture.path)
+        loaded = 0
+        try:
+            with path.open("rb") as f:
+                for raw in f:
+                    try:
+                        line = jsonlib.loads(raw)
+                        exchange = _Exchange(line)
+                    except (ValueError, KeyError, TypeError):
+                        # a torn last line from an interrupted recording
+                        continue
+                    self._by_key.setdefault(str(line.get("key") or ""), []).append(exchange)
+                    self._by_api.setdefault(str(line.get("api") or ""), []).append(exchange)
+                    loaded += 1
+        except OSError:
+            logger.warning("ApiDog capture file not readable: %s", path)
+        logger.info("ApiDog replay loaded %s exchanges from %s", loaded, path)
+        self._loaded = True
+
+    def _next(self, index: dict[str, list[_Exchange]], kind: str, name: str) -> _Exchange | None:
+        exchanges = index.get(name)
+        if not exchanges:
+            return None
+        cursor = self._cursors.setdefault((kind, name), itertools.count())
+        return exchanges[next(cursor) % len(exchanges)]
+
+    def lookup(self, key: str, api: str) -> _Exchange | None:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            exchange = self._next(self._by_key, "key", key)
+            if exchange is None and self._capture.fallback == "api":
+                exchange = self._next(self._by_api, "api", api)
+        return exchange
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        exchange = self.lookup(
+            str(request.extensions.get(KEY_EXTENSION) or ""), str(request.extensions.get(API_EXTENSION) or "")
+        )
+        if exchange is None:
+            self._capture.count("misses")
+            logger.debug("ApiDog replay miss %s %s", request.method, request.url)
+            return httpx.Response(
+                504,
+                headers={"content-type": "application/json", "x-apidog-replay": "miss"},
+                content=b'{"message": "no captured response"}',
+                request=request,
+            )
+        self._capture.count("replayed")
+        timed = self._capture.preserve_timing
+        if timed and exchange.ttfb:
+            await asyncio.sleep(exchange.ttfb)
+        headers = httpx.Headers(exchange.headers)
+        headers["content-length"] = str(len(exchange.content))
+        return httpx.Response(
+            exchange.status,
+            headers=headers,
+            stream=_ReplayStream(exchange.content, exchange.download if timed else 0.0),
+            request=request,
+        )
+
+
+class Capture:
+    """One capture file in record or replay mode; record() is blocking and meant for asyncio.to_thread."""
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self.mode: str = config["mode"]
+        self.path: str = config["path"]
+        self.preserve_timing: bool = config["preserve_timing"]
+        self.fallback: str = config["fallback"]
+        self.max_body_bytes: int = config["max_body_bytes"]
+        self.max_file_bytes: int = config["max_file_bytes"]
+        self.transport = ReplayTransport(self) if self.mode == "replay" else None
+        self.counters = {"recorded": 0, "skipped": 0, "replayed": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._full = False
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def record(
+        self,
+        api: str,
+        key: str,
+        method: str,
+        url: str,
+        params: dict[str, Any],
+        body: Any,
+        status: int,
+        headers: httpx.Headers,
+        content: bytes | None,
+        content_path: str | None,
+        ttfb: float,
+        total: float,
+        secrets: tuple[str, ...] = (),
+    ) -> None:
+        """
+        Append one exchange with secrets redacted from url, params and body.
+        Bodies over max_body_bytes are skipped whole; errors are logged, never raised.
+        """
+        try:
+            if content is None and content_path is not None:
+                if Path(content_path).stat().st_size > self.max_body_bytes:
+                    self.count("skipped")
+                    return
+                content = Path(content_path).read_bytes()
+            content = content or b""
+            if len(content) > self.max_body_bytes:
+                self.count("skipped")
+                return
+            line: dict[str, Any] = {
+                "ts": round(time.time(), 3),
+                "api": api,
+                "key": key,
+                "method": method,
+                "url": redact(url, secrets),
+                "params": redact(params, secrets),
+                "body": redact(body, secrets),
+                "status": status,
+                "headers": _clean_headers(headers),
+                "ttfb_ms": round(ttfb * 1000, 1),
+                "total_ms": round(total * 1000, 1),
+            }
+            try:
+                line["content"] = content.decode("utf-8")
+            except UnicodeDecodeError:
+                line["content_b64"] = base64.b64encode(content).decode("ascii")
+            data = (jsonlib.dumps(line) + "\n").encode("utf-8")
+            with self._lock:
+                if self._full:
+                    self.counters["skipped"] += 1
+                    return
+                if self._file is None:
+                    path = Path(self.path)
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    self._file = path.open("ab")
+                    self._size = self._file.tell()
+                if self._size + len(data) > self.max_file_bytes:
+                    self._full = True
+                    self.counters["skipped"] += 1
+                    logger.warning("ApiDog capture file reached max_file_bytes, recording stopped: %s", self.path)
+                    return
+                self._file.write(data)
+                self._file.flush()
+                self._size += len(data)
+                self.counters["recorded"] += 1
+        except Exception:
+            logger.exception("ApiDog failed to record capture")
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "file": self.path, **self.counters}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_instances_lock = threading.Lock()
+# key: the parsed config as a tuple, so a config.json change opens a fresh Capture
+_instances: dict[tuple, Capture] = {}
+
+
+def get_capture(config: dict[str, Any] | None) -> Capture | None:
+    """Shared Capture for a parsed capture config; None when capture is off."""
+    if not config:
+        return None
+    key = tuple(sorted(config.items()))
+    inst = _instances.get(key)
+    if inst is not None:
+        return inst
+    with _instances_lock:
+        inst = _instances.get(key)
+        if inst is None:
+            inst = Capture(config)
+            _instances[key] = inst
+        return inst
+
+
+def close_all() -> None:
+    with _instances_lock:
+        items = list(_instances.values())
+        _instances.clear()
+    for inst in items:
+        try:
+            inst.close()
+        except Exception:
+            logger.exception("ApiDog failed to close capture file")
+
+
+def stats() -> dict[str, Any]:
+    with _instances_lock:
+        items = list(_instances.values())
+    return {"captures": [inst.summary() for inst in items]}
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Circuit breaker per API or upstream host: fail fast while an upstream is down, probe it with half-open trials."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_DEFAULTS: dict[str, Any] = {
+    "failure_threshold": 5,
+    "reset_seconds": 30.0,
+    "half_open_max_calls": 1,
+    "scope": "api",
+}
+
+
+def parse_breaker_config(raw: Any, base: dict[str, Any] | None = None) -> dict[str, Any] | None:
+    """
+    Parse {"failure_threshold": N, "reset_seconds": S, "half_open_max_calls": K, "scope": "api"|"host"}
+    on top of base (the global setting) or the built-in defaults. Returns None when disabled (false / 0).
+    """
+    if raw is False or raw == 0:
+        return None
+    if raw is True:
+        return dict(base or _DEFAULTS)
+    if not isinstance(raw, dict):
+        return dict(base) if base else None
+    if raw.get("enabled") is False:
+        return None
+    out = dict(base or _DEFAULTS)
+    threshold = raw.get("failure_threshold")
+    if isinstance(threshold, (int, float)) and not isinstance(threshold, bool) and threshold >= 1:
+        out["failure_threshold"] = int(threshold)
+    reset = raw.get("reset_seconds")
+    if isinstance(reset, (int, float)) and not isinstance(reset, bool) and reset > 0:
+        out["reset_seconds"] = float(reset)
+    probes = raw.get("half_open_max_calls")
+    if isinstance(probes, (int, float)) and not isinstance(probes, bool) and probes >= 1:
+        out["half_open_max_calls"] = int(probes)
+    if raw.get("scope") in ("api", "host"):
+        out["scope"] = raw["scope"]
+    return out
+
+
+class CircuitBreaker:
+    """
+    closed: calls pass; failure_threshold consecutive failures open the circuit.
+    open: calls are refused until reset_seconds have passed, then the circuit goes half-open.
+    half_open: up to half_open_max_calls trial calls pass; a success closes it, a failure reopens it.
+    """
+
+    def __init__(self, name: str, settings: dict[str, Any]) -> None:
+        self.name = name
+        self.settings = settings
+        self.failure_threshold = settings["failure_threshold"]
+        self.reset_seconds = settings["reset_seconds"]
+        self.half_open_max_calls = settings["half_open_max_calls"]
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.times_opened = 0
+        self.short_circuited = 0
+
+    def allow(self) -> bool:
+        """True if a call may go upstream now. A True in half-open state reserves a probe slot."""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                self.short_circuited += 1
+                return False
+            self.state = HALF_OPEN
+            self.probes_in_flight = 0
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_max_calls:
+                self.short_circuited += 1
+                return False
+            self.probes_in_flight += 1
+        return True
+
+    def record(self, ok: bool) -> None:
+        """Report the outcome of a call admitted by allow()."""
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            if ok:
+                self._close()
+            else:
+                self._open()
+            return
+        if ok:
+            self.consecutive_failures = 0
+            return
+        self.consecutive_failures += 1
+        if self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def abandon(self) -> None:
+        """A call admitted by allow() ended without an outcome (e.g. cancelled): free its probe slot."""
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self.consecutive_failures = 0
+
+    def retry_in(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_seconds,
+            "retry_in_seconds": round(self.retry_in(), 3),
+            "times_opened": self.times_opened,
+            "short_circuited": self.short_circuited,
+        }
+
+
+def _settings_key(settings: dict[str, Any]) -> tuple:
+    return (settings["failure_threshold"], settings["reset_seconds"], settings["half_open_max_calls"])
+
+
+_lock = threading.Lock()
+# (name, settings key) -> breaker. An API's breaker is replaced when its settings change; host breakers are
+# kept per settings, so APIs on one host with different settings each get their own instead of resetting a
+# shared one on every alternate call.
+_breakers: dict[tuple[str, tuple], CircuitBreaker] = {}
+
+
+def get_breaker(api_key: str, url: str, settings: dict[str, Any] | None) -> CircuitBreaker | None:
+    """Breaker for this call per settings["scope"] (API key or upstream host); None when disabled."""
+    if not settings:
+        return None
+    host_scope = settings.get("scope") == "host"
+    if host_scope:
+        try:
+            name = "host:" + (urlsplit(url).hostname or "").lower()
+        except ValueError:
+            name = "host:"
+    else:
+        name = f"api:{api_key}"
+    key = (name, _settings_key(settings))
+    breaker = _breakers.get(key)
+    if breaker is not None:
+        return breaker
+    with _lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            if not host_scope:
+                for stale in [k for k in _breakers if k[0] == name]:
+                    del _breakers[stale]
+            breaker = CircuitBreaker(name, settings)
+            _breakers[key] = breaker
+        return breaker
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    """Breaker state by name; a host with breakers of several settings lists each as "host:<h> <settings>"."""
+    with _lock:
+        items = list(_breakers.items())
+    names = [name for (name, _), _ in items]
+    out: dict[str, dict[str, Any]] = {}
+    for (name, settings_key), b in items:
+        label = name if names.count(name) == 1 else f"{name} {settings_key}"
+        out[label] = b.stats()
+    return out
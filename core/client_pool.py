@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Long-lived pooled httpx.AsyncClient registry, keyed by upstream host and client settings."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from .log_helper import logger
+
+DEFAULT_POOL_LIMITS: dict[str, Any] = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 15.0,
+}
+
+_lock = threading.Lock()
+# key: (loop_id, scheme, host, port, timeout, follow_redirects, limits, transport) -> (loop, client)
+_clients: dict[tuple, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def parse_pool_limits(raw: Any) -> dict[str, Any]:
+    """Parse config.json http_pool {max_connections, max_keepalive_connections, keepalive_expiry}; invalid keys fall back to defaults."""
+    out = dict(DEFAULT_POOL_LIMITS)
+    if not isinstance(raw, dict):
+        return out
+    for name in ("max_connections", "max_keepalive_connections"):
+        val = raw.get(name)
+        if isinstance(val, (int, float)) and val > 0:
+            out[name] = int(val)
+    expiry = raw.get("keepalive_expiry")
+    if isinstance(expiry, (int, float)) and expiry >= 0:
+        out["keepalive_expiry"] = float(expiry)
+    return out
+
+
+def _host_key(url: str) -> tuple[str, str, int | None]:
+    try:
+        parts = urlsplit(url)
+        return (parts.scheme.lower(), (parts.hostname or "").lower(), parts.port)
+    except ValueError:
+        return ("", "", None)
+
+
+def get_client(
+    url: str,
+    timeout: float,
+    follow_redirects: bool = True,
+    limits: dict[str, Any] | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    """
+    Return the shared client for url's host and the given settings, creating it lazily on the running loop.
+    transport replaces the network (e.g. capture replay); clients with different transports are kept apart.
+    """
+    loop = asyncio.get_running_loop()
+    lim = limits or DEFAULT_POOL_LIMITS
+    lim_key = (
+        lim.get("max_connections"),
+        lim.get("max_keepalive_connections"),
+        lim.get("keepalive_expiry"),
+    )
+    key = (id(loop),) + _host_key(url) + (float(timeout), bool(follow_redirects), lim_key, id(transport))
+    with _lock:
+        entry = _clients.get(key)
+        if entry is not None and entry[0] is loop and not entry[1].is_closed:
+            return entry[1]
+        client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=follow_redirects,
+            limits=httpx.Limits(
+                max_connections=lim_key[0],
+                max_keepalive_connections=lim_key[1],
+                keepalive_expiry=lim_key[2],
+            ),
+            transport=transport,
+        )
+        _clients[key] = (loop, client)
+        return client
+
+
+def _drain() -> list[tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]]:
+    with _lock:
+        entries = list(_clients.values())
+        _clients.clear()
+    return entries
+
+
+async def close_clients() -> None:
+    """Close every pooled client. Clients owned by another running loop are closed on that loop."""
+    current = asyncio.get_running_loop()
+    for loop, client in _drain():
+        try:
+            if loop is current:
+                await client.aclose()
+            elif loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        except Exception:
+            logger.exception("ApiDog failed to close http client")
+
+
+def close_clients_nowait() -> None:
+    """Sync variant for non-async shutdown paths: schedule aclose on each client's loop and drop references."""
+    for loop, client in _drain():
+        try:
+            if loop.is_closed():
+                continue
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            else:
+                loop.run_until_complete(client.aclose())
+        except Exception:
+            logger.exception("ApiDog failed to close http client")
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""Per-API and per-host concurrency limits with a bounded, time-limited admission queue."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+from urllib.parse import urlsplit
+
+DEFAULT_MAX_QUEUE = 50
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 10.0
+
+
+class LimiterBusy(Exception):
+    """Raised when no slot is free and the wait queue is full or the queue wait timed out."""
+
+    def __init__(self, name: str, reason: str) -> None:
+        super().__init__(f"{name}: {reason}")
+        self.name = name
+        self.reason = reason
+
+
+def parse_concurrency_config(raw: Any) -> tuple[int, int, float] | None:
+    """
+    Return (max_concurrency, max_queue, queue_timeout_seconds) or None.
+    Expects {"max_concurrency": N, "max_queue": Q, "queue_timeout_seconds": T}; Q=0 rejects as soon as all slots are busy.
+    """
+    if not isinstance(raw, dict):
+        return None
+    max_c = raw.get("max_concurrency")
+    if isinstance(max_c, bool) or not isinstance(max_c, (int, float)) or max_c < 1:
+        return None
+    max_q = raw.get("max_queue")
+    timeout = raw.get("queue_timeout_seconds")
+    return (
+        int(max_c),
+        int(max_q) if isinstance(max_q, (int, float)) and not isinstance(max_q, bool) and max_q >= 0 else DEFAULT_MAX_QUEUE,
+        float(timeout) if isinstance(timeout, (int, float)) and timeout > 0 else DEFAULT_QUEUE_TIMEOUT_SECONDS,
+    )
+
+
+def parse_host_concurrency(raw: Any) -> dict[str, tuple[int, int, float]]:
+    """config.json host_concurrency: {"api.example.com": {...same keys as per-API...}} -> {host: settings}."""
+    out: dict[str, tuple[int, int, float]] = {}
+    if isinstance(raw, dict):
+        for host, cfg in raw.items():
+            parsed = parse_concurrency_config(cfg)
+            if parsed and isinstance(host, str) and host.strip():
+                out[host.strip().lower()] = parsed
+    return out
+
+
+class ConcurrencyLimiter:
+    """Counting semaphore with FIFO hand-off, a bounded wait queue and queue wait statistics."""
+
+    def __init__(self, name: str, settings: tuple[int, int, float]) -> None:
+        self.name = name
+        self.settings = settings
+        self.max_concurrency, self.max_queue, self.queue_timeout = settings
+        self._free = self.max_concurrency
+        self._waiters: deque[asyncio.Future] = deque()
+        self.in_flight = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    async def acquire(self) -> None:
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            self._admit(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise LimiterBusy(self.name, "queue_full")
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self.queued += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            if fut.done() and not fut.cancelled():
+                # slot was handed over just as the wait timed out: pass it on
+                self._admit(0.0)
+                self.release()
+            raise LimiterBusy(self.name, "queue_timeout") from None
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # slot was handed over just as we got cancelled: give it back
+                self._admit(0.0)
+                self.release()
+            raise
+        finally:
+            try:
+                self._waiters.remove(fut)
+            except ValueError:
+                pass
+        self._admit(time.monotonic() - start)
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now (never queues)."""
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            self._admit(0.0)
+            return True
+        return False
+
+    def _admit(self, waited: float) -> None:
+        self.in_flight += 1
+        self.admitted += 1
+        self.wait_seconds_total += waited
+        if waited > self.wait_seconds_max:
+            self.wait_seconds_max = waited
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._free += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_seconds_avg": (self.wait_seconds_total / self.admitted) if self.admitted else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+
+_lock = threading.Lock()
+# "api:<key>" / "host:<host>" -> limiter; replaced when settings change (holders keep releasing the old one)
+_limiters: dict[str, ConcurrencyLimiter] = {}
+
+
+def get_limiter(name: str, settings: tuple[int, int, float]) -> ConcurrencyLimiter:
+    lim = _limiters.get(name)
+    if lim is not None and lim.settings == settings:
+        return lim
+    with _lock:
+        lim = _limiters.get(name)
+        if lim is None or lim.settings != settings:
+            lim = ConcurrencyLimiter(name, settings)
+            _limiters[name] = lim
+        return lim
+
+
+def limiters_for(
+    api_key: str,
+    api_settings: tuple[int, int, float] | None,
+    url: str,
+    host_settings: dict[str, tuple[int, int, float]] | None,
+) -> list[ConcurrencyLimiter]:
+    """Limiters that apply to one call: the API's own, then the upstream host's (if configured)."""
+    out: list[ConcurrencyLimiter] = []
+    if api_settings:
+        out.append(get_limiter(f"api:{api_key}", api_settings))
+    if host_settings:
+        try:
+            host = (urlsplit(url).hostname or "").lower()
+        except ValueError:
+            host = ""
+        settings = host_settings.get(host)
+        if settings:
+            out.append(get_limiter(f"host:{host}", settings))
+    return out
+
+
+@asynccontextmanager
+async def hold(limiters: list[ConcurrencyLimiter]) -> AsyncIterator[None]:
+    """Hold one slot of every limiter for the duration of the block (acquired in order, released in reverse)."""
+    acquired: list[ConcurrencyLimiter] = []
+    try:
+        for lim in limiters:
+            await lim.acquire()
+            acquired.append(lim)
+        yield
+    finally:
+        for lim in reversed(acquired):
+            lim.release()
+
+
+def try_acquire_all(limiters: list[ConcurrencyLimiter]) -> bool:
+    """Take one slot of every limiter without waiting, or none at all. Pair with release_all."""
+    acquired: list[ConcurrencyLimiter] = []
+    for lim in limiters:
+        if not lim.try_acquire():
+            release_all(acquired)
+            return False
+        acquired.append(lim)
+    return True
+
+
+def release_all(limiters: list[ConcurrencyLimiter]) -> None:
+    for lim in reversed(limiters):
+        lim.release()
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    """Queue depth, in-flight count and wait times per limiter."""
+    with _lock:
+        items = list(_limiters.items())
+    return {name: lim.stats() for name, lim in items}
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""Optional on-disk response cache tier under data_dir/cache/: SQLite index + content-addressed media blobs."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Hashable
+
+from .log_helper import logger
+from .types import CallResult
+
+_SCHEMA_VERSION = 2
+_PRUNE_EVERY_PUTS = 100
+
+
+def hash_key(key: Hashable) -> str:
+    """Stable hex digest of a request_key tuple (process-independent, unlike hash())."""
+    raw = json.dumps(key, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DiskCache:
+    """
+    Index rows hold the text part of a CallResult; media bodies live in blobs/<sha256[:2]>/<sha256>
+    and are handed back as media_path, so a hit never loads the media into memory.
+    Expiry uses wall-clock time so entries survive plugin reloads. Each API is held to the max_entries /
+    max_bytes of its cache config, evicting least recently used rows (accessed_at) first.
+    Blob files are written and removed under the same lock as the rows that reference them.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.blob_dir = root / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._conn = sqlite3.connect(str(root / "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # a cache: losing the last writes on power loss is fine, an fsync per hit is not
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS entries")
+            self._conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " api_key TEXT NOT NULL, key_hash TEXT NOT NULL, expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " message TEXT, result_type TEXT, media_url TEXT, media_content_type TEXT,"
+            " blob TEXT, size INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (api_key, key_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (api_key, accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_blob ON entries (blob)")
+        self._conn.commit()
+        self.prune(sweep_orphans=True)
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    def get(self, api_key: str, key_hash: str) -> tuple[CallResult, float] | None:
+        """Return (result, remaining_ttl_seconds) or None when missing/expired/blob gone."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, message, result_type, media_url, media_content_type, blob"
+                " FROM entries WHERE api_key=? AND key_hash=?",
+                (api_key, key_hash),
+            ).fetchone()
+            if row is None:
+                return None
+            expires_at, message, result_type, media_url, media_content_type, blob = row
+            remaining = expires_at - now
+            if remaining <= 0:
+                return None
+            media_path = None
+            if blob:
+                path = self._blob_path(blob)
+                if not path.is_file():
+                    return None
+                media_path = str(path)
+            self._conn.execute(
+                "UPDATE entries SET accessed_at=? WHERE api_key=? AND key_hash=?", (now, api_key, key_hash)
+            )
+            self._conn.commit()
+        result = CallResult(
+            success=True,
+            message=message or "",
+            result_type=result_type or "text",
+            media_url=media_url,
+            media_content_type=media_content_type,
+            media_path=media_path,
+        )
+        return result, remaining
+
+    def _write_blob(self, result: CallResult) -> tuple[str | None, int]:
+        """Store the media body as a blob (caller holds the lock); returns (digest, media size)."""
+        if result.media_bytes:
+            blob = hashlib.sha256(result.media_bytes).hexdigest()
+            path = self._blob_path(blob)
+            if not path.is_file():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".blob.")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(result.media_bytes)
+                    os.replace(tmp, path)
+                except Exception:
+                    Path(tmp).unlink(missing_ok=True)
+                    raise
+            return blob, len(result.media_bytes)
+        if result.media_file is not None:
+            blob = _file_digest(result.media_file.path)
+            path = self._blob_path(blob)
+            if not path.is_file():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".blob.")
+                os.close(fd)
+                try:
+                    shutil.copyfile(result.media_file.path, tmp)
+                    os.replace(tmp, path)
+                except Exception:
+                    Path(tmp).unlink(missing_ok=True)
+                    raise
+            return blob, result.media_file.size
+        return None, 0
+
+    def put(
+        self,
+        api_key: str,
+        key_hash: str,
+        result: CallResult,
+        ttl: float,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+    ) -> None:
+        """Store result for ttl seconds, then evict the API's least recently used rows beyond max_entries / max_bytes."""
+        if result.media_path and not result.media_bytes and result.media_file is None:
+            # already a blob of this cache (disk hit promoted to memory): nothing to persist
+            return
+        now = time.time()
+        with self._lock:
+            blob, media_size = self._write_blob(result)
+            size = len((result.message or "").encode("utf-8")) + media_size
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries"
+                " (api_key, key_hash, expires_at, accessed_at, message, result_type, media_url,"
+                " media_content_type, blob, size)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    api_key,
+                    key_hash,
+                    now + ttl,
+                    now,
+                    result.message,
+                    result.result_type,
+                    result.media_url,
+                    result.media_content_type,
+                    blob,
+                    size,
+                ),
+            )
+            self._evict(api_key, max_entries, max_bytes)
+            self._conn.commit()
+            self._puts += 1
+            due = self._puts % _PRUNE_EVERY_PUTS == 0
+        if due:
+            self.prune()
+
+    def _evict(self, api_key: str, max_entries: int | None, max_bytes: int | None) -> None:
+        """Drop the API's least recently used rows until it is within both caps (caller holds the lock)."""
+        if not max_entries and not max_bytes:
+            return
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE api_key=?", (api_key,)
+        ).fetchone()
+        if (not max_entries or count <= max_entries) and (not max_bytes or total <= max_bytes):
+            return
+        victims: list[str] = []
+        blobs: set[str] = set()
+        rows = self._conn.execute(
+            "SELECT key_hash, size, blob FROM entries WHERE api_key=? ORDER BY accessed_at", (api_key,)
+        )
+        for key_hash, size, blob in rows:
+            if (not max_entries or count <= max_entries) and (not max_bytes or total <= max_bytes):
+                break
+            victims.append(key_hash)
+            if blob:
+                blobs.add(blob)
+            count -= 1
+            total -= size
+        self._conn.executemany(
+            "DELETE FROM entries WHERE api_key=? AND key_hash=?", [(api_key, k) for k in victims]
+        )
+        self._unlink_unreferenced(blobs)
+
+    def _unlink_unreferenced(self, blobs: set[str]) -> None:
+        """Remove those blob files no remaining row points at (caller holds the lock)."""
+        for blob in blobs:
+            if self._conn.execute("SELECT 1 FROM entries WHERE blob=? LIMIT 1", (blob,)).fetchone() is None:
+                self._blob_path(blob).unlink(missing_ok=True)
+
+    def prune(self, sweep_orphans: bool = False) -> None:
+        """
+        Delete expired rows and the blobs only they referenced. sweep_orphans also removes every blob file
+        no row references (left behind by a crash); it walks the whole blob directory, so it runs at open only.
+        """
+        with self._lock:
+            now = time.time()
+            blobs = {
+                r[0]
+                for r in self._conn.execute(
+                    "SELECT DISTINCT blob FROM entries WHERE expires_at <= ? AND blob IS NOT NULL", (now,)
+                )
+            }
+            self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            self._unlink_unreferenced(blobs)
+            self._conn.commit()
+            if not sweep_orphans:
+                return
+            live = {r[0] for r in self._conn.execute("SELECT DISTINCT blob FROM entries WHERE blob IS NOT NULL")}
+            for path in self.blob_dir.glob("*/*"):
+                if path.name not in live:
+                    path.unlink(missing_ok=True)
+
+    def summary(self) -> dict[str, int]:
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": row[0], "bytes": row[1]}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_instances_lock = threading.Lock()
+_instances: dict[str, DiskCache] = {}
+
+
+def get_disk_cache(data_dir: Path) -> DiskCache | None:
+    """Lazily open data_dir/cache/; None when it cannot be opened (caching then stays memory-only)."""
+    key = str(data_dir)
+    inst = _instances.get(key)
+    if inst is not None:
+        return inst
+    with _instances_lock:
+        inst = _instances.get(key)
+        if inst is None:
+            try:
+                inst = DiskCache(data_dir / "cache")
+            except Exception:
+                logger.exception("ApiDog failed to open disk cache at %s", data_dir / "cache")
+                return None
+            _instances[key] = inst
+        return inst
+
+
+def close_all() -> None:
+    with _instances_lock:
+        items = list(_instances.values())
+        _instances.clear()
+    for inst in items:
+        try:
+            inst.close()
+        except Exception:
+            logger.exception("ApiDog failed to close disk cache")
+
+
+def stats() -> dict[str, Any]:
+    with _instances_lock:
+        items = list(_instances.items())
+    return {key: inst.summary() for key, inst in items}
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Hedged requests: if an attempt is slow, fire duplicates and keep the first good response."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable
+
+from . import concurrency
+from . import rate_limit as rate_limit_mod
+
+# Upper bound on duplicates per attempt, whatever the config says.
+MAX_HEDGES = 5
+
+_stats_lock = threading.Lock()
+# api_key -> counters
+_stats: dict[str, dict[str, int]] = {}
+
+
+def parse_hedge_config(raw: Any) -> tuple[float, int] | None:
+    """Parse {"after_ms": N, "max": K} -> (after_seconds, max_hedges). None when absent or invalid."""
+    if not isinstance(raw, dict):
+        return None
+    after = raw.get("after_ms")
+    if not isinstance(after, (int, float)) or isinstance(after, bool) or after <= 0:
+        return None
+    max_h = raw.get("max", 1)
+    if not isinstance(max_h, (int, float)) or isinstance(max_h, bool) or max_h < 1:
+        return None
+    return float(after) / 1000.0, min(int(max_h), MAX_HEDGES)
+
+
+def _count(api_key: str, name: str) -> None:
+    with _stats_lock:
+        c = _stats.get(api_key)
+        if c is None:
+            c = _stats[api_key] = {"calls": 0, "hedges_fired": 0, "hedges_won": 0, "hedges_skipped": 0}
+        c[name] += 1
+
+
+def _discard(task: asyncio.Task) -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+async def run(
+    send: Callable[[], Awaitable[Any]],
+    settings: tuple[float, int],
+    limiters: list[concurrency.ConcurrencyLimiter],
+    api_key: str,
+    global_limit: tuple[int, int] | None,
+    is_good: Callable[[Any], bool],
+) -> Any:
+    """
+    Run send() under the concurrency limiters. Each time after_seconds pass without a good response,
+    start one more send() (up to max_hedges) if a slot is free in every limiter right now and
+    rate_limit_global still allows a call; a hedge never queues. The first response passing is_good
+    wins and the others are cancelled. If none is good, the last response is returned, or the last
+    exception raised when there is no response at all.
+    """
+    after, max_hedges = settings
+    _count(api_key, "calls")
+
+    async def primary() -> Any:
+        async with concurrency.hold(limiters):
+            return await send()
+
+    def release(_: asyncio.Task) -> None:
+        # a done callback, so slots come back even if the task is cancelled before it starts
+        concurrency.release_all(limiters)
+
+    tasks: dict[asyncio.Task, bool] = {asyncio.ensure_future(primary()): False}
+    pending = set(tasks)
+    hedges_left = max_hedges
+    last_result: Any = None
+    has_result = False
+    last_exc: BaseException | None = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=after if hedges_left > 0 else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                hedges_left -= 1
+                # slots first: a rate-limit call is recorded only once the hedge is sure to fire
+                if not concurrency.try_acquire_all(limiters):
+                    _count(api_key, "hedges_skipped")
+                    continue
+                ok, _ = rate_limit_mod.check_and_record_all(global_limit, None, None, api_key)
+                if not ok:
+                    concurrency.release_all(limiters)
+                    _count(api_key, "hedges_skipped")
+                    continue
+                t = asyncio.ensure_future(send())
+                t.add_done_callback(release)
+                tasks[t] = True
+                pending.add(t)
+                _count(api_key, "hedges_fired")
+                continue
+            winner = None
+            for t in done:
+                exc = t.exception()
+                if exc is not None:
+                    last_exc = exc
+                elif winner is None and is_good(t.result()):
+                    winner = t
+                else:
+                    last_result, has_result = t.result(), True
+            if winner is not None:
+                if tasks[winner]:
+                    _count(api_key, "hedges_won")
+                return winner.result()
+    finally:
+        for t in pending:
+            t.cancel()
+            t.add_done_callback(_discard)
+    if has_result or last_exc is None:
+        return last_result
+    raise last_exc
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """Hedge counters per API: calls, hedges_fired, hedges_won, hedges_skipped (limiter full or rate limited)."""
+    with _stats_lock:
+        return {k: dict(v) for k, v in _stats.items()}
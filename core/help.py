@@ -1,41 +1,155 @@
 # -*- coding: utf-8 -*-
-"""Build help message for /api help and /api help <接口名>."""
+"""Build help message for /api help, /api help <接口名>, /api help page=N and /api help q=关键词."""
 
 from __future__ import annotations
 
 import re
-from typing import Any
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Sequence
 
-from . import loader
+PAGE_SIZE = 20
+# memoized listings (one per distinct set of visible APIs) and rendered pages/searches per listing
+MAX_LISTINGS = 256
+MAX_PAGES_PER_LISTING = 64
 
+_USAGE = "用法: /api <接口名> [参数...]"
 
-def build_help_message(apis: list[dict], target: str | None = None) -> str:
+
+class HelpEntry:
     """
-    target is None or empty: list all APIs (command - name, optional description).
-    target set: detail for one API (name, command, optional help_text, params, example).
+    Help text of one API, rendered once when the registry is built: the list line, the detail page
+    (placeholder regexes run here, not per /api help) and the lowercased text that q= searches.
     """
-    if not target or not (target := target.strip()):
-        return _build_list(apis)
 
-    api = loader.find_api_by_id_or_command(apis, target)
-    if not api:
-        return f"未找到接口: {target}。"
-    return _build_detail(api)
+    __slots__ = ("keys", "line", "detail", "search_text")
 
-
-def _build_list(apis: list[dict]) -> str:
-    lines = ["用法: /api <接口名> [参数...]", ""]
-    for api in apis:
-        cmd = api.get("command") or api.get("id") or "?"
+    def __init__(self, api: dict) -> None:
+        api_id = api.get("id")
+        command = api.get("command")
+        self.keys: tuple[str, ...] = tuple(k for k in (api_id, command) if isinstance(k, str) and k)
+        cmd = command or api_id or "?"
         name = api.get("name") or cmd
         desc = api.get("description")
         if desc and isinstance(desc, str):
-            lines.append(f"· {cmd} - {name}：{desc}")
+            self.line = f"· {cmd} - {name}：{desc}"
         else:
-            lines.append(f"· {cmd} - {name}")
+            self.line = f"· {cmd} - {name}"
+        self.detail = _build_detail(api)
+        self.search_text = " ".join(
+            str(v) for v in (api_id, command, api.get("name"), desc) if isinstance(v, str)
+        ).lower()
+
+
+class _Listing:
+    """Help for one set of visible APIs: key lookup plus rendered pages and search results."""
+
+    __slots__ = ("entries", "by_key", "pages", "lock")
+
+    def __init__(self, entries: tuple[HelpEntry, ...]) -> None:
+        self.entries = entries
+        by_key: dict[str, HelpEntry] = {}
+        for e in entries:
+            for k in e.keys:
+                by_key.setdefault(k, e)
+        self.by_key = by_key
+        self.pages: OrderedDict[tuple[str, int], str] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def page(self, query: str, page: int) -> str:
+        key = (query, page)
+        with self.lock:
+            hit = self.pages.get(key)
+            if hit is not None:
+                self.pages.move_to_end(key)
+                return hit
+        text = _render_page(self.entries, query, page)
+        with self.lock:
+            self.pages[key] = text
+            if len(self.pages) > MAX_PAGES_PER_LISTING:
+                self.pages.popitem(last=False)
+        return text
+
+
+_listings_lock = threading.Lock()
+_listings: OrderedDict[tuple[HelpEntry, ...], _Listing] = OrderedDict()
+
+
+def _listing(entries: tuple[HelpEntry, ...]) -> _Listing:
+    # HelpEntry hashes by identity and the key holds the entries alive, so equal keys mean the same APIs
+    with _listings_lock:
+        listing = _listings.get(entries)
+        if listing is not None:
+            _listings.move_to_end(entries)
+            return listing
+        listing = _listings[entries] = _Listing(entries)
+        if len(_listings) > MAX_LISTINGS:
+            _listings.popitem(last=False)
+        return listing
+
+
+def _parse_page(raw: Any) -> int:
+    try:
+        return max(1, int(str(raw).strip()))
+    except (TypeError, ValueError):
+        return 1
+
+
+def render_help(
+    entries: Iterable[HelpEntry],
+    target: str | None = None,
+    page: Any = None,
+    query: str | None = None,
+) -> str:
+    """
+    entries: precomputed HelpEntry of the APIs the caller may see, in file order.
+    target set: detail for that API. Otherwise one page of the list (page is 1-based, out-of-range pages
+    show the nearest page), filtered to APIs whose id/command/name/description contain every word of query.
+    """
+    listing = _listing(entries if isinstance(entries, tuple) else tuple(entries))
+    if target and (target := target.strip()):
+        entry = listing.by_key.get(target)
+        if entry is None:
+            return f"未找到接口: {target}。"
+        return entry.detail
+    q = " ".join((query or "").lower().split())
+    return listing.page(q, _parse_page(page))
+
+
+def _render_page(entries: Sequence[HelpEntry], query: str, page: int) -> str:
+    if query:
+        words = query.split()
+        entries = [e for e in entries if all(w in e.search_text for w in words)]
+        if not entries:
+            return f"没有匹配“{query}”的接口。发送 /api help 查看全部接口。"
+    total = len(entries)
+    pages = max(1, -(-total // PAGE_SIZE))
+    page = min(page, pages)
+    start = (page - 1) * PAGE_SIZE
+    lines = [_USAGE, ""]
+    if query:
+        lines.append(f"搜索“{query}”：共 {total} 个匹配")
+    lines.extend(e.line for e in entries[start : start + PAGE_SIZE])
+    if pages > 1:
+        q_arg = (f' "q={query}"' if " " in query else f" q={query}") if query else ""
+        footer = f"第 {page}/{pages} 页，共 {total} 个接口。"
+        if page < pages:
+            footer += f"下一页: /api help{q_arg} page={page + 1}"
+        lines.extend(["", footer])
+    if not query and pages > 1:
+        lines.append("搜索: /api help q=关键词")
     return "\n".join(lines)
 
 
+def build_help_message(apis: list[dict], target: str | None = None) -> str:
+    """
+    target is None or empty: list all APIs (command - name, optional description), first page.
+    target set: detail for one API (name, command, optional help_text, params, example).
+    Renders from scratch; /api help uses the HelpEntry precomputed on each registry entry instead.
+    """
+    return render_help([HelpEntry(a) for a in apis], target)
+
+
 def _build_detail(api: dict) -> str:
     name = api.get("name") or api.get("id") or "?"
     command = api.get("command") or api.get("id") or "?"
@@ -46,7 +160,9 @@ def _build_detail(api: dict) -> str:
         lines.append(help_text.strip())
         lines.append("")
 
-    params = api.get("params") or {}
+    params = api.get("params")
+    if not isinstance(params, dict):
+        params = {}
     pos_names, named_optional, named_required = _infer_params(params)
     if pos_names or named_optional or named_required:
         parts = []
@@ -76,7 +192,9 @@ def _infer_params(params: dict[str, Any]) -> tuple[list[str], list[str], list[st
     named_required: list[str] = []
     seen_named: set[str] = set()
 
-    for key, val in (params or {}).items():
+    if not isinstance(params, dict):
+        return [], [], []
+    for key, val in params.items():
         s = str(val) if val is not None else ""
         m_args = _PLACEHOLDER_ARGS.search(s)
         m_named = _PLACEHOLDER_NAMED.search(s)
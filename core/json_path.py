@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Compiled response_path accessors: data.url, items.0.url, items[0].url, items[*].title, items[1:3]."""
+
+from __future__ import annotations
+
+import json
+import re
+from functools import lru_cache
+from typing import Any
+
+MISSING: Any = object()
+
+_KEY, _INDEX, _ALL, _SLICE = 0, 1, 2, 3
+_BRACKET = re.compile(r"\[([^\]]*)\]")
+
+
+def _parse_bracket(inner: str) -> tuple:
+    inner = inner.strip()
+    if inner in ("*", ""):
+        return (_ALL,)
+    if ":" in inner:
+        parts = inner.split(":")
+        if len(parts) > 3:
+            raise ValueError(inner)
+        bounds = [int(p) if p.strip() else None for p in parts]
+        return (_SLICE, slice(*bounds))
+    return (_INDEX, int(inner))
+
+
+def _parse_part(part: str) -> list[tuple]:
+    """
+    Steps of one dot-separated part: name, 0, *, or name followed by [..] groups and nothing else.
+    Raises ValueError for anything else (bad index, text after a bracket).
+    """
+    steps: list[tuple] = []
+    m = _BRACKET.search(part)
+    head = part if m is None else part[:m.start()]
+    if head == "*":
+        steps.append((_ALL,))
+    elif head.lstrip("-").isdigit():
+        # dict key "0" or list index 0, decided at lookup time
+        steps.append((_INDEX, int(head), head))
+    elif head:
+        steps.append((_KEY, head))
+    end = len(head)
+    while m is not None:
+        steps.append(_parse_bracket(m.group(1)))
+        end = m.end()
+        m = _BRACKET.match(part, end)
+    if end != len(part):
+        raise ValueError(part)
+    return steps
+
+
+class PathAccessor:
+    """
+    A response_path compiled once into lookup steps. Wildcards ([*] / *) and slices fan out:
+    later steps apply to each element and get() returns the list of values found.
+    """
+
+    __slots__ = ("path", "_steps")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        steps: list[tuple] = []
+        for part in path.split("."):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                steps.extend(_parse_part(part))
+            except ValueError:
+                # malformed index/slice or trailing text: treat the whole part as a plain key, as before
+                steps.append((_KEY, part))
+        self._steps = tuple(steps)
+
+    def get(self, obj: Any) -> Any:
+        """Value at path, or MISSING when a step does not resolve (fan-out steps skip missing elements)."""
+        return _walk(obj, self._steps, 0)
+
+
+def _walk(obj: Any, steps: tuple, i: int) -> Any:
+    n = len(steps)
+    while i < n:
+        step = steps[i]
+        kind = step[0]
+        if kind == _KEY:
+            if isinstance(obj, dict) and step[1] in obj:
+                obj = obj[step[1]]
+            else:
+                return MISSING
+        elif kind == _INDEX:
+            if isinstance(obj, list):
+                try:
+                    obj = obj[step[1]]
+                except IndexError:
+                    return MISSING
+            elif isinstance(obj, dict) and len(step) > 2 and step[2] in obj:
+                obj = obj[step[2]]
+            else:
+                return MISSING
+        else:
+            if isinstance(obj, list):
+                items = obj if kind == _ALL else obj[step[1]]
+            elif isinstance(obj, dict) and kind == _ALL:
+                items = list(obj.values())
+            else:
+                return MISSING
+            out = []
+            for item in items:
+                v = _walk(item, steps, i + 1)
+                if v is not MISSING:
+                    out.append(v)
+            return out
+        i += 1
+    return obj
+
+
+@lru_cache(maxsize=1024)
+def compile_path(path: str) -> PathAccessor:
+    return PathAccessor(path)
+
+
+# bodies up to this many times the cap are dumped whole with json.dumps (the C encoder for compact output);
+# stopping early in the pure-Python iterencode only pays off for large payloads
+FULL_DUMP_RATIO = 4
+
+
+def dump_capped(obj: Any, limit: int, indent: int | None = 2, size_hint: int | None = None) -> str:
+    """
+    json.dumps(obj, ensure_ascii=False) truncated to limit chars. size_hint is the length of the body obj was
+    parsed from; without one, or when it is large, serialization stops once limit is reached.
+    """
+    separators = None if indent is not None else (",", ":")
+    if size_hint is not None and size_hint <= limit * FULL_DUMP_RATIO:
+        return json.dumps(obj, ensure_ascii=False, indent=indent, separators=separators, default=str)[:limit]
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=indent, separators=separators, default=str)
+    chunks: list[str] = []
+    total = 0
+    # iterencode uses the pure-Python generator, so stopping early really skips the rest
+    for chunk in encoder.iterencode(obj):
+        chunks.append(chunk)
+        total += len(chunk)
+        if total >= limit:
+            break
+    return "".join(chunks)[:limit]
+
+
+def format_value(value: Any, limit: int, size_hint: int | None = None) -> str:
+    """
+    Text for a response_path result: strings as-is, lists one item per line, containers as compact JSON;
+    output is capped at limit chars. size_hint as for dump_capped.
+    """
+    if isinstance(value, str):
+        return value[:limit]
+    if isinstance(value, list):
+        lines: list[str] = []
+        total = 0
+        for item in value:
+            if isinstance(item, str):
+                line = item
+            elif isinstance(item, (dict, list)):
+                line = dump_capped(item, limit - total, indent=None, size_hint=size_hint)
+            else:
+                line = str(item)
+            lines.append(line)
+            total += len(line) + 1
+            if total >= limit:
+                break
+        return "\n".join(lines)[:limit]
+    if isinstance(value, dict):
+        return dump_capped(value, limit, indent=None, size_hint=size_hint)
+    return str(value)[:limit]
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+JSON backend: orjson when installed, stdlib json otherwise. loads gives the same values either way; dumps gives
+the same layout, but floats in exponent form differ (orjson 1e16, stdlib 1e+16) and orjson writes NaN/Infinity
+as null where stdlib raises ValueError.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson as _orjson
+except ImportError:  # optional speedup
+    _orjson = None
+
+BACKEND = "orjson" if _orjson is not None else "json"
+
+
+def loads(raw: bytes | str) -> Any:
+    """Parse JSON; raises ValueError on invalid input."""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(raw)
+        except _orjson.JSONDecodeError:
+            # orjson rejects a few inputs stdlib accepts (e.g. integers over 64 bits); let stdlib decide
+            pass
+    return json.loads(raw)
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """
+    Serialize to str with non-ASCII kept as-is (ensure_ascii=False): compact ({"a":1}) like orjson, or with
+    indent=True 2-space indented. Raises ValueError on NaN/Infinity without orjson.
+    """
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(obj, option=_orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+        except TypeError:
+            # non-str keys and other types orjson does not serialize
+            pass
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2, allow_nan=False)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
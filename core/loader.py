@@ -3,25 +3,48 @@
 
 from __future__ import annotations
 
+import itertools
 import json
 import threading
 from pathlib import Path
-from typing import Any
-
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping
+
+from .cache import parse_cache_config
+from .capture import parse_capture_config
+from .circuit import parse_breaker_config
+from .client_pool import parse_pool_limits
+from .concurrency import parse_concurrency_config, parse_host_concurrency
+from .hedge import parse_hedge_config
+from .help import HelpEntry
+from .json_path import PathAccessor, compile_path
 from .log_helper import logger
+from .parse_args import Template, compile_template
+from .permission import GroupIndex, allowed_names
+from .rate_limit import parse_rate_limit, parse_rate_limit_global
+from .retry import build_policy, parse_retry_config
+from .suggest import SuggestIndex
+from .trace import parse_slow_call_ms
 
 _CACHE_MISSING = object()
 _cache_lock = threading.RLock()
 # key: (resolved_data_dir, name) -> value
 _cache: dict[tuple[str, str], Any] = {}
+# data_dir -> resolved key; resolve() stats the filesystem, so memoize it for the per-call path
+_ddir_keys: dict[Path, str] = {}
 
 
 def _ddir_key(data_dir: Path) -> str:
+    key = _ddir_keys.get(data_dir)
+    if key is not None:
+        return key
     try:
-        return str(data_dir.resolve())
+        key = str(data_dir.resolve())
     except Exception:
         # best effort: avoid breaking load in odd path cases
-        return str(data_dir)
+        key = str(data_dir)
+    _ddir_keys[data_dir] = key
+    return key
 
 
 def _cache_get(data_dir: Path, name: str) -> Any:
@@ -43,7 +66,11 @@ def _cache_invalidate(data_dir: Path, name: str) -> None:
 
 
 def invalidate_apis(data_dir: Path) -> None:
-    _cache_invalidate(data_dir, "apis")
+    """Drop raw apis and the compiled registry together; the next load_registry publishes a new version."""
+    key = _ddir_key(data_dir)
+    with _cache_lock:
+        _cache.pop((key, "apis"), None)
+        _cache.pop((key, "registry"), None)
 
 
 def invalidate_auth(data_dir: Path) -> None:
@@ -51,76 +78,127 @@ def invalidate_auth(data_dir: Path) -> None:
 
 
 def invalidate_groups(data_dir: Path) -> None:
-    _cache_invalidate(data_dir, "groups")
+    key = _ddir_key(data_dir)
+    with _cache_lock:
+        _cache.pop((key, "groups"), None)
+        _cache.pop((key, "group_index"), None)
+
+
+def invalidate_schedules(data_dir: Path) -> None:
+    _cache_invalidate(data_dir, "schedules")
 
 
 def invalidate_config(data_dir: Path) -> None:
-    _cache_invalidate(data_dir, "config")
+    """Config feeds merged client options, so the compiled registry is dropped with it."""
+    key = _ddir_key(data_dir)
+    with _cache_lock:
+        _cache.pop((key, "config"), None)
+        _cache.pop((key, "registry"), None)
 
 
-def load_json(path: Path, default: Any) -> Any:
+def load_json(path: Path, default: Any, strict: bool = False) -> Any:
+    """
+    Parsed JSON of path, or default when the file is missing. An unreadable or invalid file logs a warning
+    and gives default, unless strict: then it raises ValueError and the caller keeps what it had.
+    """
     if not path.is_file():
         return default
     try:
         with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+            value = json.load(f)
     except Exception as e:
+        if strict:
+            raise ValueError(f"{path.name}: {e}") from e
         logger.warning("Failed to load %s: %s", path, e)
         return default
+    if strict and not isinstance(value, dict):
+        raise ValueError(f"{path.name}: top level must be an object")
+    return value
 
 
-def load_apis(data_dir: Path) -> list[dict]:
-    cached = _cache_get(data_dir, "apis")
+def _load(data_dir: Path, name: str) -> Any:
+    """Cached value of one data file; read from disk only on the first call or after an invalidate."""
+    cached = _cache_get(data_dir, name)
     if cached is not _CACHE_MISSING:
         return cached
-    path = data_dir / "apis.json"
-    raw = load_json(path, {"apis": []})
+    value = _READERS[name](data_dir)
+    _cache_set(data_dir, name, value)
+    return value
+
+
+def _read_apis(data_dir: Path, strict: bool = False) -> list[dict]:
+    raw = load_json(data_dir / "apis.json", {"apis": []}, strict)
     apis = raw.get("apis", []) if isinstance(raw, dict) else []
-    out = apis if isinstance(apis, list) else []
-    _cache_set(data_dir, "apis", out)
-    return out
+    if strict and not isinstance(apis, list):
+        raise ValueError('apis.json: "apis" must be a list')
+    return apis if isinstance(apis, list) else []
+
+
+def load_apis(data_dir: Path) -> list[dict]:
+    return _load(data_dir, "apis")
+
+
+def _read_auth(data_dir: Path, strict: bool = False) -> dict[str, Any]:
+    out = load_json(data_dir / "auth.json", {}, strict)
+    return out if isinstance(out, dict) else {}
 
 
 def load_auth(data_dir: Path) -> dict[str, Any]:
-    cached = _cache_get(data_dir, "auth")
-    if cached is not _CACHE_MISSING:
-        return cached
-    path = data_dir / "auth.json"
-    out = load_json(path, {})
-    if not isinstance(out, dict):
-        out = {}
-    _cache_set(data_dir, "auth", out)
-    return out
+    return _load(data_dir, "auth")
 
 
-def load_groups(data_dir: Path) -> dict[str, Any]:
-    """Load groups.json. Returns {"user_groups": {...}, "group_groups": {...}}; missing file or keys -> empty dict."""
-    cached = _cache_get(data_dir, "groups")
-    if cached is not _CACHE_MISSING:
-        return cached
-    path = data_dir / "groups.json"
-    raw = load_json(path, {})
+def _read_groups(data_dir: Path, strict: bool = False) -> dict[str, Any]:
+    raw = load_json(data_dir / "groups.json", {}, strict)
     if not isinstance(raw, dict):
-        out = {"user_groups": {}, "group_groups": {}}
-        _cache_set(data_dir, "groups", out)
-        return out
+        return {"user_groups": {}, "group_groups": {}}
     user_groups = raw.get("user_groups") if isinstance(raw.get("user_groups"), dict) else {}
     group_groups = raw.get("group_groups") if isinstance(raw.get("group_groups"), dict) else {}
-    out = {"user_groups": user_groups, "group_groups": group_groups}
-    _cache_set(data_dir, "groups", out)
-    return out
+    return {"user_groups": user_groups, "group_groups": group_groups}
 
 
-DEFAULT_RETRY_STATUSES: frozenset[int] = frozenset({500, 502, 503, 429})
+def load_groups(data_dir: Path) -> dict[str, Any]:
+    """Load groups.json. Returns {"user_groups": {...}, "group_groups": {...}}; missing file or keys -> empty dict."""
+    return _load(data_dir, "groups")
 
 
-def load_config(data_dir: Path) -> dict[str, Any]:
-    """Load config.json for global defaults (timeout, retry, retry_statuses). Missing file or keys use built-in defaults."""
-    cached = _cache_get(data_dir, "config")
+def load_group_index(data_dir: Path) -> GroupIndex:
+    """groups.json as a GroupIndex (member sets and reverse maps), built once per groups.json load."""
+    cached = _cache_get(data_dir, "group_index")
     if cached is not _CACHE_MISSING:
         return cached
-    path = data_dir / "config.json"
-    raw = load_json(path, {})
+    index = GroupIndex(load_groups(data_dir))
+    _cache_set(data_dir, "group_index", index)
+    return index
+
+
+DEFAULT_RETRY_STATUSES: frozenset[int] = frozenset({500, 502, 503, 429})
+DEFAULT_MAX_RESPONSE_BYTES = 100 * 1024 * 1024
+
+
+DEFAULT_API_PORT = 5787
+
+
+def _parse_api_port(val: Any) -> int:
+    if val is None:
+        return DEFAULT_API_PORT
+    try:
+        port = int(val)
+    except (TypeError, ValueError):
+        return DEFAULT_API_PORT
+    if 1 <= port <= 65535:
+        return port
+    return DEFAULT_API_PORT
+
+
+def _parse_max_response_bytes(val: Any, default: int | None) -> int | None:
+    """Positive int -> limit, 0 -> unlimited, anything else -> default."""
+    if isinstance(val, bool) or not isinstance(val, (int, float)) or val < 0:
+        return default
+    return int(val) or None
+
+
+def _read_config(data_dir: Path, strict: bool = False) -> dict[str, Any]:
+    raw = load_json(data_dir / "config.json", {}, strict)
     if not isinstance(raw, dict):
         raw = {}
     timeout = raw.get("timeout_seconds")
@@ -128,16 +206,7 @@ def load_config(data_dir: Path) -> dict[str, Any]:
         timeout_seconds = float(timeout)
     else:
         timeout_seconds = 30.0
-    retry_raw = raw.get("retry")
-    retry: dict[str, Any] | None = None
-    if isinstance(retry_raw, dict):
-        max_a = retry_raw.get("max_attempts")
-        backoff = retry_raw.get("backoff_seconds", 1)
-        if isinstance(max_a, (int, float)) and max_a > 0:
-            retry = {
-                "max_attempts": int(max_a),
-                "backoff_seconds": float(backoff) if isinstance(backoff, (int, float)) else 1.0,
-            }
+    retry = parse_retry_config(raw.get("retry"))
     raw_statuses = raw.get("retry_statuses")
     if isinstance(raw_statuses, list):
         codes = []
@@ -151,37 +220,32 @@ def load_config(data_dir: Path) -> dict[str, Any]:
         retry_statuses = frozenset(codes) if codes else DEFAULT_RETRY_STATUSES
     else:
         retry_statuses = DEFAULT_RETRY_STATUSES
-    out = {
+    return {
         "timeout_seconds": timeout_seconds,
         "retry": retry,
         "retry_statuses": retry_statuses,
+        "http_pool": parse_pool_limits(raw.get("http_pool")),
+        "max_response_bytes": _parse_max_response_bytes(raw.get("max_response_bytes"), DEFAULT_MAX_RESPONSE_BYTES),
+        "host_concurrency": parse_host_concurrency(raw.get("host_concurrency")),
+        "circuit_breaker": parse_breaker_config(raw.get("circuit_breaker")),
+        "api_port": _parse_api_port(raw.get("api_port")),
+        "slow_call_seconds": parse_slow_call_ms(raw.get("slow_call_ms")),
+        "capture": parse_capture_config(raw.get("capture"), data_dir),
     }
-    _cache_set(data_dir, "config", out)
-    return out
 
 
-DEFAULT_API_PORT = 5787
+def load_config(data_dir: Path) -> dict[str, Any]:
+    """Load config.json for global defaults (timeout, retry, retry_statuses, http_pool, max_response_bytes, host_concurrency, circuit_breaker, api_port, slow_call_ms, capture). Missing file or keys use built-in defaults."""
+    return _load(data_dir, "config")
 
 
 def get_api_port(data_dir: Path) -> int:
-    """Read api_port from config.json; must be 1-65535, else return DEFAULT_API_PORT."""
-    raw = load_json(data_dir / "config.json", {})
-    if not isinstance(raw, dict):
-        return DEFAULT_API_PORT
-    val = raw.get("api_port")
-    if val is None:
-        return DEFAULT_API_PORT
-    try:
-        port = int(val)
-    except (TypeError, ValueError):
-        return DEFAULT_API_PORT
-    if 1 <= port <= 65535:
-        return port
-    return DEFAULT_API_PORT
+    """api_port from config.json; must be 1-65535, else DEFAULT_API_PORT."""
+    return load_config(data_dir)["api_port"]
 
 
 def merge_client_options(global_config: dict[str, Any], api: dict) -> dict[str, Any]:
-    """Merge global config with per-API overrides. Returns effective timeout_seconds and retry."""
+    """Merge global config with per-API overrides. Returns effective timeout_seconds, retry, retry_policy (RetryPolicy), follow_redirects, http_pool, max_response_bytes, circuit_breaker and capture."""
     timeout = api.get("timeout_seconds")
     if isinstance(timeout, (int, float)) and timeout > 0:
         timeout_seconds = float(timeout)
@@ -191,25 +255,34 @@ def merge_client_options(global_config: dict[str, Any], api: dict) -> dict[str,
     if retry_override is False or retry_override == 0:
         retry = None
     elif isinstance(retry_override, dict):
-        max_a = retry_override.get("max_attempts")
-        backoff = retry_override.get("backoff_seconds", 1)
-        if isinstance(max_a, (int, float)) and max_a > 0:
-            retry = {
-                "max_attempts": int(max_a),
-                "backoff_seconds": float(backoff) if isinstance(backoff, (int, float)) else 1.0,
-            }
+        # without its own max_attempts a per-API retry object has always meant no retries; only the other
+        # fields fall back to config.json
+        if "max_attempts" in retry_override:
+            retry = parse_retry_config(retry_override, global_config.get("retry"))
         else:
             retry = None
     else:
         retry = global_config.get("retry")
     retry_statuses = global_config.get("retry_statuses", DEFAULT_RETRY_STATUSES)
-    return {"timeout_seconds": timeout_seconds, "retry": retry, "retry_statuses": retry_statuses}
+    follow_redirects = api.get("follow_redirects", True) is not False
+    return {
+        "timeout_seconds": timeout_seconds,
+        "retry": retry,
+        "retry_statuses": retry_statuses,
+        "retry_policy": build_policy(retry, retry_statuses),
+        "follow_redirects": follow_redirects,
+        "http_pool": global_config.get("http_pool"),
+        "max_response_bytes": _parse_max_response_bytes(
+            api.get("max_response_bytes"),
+            global_config.get("max_response_bytes", DEFAULT_MAX_RESPONSE_BYTES),
+        ),
+        "circuit_breaker": parse_breaker_config(api.get("circuit_breaker"), global_config.get("circuit_breaker")),
+        "capture": global_config.get("capture"),
+    }
 
 
-def load_schedules(data_dir: Path) -> list[dict]:
-    """Load schedules.json. Returns schedules array; missing file or non-list -> []."""
-    path = data_dir / "schedules.json"
-    raw = load_json(path, {})
+def _read_schedules(data_dir: Path, strict: bool = False) -> list[dict]:
+    raw = load_json(data_dir / "schedules.json", {}, strict)
     if isinstance(raw, dict):
         schedules = raw.get("schedules")
         if isinstance(schedules, list):
@@ -217,6 +290,22 @@ def load_schedules(data_dir: Path) -> list[dict]:
     return []
 
 
+def load_schedules(data_dir: Path) -> list[dict]:
+    """Load schedules.json. Returns schedules array; missing file or non-list -> []."""
+    return _load(data_dir, "schedules")
+
+
+_READERS = {
+    "apis": _read_apis,
+    "auth": _read_auth,
+    "groups": _read_groups,
+    "config": _read_config,
+    "schedules": _read_schedules,
+}
+# data file -> cache name
+DATA_FILES: Mapping[str, str] = MappingProxyType({f"{name}.json": name for name in _READERS})
+
+
 def enabled_apis(apis: list[dict]) -> list[dict]:
     """Return only APIs with enabled !== false."""
     return [a for a in apis if a.get("enabled", True) is not False]
@@ -250,3 +339,158 @@ def get_config_for_placeholders(
             elif "token" in auth_entry:
                 out[name] = auth_entry.get("token")
     return out
+
+
+_registry_versions = itertools.count(1)
+
+
+class CompiledApi:
+    """Per-API data derived once per registry build (the api dict itself is never mutated)."""
+
+    __slots__ = (
+        "api",
+        "api_id",
+        "method",
+        "rate_limit",
+        "rate_limit_global",
+        "client_opts",
+        "url_tpl",
+        "headers_tpl",
+        "params_tpl",
+        "body_tpl",
+        "coalesce",
+        "cache",
+        "response_path",
+        "concurrency",
+        "host_concurrency",
+        "hedge",
+        "allowed_user_groups",
+        "allowed_group_groups",
+        "help",
+    )
+
+    def __init__(self, api: dict, global_config: dict[str, Any]) -> None:
+        self.api = api
+        api_id = api.get("id")
+        self.api_id = api_id if isinstance(api_id, str) else None
+        self.method = str(api.get("method") or "GET").upper()
+        self.rate_limit = parse_rate_limit(api)
+        self.rate_limit_global = parse_rate_limit_global(api)
+        self.client_opts = MappingProxyType(merge_client_options(global_config, api))
+        headers = api.get("headers")
+        params = api.get("params")
+        self.url_tpl: Template = compile_template(api.get("url") or "")
+        self.headers_tpl: Template = compile_template(headers if isinstance(headers, dict) else {})
+        self.params_tpl: Template = compile_template(params if isinstance(params, dict) else {})
+        self.body_tpl: Template = compile_template(api.get("body"))
+        self.coalesce = api.get("coalesce") is True
+        self.cache = parse_cache_config(api.get("cache"))
+        response_path = str(api.get("response_path") or "").strip()
+        self.response_path: PathAccessor | None = compile_path(response_path) if response_path else None
+        self.concurrency = parse_concurrency_config(api)
+        self.host_concurrency: dict[str, tuple[int, int, float]] = global_config.get("host_concurrency") or {}
+        self.hedge = parse_hedge_config(api.get("hedge"))
+        self.allowed_user_groups = allowed_names(api.get("allowed_user_groups"))
+        self.allowed_group_groups = allowed_names(api.get("allowed_group_groups"))
+        self.help = HelpEntry(api)
+
+
+class ApiRegistry:
+    """
+    Immutable snapshot of apis.json compiled against config.json.
+    Lookups by id/command are dict hits; a new instance with a higher version replaces it on reload.
+    """
+
+    __slots__ = ("version", "apis", "config", "enabled", "suggest", "_by_id", "_enabled_by_key")
+
+    def __init__(
+        self,
+        apis: list[dict],
+        global_config: dict[str, Any],
+        previous: ApiRegistry | None = None,
+    ) -> None:
+        self.version = next(_registry_versions)
+        self.apis: tuple[dict, ...] = tuple(a for a in apis if isinstance(a, dict))
+        self.config = global_config
+        # with the same config, entries whose api dict is unchanged are reused instead of recompiled
+        reusable: dict[str, CompiledApi] = {}
+        if previous is not None and previous.config == global_config:
+            reusable = {e.api_id: e for e in previous.enabled if e.api_id}
+        enabled: list[CompiledApi] = []
+        by_id: dict[str, dict] = {}
+        enabled_by_key: dict[str, CompiledApi] = {}
+        for api in self.apis:
+            api_id = api.get("id")
+            if isinstance(api_id, str):
+                by_id.setdefault(api_id, api)
+            if api.get("enabled", True) is False:
+                continue
+            entry = reusable.get(api_id) if isinstance(api_id, str) else None
+            if entry is None or entry.api != api:
+                entry = CompiledApi(api, global_config)
+            enabled.append(entry)
+            # First API in file order wins for both id and command, same as the former linear scan.
+            for k in (api_id, api.get("command")):
+                if isinstance(k, str):
+                    enabled_by_key.setdefault(k, entry)
+        self.enabled: tuple[CompiledApi, ...] = tuple(enabled)
+        self.suggest = SuggestIndex(self.enabled)
+        self._by_id: Mapping[str, dict] = MappingProxyType(by_id)
+        self._enabled_by_key: Mapping[str, CompiledApi] = MappingProxyType(enabled_by_key)
+
+    def find(self, key_or_command: str) -> CompiledApi | None:
+        """Enabled API by id or command (for user /api <name> invocation)."""
+        return self._enabled_by_key.get(key_or_command)
+
+    def find_by_id(self, api_id: str) -> dict | None:
+        """Any API (enabled or not) by id."""
+        return self._by_id.get(api_id)
+
+
+def load_registry(data_dir: Path) -> ApiRegistry:
+    """Return the compiled ApiRegistry for data_dir, building it once per apis.json/config.json load."""
+    key = (_ddir_key(data_dir), "registry")
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+        registry = ApiRegistry(load_apis(data_dir), load_config(data_dir))
+        _cache[key] = registry
+        return registry
+
+
+def refresh(data_dir: Path, names: Iterable[str]) -> set[str]:
+    """
+    Re-read the named data files ("apis", "config", ...) and, if apis or config changed, rebuild the registry;
+    everything is built first and then published in one step, so callers never hit disk or see a half-updated state.
+    Files are parsed strictly: one that fails (e.g. a save with a typo) is logged and left out, so the last good
+    version stays live. Returns the names actually published.
+    """
+    fresh = {}
+    for name in names:
+        if name not in _READERS:
+            continue
+        try:
+            fresh[name] = _READERS[name](data_dir, strict=True)
+        except ValueError as e:
+            logger.error("ApiDog 配置文件解析失败，继续使用上一次的有效配置: %s", e)
+    if not fresh:
+        return set()
+    registry = None
+    if "apis" in fresh or "config" in fresh:
+        previous = _cache_get(data_dir, "registry")
+        registry = ApiRegistry(
+            fresh["apis"] if "apis" in fresh else load_apis(data_dir),
+            fresh["config"] if "config" in fresh else load_config(data_dir),
+            previous if isinstance(previous, ApiRegistry) else None,
+        )
+    index = GroupIndex(fresh["groups"]) if "groups" in fresh else None
+    key = _ddir_key(data_dir)
+    with _cache_lock:
+        for name, value in fresh.items():
+            _cache[(key, name)] = value
+        if index is not None:
+            _cache[(key, "group_index")] = index
+        if registry is not None:
+            _cache[(key, "registry")] = registry
+    return set(fresh)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""In-process per-API metrics: call/error counters plus latency and response-size histograms."""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from typing import Any
+
+# Upper bounds of the histogram buckets; one more bucket (+Inf) catches everything above the last bound.
+LATENCY_BUCKETS_SECONDS: tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+SIZE_BUCKETS_BYTES: tuple[float, ...] = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram: one count per bucket in a flat list, found by bisect on the bounds."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """[(upper_bound, observations <= bound)], ending with (inf, count)."""
+        out: list[tuple[float, int]] = []
+        total = 0
+        for bound, n in zip((*self.bounds, math.inf), self.counts):
+            total += n
+            out.append((bound, total))
+        return out
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": [["+Inf" if b == math.inf else b, n] for b, n in self.cumulative()],
+        }
+
+
+class ApiMetrics:
+    """Counters and histograms of one API. Mutated only under the module lock."""
+
+    __slots__ = ("calls", "successes", "errors", "rate_limited", "retries", "cache_hits", "latency", "size")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.successes = 0
+        # error type -> count ("timeout", "busy", "http_502", ...)
+        self.errors: dict[str, int] = {}
+        self.rate_limited = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.latency = Histogram(LATENCY_BUCKETS_SECONDS)
+        self.size = Histogram(SIZE_BUCKETS_BYTES)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "errors": dict(self.errors),
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "latency_seconds": self.latency.to_dict(),
+            "response_size_bytes": self.size.to_dict(),
+        }
+
+
+_lock = threading.Lock()
+# api_key -> metrics; only configured APIs get an entry, so user typos cannot grow this
+_apis: dict[str, ApiMetrics] = {}
+
+
+def _get(api_key: str) -> ApiMetrics:
+    m = _apis.get(api_key)
+    if m is None:
+        m = _apis[api_key] = ApiMetrics()
+    return m
+
+
+def record_call(
+    api_key: str,
+    success: bool,
+    seconds: float,
+    error_type: str | None = None,
+    cache_hit: bool = False,
+) -> None:
+    """One finished /api call of a configured API; error_type is counted when the call failed."""
+    with _lock:
+        m = _get(api_key)
+        m.calls += 1
+        if success:
+            m.successes += 1
+        elif error_type == "rate_limit":
+            m.rate_limited += 1
+        else:
+            key = error_type or "error"
+            m.errors[key] = m.errors.get(key, 0) + 1
+        if cache_hit:
+            m.cache_hits += 1
+        m.latency.observe(seconds)
+
+
+def record_retry(api_key: str) -> None:
+    with _lock:
+        _get(api_key).retries += 1
+
+
+def record_response_size(api_key: str, size: int) -> None:
+    """Body size of one upstream response (every attempt, not per call)."""
+    with _lock:
+        _get(api_key).size.observe(size)
+
+
+def stats() -> dict[str, Any]:
+    """Per-API counters and histograms; histogram buckets are cumulative [upper_bound, count] pairs."""
+    with _lock:
+        return {api_key: m.to_dict() for api_key, m in _apis.items()}
+
+
+def reset() -> None:
+    with _lock:
+        _apis.clear()
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _histogram_lines(name: str, api: str, h: Histogram) -> list[str]:
+    lines = [f'{name}_bucket{{api="{api}",le="{_num(b)}"}} {n}' for b, n in h.cumulative()]
+    lines.append(f'{name}_sum{{api="{api}"}} {_num(h.sum)}')
+    lines.append(f'{name}_count{{api="{api}"}} {h.count}')
+    return lines
+
+
+_COUNTERS = (
+    ("apidog_calls_total", "calls", "ApiDog calls per API."),
+    ("apidog_successes_total", "successes", "Successful ApiDog calls per API."),
+    ("apidog_rate_limited_total", "rate_limited", "Calls rejected by rate limits per API."),
+    ("apidog_retries_total", "retries", "Upstream retries per API."),
+    ("apidog_cache_hits_total", "cache_hits", "Calls answered from the response cache per API."),
+)
+
+
+def prometheus_text() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        snap = [(_label(k), m) for k, m in sorted(_apis.items())]
+        out: list[str] = []
+        for metric, attr, help_text in _COUNTERS:
+            out.append(f"# HELP {metric} {help_text}")
+            out.append(f"# TYPE {metric} counter")
+            out.extend(f'{metric}{{api="{api}"}} {getattr(m, attr)}' for api, m in snap)
+        out.append("# HELP apidog_errors_total Failed ApiDog calls per API and error type.")
+        out.append("# TYPE apidog_errors_total counter")
+        for api, m in snap:
+            out.extend(
+                f'apidog_errors_total{{api="{api}",type="{_label(t)}"}} {n}' for t, n in sorted(m.errors.items())
+            )
+        out.append("# HELP apidog_call_duration_seconds ApiDog call latency per API.")
+        out.append("# TYPE apidog_call_duration_seconds histogram")
+        for api, m in snap:
+            out.extend(_histogram_lines("apidog_call_duration_seconds", api, m.latency))
+        out.append("# HELP apidog_response_size_bytes Upstream response body size per API.")
+        out.append("# TYPE apidog_response_size_bytes histogram")
+        for api, m in snap:
+            out.extend(_histogram_lines("apidog_response_size_bytes", api, m.size))
+    return "\n".join(out) + "\n"
@@ -104,28 +104,117 @@ _PLACEHOLDER = re.compile(
 )
 
 
+def _slot_from_match(m: re.Match) -> tuple:
+    """Turn a placeholder match into a slot: ("args", idx) / ("named", key, default) / ("config", parts)."""
+    if m.group(1) is not None:
+        return ("args", int(m.group(1)))
+    if m.group(2) is not None:
+        default = m.group(3)
+        return ("named", m.group(2).strip(), default.strip() if default is not None else None)
+    return ("config", tuple(m.group(4).strip().split(".")))
+
+
+def _fill_slot(
+    slot: tuple,
+    args: list[str],
+    named: dict[str, str],
+    config: dict[str, Any],
+) -> str:
+    kind = slot[0]
+    if kind == "args":
+        idx = slot[1]
+        return args[idx] if idx < len(args) else ""
+    if kind == "named":
+        default = slot[2]
+        return named.get(slot[1], default if default is not None else "")
+    v: Any = config
+    for part in slot[1]:
+        v = v.get(part, "") if isinstance(v, dict) else ""
+    return str(v) if v != "" else ""
+
+
 def _replace_placeholders_str(
     s: str,
     args: list[str],
     named: dict[str, str],
     config: dict[str, Any],
 ) -> str:
-    def repl(m: re.Match) -> str:
-        if m.group(1) is not None:
-            idx = int(m.group(1))
-            return args[idx] if idx < len(args) else ""
-        if m.group(2) is not None:
-            key = m.group(2).strip()
-            default = m.group(3)
-            if default is not None:
-                default = default.strip()
-            return named.get(key, default if default is not None else "")
-        if m.group(4) is not None:
-            key = m.group(4).strip()
-            v = config
-            for part in key.split("."):
-                v = v.get(part, "") if isinstance(v, dict) else ""
-            return str(v) if v != "" else ""
-        return m.group(0)
-
-    return _PLACEHOLDER.sub(repl, s)
+    if "{{" not in s:
+        return s
+    return _PLACEHOLDER.sub(lambda m: _fill_slot(_slot_from_match(m), args, named, config), s)
+
+
+# Compiled template nodes: (_STATIC, value) | (_STR, segments) | (_DICT, ((key, node), ...)) | (_LIST, (node, ...)).
+# Static subtrees contain no placeholder and are returned as-is (shared, never copied).
+_STATIC, _STR, _DICT, _LIST = 0, 1, 2, 3
+
+
+def _compile_node(value: Any) -> tuple:
+    if isinstance(value, str):
+        if "{{" not in value:
+            return (_STATIC, value)
+        segments: list[Any] = []
+        pos = 0
+        for m in _PLACEHOLDER.finditer(value):
+            if m.start() > pos:
+                segments.append(value[pos:m.start()])
+            segments.append(_slot_from_match(m))
+            pos = m.end()
+        if not segments:
+            return (_STATIC, value)
+        if pos < len(value):
+            segments.append(value[pos:])
+        return (_STR, tuple(segments))
+    if isinstance(value, dict):
+        items = tuple((k, _compile_node(v)) for k, v in value.items())
+        if all(node[0] == _STATIC for _, node in items):
+            return (_STATIC, value)
+        return (_DICT, items)
+    if isinstance(value, list):
+        nodes = tuple(_compile_node(v) for v in value)
+        if all(node[0] == _STATIC for node in nodes):
+            return (_STATIC, value)
+        return (_LIST, nodes)
+    return (_STATIC, value)
+
+
+def _render_node(
+    node: tuple,
+    args: list[str],
+    named: dict[str, str],
+    config: dict[str, Any],
+) -> Any:
+    kind = node[0]
+    if kind == _STATIC:
+        return node[1]
+    if kind == _STR:
+        return "".join(
+            seg if seg.__class__ is str else _fill_slot(seg, args, named, config)
+            for seg in node[1]
+        )
+    if kind == _DICT:
+        return {k: _render_node(n, args, named, config) for k, n in node[1]}
+    return [_render_node(n, args, named, config) for n in node[1]]
+
+
+class Template:
+    """A value (str/dict/list/other) with its placeholders pre-split into literal and slot segments."""
+
+    __slots__ = ("_node", "is_static")
+
+    def __init__(self, value: Any) -> None:
+        self._node = _compile_node(value)
+        self.is_static = self._node[0] == _STATIC
+
+    def render(
+        self,
+        args: list[str],
+        named: dict[str, str],
+        config: dict[str, Any],
+    ) -> Any:
+        """Same result as resolve_placeholders(value, ...); static subtrees are shared with the source value."""
+        return _render_node(self._node, args, named, config)
+
+
+def compile_template(value: Any) -> Template:
+    return Template(value)
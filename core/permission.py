@@ -1,47 +1,146 @@
 # -*- coding: utf-8 -*-
-"""Check API permission against CallContext (groups only)."""
+"""Check API permission against CallContext (groups only), backed by precomputed membership sets."""
 
 from __future__ import annotations
 
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Mapping
+
+from .log_helper import logger
 from .types import CallContext
 
+_EMPTY: frozenset[str] = frozenset()
+# matches no group name, so every caller is outside the allowed groups
+_DENY_ALL: frozenset[Any] = frozenset((object(),))
+_index_versions = itertools.count(1)
+
+_MSG_USER = "你不在该 API 的允许用户组中。"
+_MSG_GROUP_ONLY = "该接口仅限群聊使用。"
+_MSG_GROUP = "当前群不在该 API 的允许群组中。"
+
+
+def _reverse(groups: Mapping[str, frozenset[str]]) -> dict[str, frozenset[str]]:
+    out: dict[str, set[str]] = {}
+    for name, members in groups.items():
+        for m in members:
+            out.setdefault(m, set()).add(name)
+    return {m: frozenset(names) for m, names in out.items()}
+
+
+def _member_sets(raw: Any) -> dict[str, frozenset[str]]:
+    if not isinstance(raw, dict):
+        return {}
+    return {
+        str(name): frozenset(str(m) for m in members)
+        for name, members in raw.items()
+        if isinstance(members, list)
+    }
+
+
+class GroupIndex:
+    """
+    groups.json as frozen sets: members per group name, plus reverse maps from a user / chat group id
+    to the names of the groups that contain it. Built once per groups.json load.
+    """
+
+    __slots__ = ("version", "user_groups", "group_groups", "groups_of_user", "groups_of_group")
+
+    def __init__(self, groups: Mapping[str, Any] | None = None) -> None:
+        groups = groups or {}
+        self.version = next(_index_versions)
+        self.user_groups = _member_sets(groups.get("user_groups"))
+        self.group_groups = _member_sets(groups.get("group_groups"))
+        self.groups_of_user = _reverse(self.user_groups)
+        self.groups_of_group = _reverse(self.group_groups)
+
+
+def allowed_names(raw: Any) -> frozenset[str]:
+    """
+    allowed_user_groups / allowed_group_groups from an API entry as a set of group names.
+    Unset or empty means unrestricted, a string is one group name, and any other value denies everyone.
+    """
+    if not raw:
+        return _EMPTY
+    if isinstance(raw, str):
+        return frozenset((raw,))
+    if isinstance(raw, (list, tuple)):
+        return frozenset(str(x) for x in raw)
+    logger.warning("ApiDog invalid allowed groups %r (expected a list of group names), access denied", raw)
+    return _DENY_ALL
+
+
+def check(
+    allowed_user_groups: frozenset[str],
+    allowed_group_groups: frozenset[str],
+    ctx: CallContext,
+    index: GroupIndex,
+) -> tuple[bool, str]:
+    """Set-intersection form of check_permission for precomputed allowed group names."""
+    if allowed_user_groups and ctx.user_id is not None:
+        if allowed_user_groups.isdisjoint(index.groups_of_user.get(ctx.user_id, _EMPTY)):
+            return False, _MSG_USER
+    if allowed_group_groups:
+        if ctx.group_id is None:
+            return False, _MSG_GROUP_ONLY
+        if allowed_group_groups.isdisjoint(index.groups_of_group.get(ctx.group_id, _EMPTY)):
+            return False, _MSG_GROUP
+    return True, ""
+
 
 def check_permission(
     api: dict,
     ctx: CallContext,
-    groups: dict | None = None,
+    groups: GroupIndex | dict | None = None,
 ) -> tuple[bool, str]:
     """
     allowed_user_groups, allowed_group_groups are used.
     allowed_users / allowed_groups in api are ignored.
-    groups: {"user_groups": {name: [uid,...]}, "group_groups": {name: [gid,...]}}.
+    groups: a GroupIndex, or the raw {"user_groups": {name: [uid,...]}, "group_groups": {name: [gid,...]}}.
     """
-    groups = groups or {}
-    user_groups = groups.get("user_groups") or {}
-    group_groups = groups.get("group_groups") or {}
+    index = groups if isinstance(groups, GroupIndex) else GroupIndex(groups)
+    return check(
+        allowed_names(api.get("allowed_user_groups")),
+        allowed_names(api.get("allowed_group_groups")),
+        ctx,
+        index,
+    )
 
-    allowed_user_groups = api.get("allowed_user_groups") or []
-    if allowed_user_groups and ctx.user_id is not None:
-        user_in_any = False
-        for gname in allowed_user_groups:
-            members = user_groups.get(gname)
-            if isinstance(members, list) and ctx.user_id in [str(m) for m in members]:
-                user_in_any = True
-                break
-        if not user_in_any:
-            return False, "你不在该 API 的允许用户组中。"
-
-    allowed_group_groups = api.get("allowed_group_groups") or []
-    if allowed_group_groups:
-        if ctx.group_id is None:
-            return False, "该接口仅限群聊使用。"
-        group_in_any = False
-        for gname in allowed_group_groups:
-            members = group_groups.get(gname)
-            if isinstance(members, list) and ctx.group_id in [str(m) for m in members]:
-                group_in_any = True
-                break
-        if not group_in_any:
-            return False, "当前群不在该 API 的允许群组中。"
 
-    return True, ""
+# Allowed-API lists per (user_id, group_id); valid for one (registry version, group index version).
+MAX_ALLOWED_CACHE = 4096
+_allowed_lock = threading.Lock()
+_allowed_versions: tuple[int, int] | None = None
+_allowed: OrderedDict[tuple[str | None, str | None], tuple] = OrderedDict()
+
+
+def allowed_entries(registry: Any, index: GroupIndex, ctx: CallContext) -> tuple:
+    """
+    Enabled registry entries (CompiledApi) the caller may use, in file order. Cached per (user, group)
+    until the registry or groups.json is reloaded.
+    """
+    global _allowed_versions
+    versions = (registry.version, index.version)
+    key = (ctx.user_id, ctx.group_id)
+    with _allowed_lock:
+        if _allowed_versions != versions:
+            _allowed.clear()
+            _allowed_versions = versions
+        hit = _allowed.get(key)
+        if hit is not None:
+            _allowed.move_to_end(key)
+            return hit
+    out = tuple(_filter_entries(registry.enabled, index, ctx))
+    with _allowed_lock:
+        if _allowed_versions == versions:
+            _allowed[key] = out
+            if len(_allowed) > MAX_ALLOWED_CACHE:
+                _allowed.popitem(last=False)
+    return out
+
+
+def _filter_entries(entries: Iterable[Any], index: GroupIndex, ctx: CallContext) -> Iterable[Any]:
+    for e in entries:
+        if check(e.allowed_user_groups, e.allowed_group_groups, ctx, index)[0]:
+            yield e
@@ -1,22 +1,103 @@
 # -*- coding: utf-8 -*-
-"""Per (user_id, api_key) rate limit. In-memory only, single process."""
+"""Per (user_id, api_key) and per api_key rate limits. In-memory only, single process."""
 
 from __future__ import annotations
 
+import threading
 import time
-from typing import Any
+from collections import OrderedDict, deque
+from typing import Any, Hashable
 
-_RECORDS: dict[tuple[str, str], list[float]] = {}
-_GLOBAL_RECORDS: dict[str, list[float]] = {}
-_LOCK: Any = None
+# Idle keys are swept at most this often; a key is idle once its newest call left the window.
+SWEEP_INTERVAL_SECONDS = 60.0
+# Hard cap on tracked keys; beyond it the least recently used keys are dropped.
+MAX_KEYS = 100_000
 
+_MSG_USER = "调用过于频繁，请稍后再试。"
+_MSG_GLOBAL = "该接口调用过于频繁，请稍后再试。"
 
-def _get_lock() -> Any:
-    import threading
-    global _LOCK
-    if _LOCK is None:
-        _LOCK = threading.Lock()
-    return _LOCK
+
+class _Window:
+    """
+    Exact sliding-window log in fixed space: a ring of the last max_count call times.
+    A call is allowed iff fewer than max_count calls happened within the window,
+    i.e. the ring is not full or its oldest entry has already left the window.
+    """
+
+    __slots__ = ("times", "window")
+
+    def __init__(self, max_count: int, window_seconds: int) -> None:
+        self.times: deque[float] = deque(maxlen=max(max_count, 0))
+        self.window = window_seconds
+
+    def allows(self, now: float) -> bool:
+        times = self.times
+        if times.maxlen == 0:
+            return False
+        return len(times) < times.maxlen or times[0] <= now - self.window
+
+    def idle(self, now: float) -> bool:
+        return not self.times or self.times[-1] <= now - self.window
+
+
+class RateLimiter:
+    """Bounded map of key -> _Window with periodic sweep of idle keys. One lock acquisition per call."""
+
+    def __init__(self, max_keys: int = MAX_KEYS, sweep_interval: float = SWEEP_INTERVAL_SECONDS) -> None:
+        self._windows: OrderedDict[Hashable, _Window] = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+        self._sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def _window(self, key: Hashable, limit: tuple[int, int]) -> _Window:
+        w = self._windows.get(key)
+        max_count, window_seconds = limit
+        if w is None:
+            w = _Window(max_count, window_seconds)
+            self._windows[key] = w
+        elif w.times.maxlen != max(max_count, 0) or w.window != window_seconds:
+            # config changed: keep the most recent calls under the new limit
+            fresh = _Window(max_count, window_seconds)
+            fresh.times.extend(w.times)
+            w = self._windows[key] = fresh
+        self._windows.move_to_end(key)
+        return w
+
+    def _sweep(self, now: float) -> None:
+        idle = [k for k, w in self._windows.items() if w.idle(now)]
+        for k in idle:
+            del self._windows[k]
+        while len(self._windows) > self._max_keys:
+            self._windows.popitem(last=False)
+        self._next_sweep = now + self._sweep_interval
+
+    def acquire(self, checks: list[tuple[Hashable, tuple[int, int], str]]) -> tuple[bool, str]:
+        """
+        checks: [(key, (max_count, window_seconds), reject_message), ...].
+        Checked in order, each window recording the call as soon as it allows it, as the separate global and
+        per-user checks did: a call the per-user limit rejects has still used a global slot.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_sweep or len(self._windows) > self._max_keys:
+                self._sweep(now)
+            for key, limit, msg in checks:
+                w = self._window(key, limit)
+                if not w.allows(now):
+                    return False, msg
+                w.times.append(now)
+        return True, ""
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._windows.clear()
+
+
+_LIMITER = RateLimiter()
 
 
 def _parse_limit_config(config: Any) -> tuple[int, int] | None:
@@ -32,61 +113,51 @@ def _parse_limit_config(config: Any) -> tuple[int, int] | None:
     return None
 
 
-def _parse_rate_limit(api: dict) -> tuple[int, int] | None:
+def parse_rate_limit(api: dict) -> tuple[int, int] | None:
     """Per-user limit. Only supports object {\"max\": N, \"window_seconds\": S}."""
     return _parse_limit_config(api.get("rate_limit"))
 
 
-def _parse_rate_limit_global(api: dict) -> tuple[int, int] | None:
+def parse_rate_limit_global(api: dict) -> tuple[int, int] | None:
     """Global limit per api_key. Object {\"max\": N, \"window_seconds\": S}."""
     return _parse_limit_config(api.get("rate_limit_global"))
 
 
+def check_and_record_all(
+    global_limit: tuple[int, int] | None,
+    user_limit: tuple[int, int] | None,
+    user_id: str | None,
+    api_key: str,
+) -> tuple[bool, str]:
+    """
+    Check rate_limit_global (per api_key), then rate_limit (per user_id + api_key), under one lock.
+    The global window records the call before the per-user check runs. Returns (True, "") or (False, msg).
+    """
+    checks: list[tuple[Hashable, tuple[int, int], str]] = []
+    if global_limit:
+        checks.append((("global", api_key), global_limit, _MSG_GLOBAL))
+    if user_limit:
+        checks.append((("user", user_id if user_id else "", api_key), user_limit, _MSG_USER))
+    if not checks:
+        return True, ""
+    return _LIMITER.acquire(checks)
+
+
 def check_and_record(
-    api: dict,
+    limit: tuple[int, int] | None,
     user_id: str | None,
     api_key: str,
 ) -> tuple[bool, str]:
     """
-    If api has rate_limit, check (user_id, api_key) against sliding window;
+    If limit (parsed rate_limit) is set, check (user_id, api_key) against sliding window;
     if under limit, record this call and return (True, ""); else return (False, msg).
     """
-    parsed = _parse_rate_limit(api)
-    if not parsed:
-        return True, ""
-    max_count, window_seconds = parsed
-    uid = user_id if user_id else ""
-    key = (uid, api_key)
-    now = time.monotonic()
-    lock = _get_lock()
-    with lock:
-        rec = _RECORDS.get(key, [])
-        cutoff = now - window_seconds
-        rec = [t for t in rec if t > cutoff]
-        if len(rec) >= max_count:
-            return False, "调用过于频繁，请稍后再试。"
-        rec.append(now)
-        _RECORDS[key] = rec
-    return True, ""
-
-
-def check_and_record_global(api: dict, api_key: str) -> tuple[bool, str]:
+    return check_and_record_all(None, limit, user_id, api_key)
+
+
+def check_and_record_global(limit: tuple[int, int] | None, api_key: str) -> tuple[bool, str]:
     """
-    If api has rate_limit_global, check api_key against sliding window;
+    If limit (parsed rate_limit_global) is set, check api_key against sliding window;
     if under limit, record and return (True, ""); else return (False, msg).
     """
-    parsed = _parse_rate_limit_global(api)
-    if not parsed:
-        return True, ""
-    max_count, window_seconds = parsed
-    now = time.monotonic()
-    lock = _get_lock()
-    with lock:
-        rec = _GLOBAL_RECORDS.get(api_key, [])
-        cutoff = now - window_seconds
-        rec = [t for t in rec if t > cutoff]
-        if len(rec) >= max_count:
-            return False, "该接口调用过于频繁，请稍后再试。"
-        rec.append(now)
-        _GLOBAL_RECORDS[api_key] = rec
-    return True, ""
+    return check_and_record_all(limit, None, None, api_key)
@@ -1,15 +1,25 @@
 # -*- coding: utf-8 -*-
-"""Build request (placeholders), execute httpx, return status/data/text/body/type."""
+"""Build request (placeholders), execute httpx on pooled clients, return an undecoded HttpResponse."""
 
 from __future__ import annotations
 
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
 from typing import Any
 
 import httpx
 
-from .parse_args import resolve_placeholders
 from .auth import apply_auth
+from . import capture as capture_mod
+from . import jsonlib
+from .client_pool import get_client
+from .disk_cache import hash_key
 from .log_helper import logger
+from . import trace as trace_mod
+from .types import TempMediaFile
 
 MEDIA_PREFIXES = ("image/", "video/", "audio/")
 
@@ -21,6 +31,168 @@ def _is_media_content_type(ct: str | None) -> bool:
     return any(ct.startswith(p) for p in MEDIA_PREFIXES)
 
 
+def request_key(
+    api_key: str,
+    method: str,
+    url: str,
+    headers: dict[str, Any],
+    params: dict[str, Any],
+    body: Any,
+    api: dict,
+) -> tuple[str, str, str, str]:
+    """Identity of a fully resolved request (before auth is applied; the auth entry is referenced by name)."""
+    auth_ref = api.get("auth") or api.get("auth_ref") or ""
+    payload = json.dumps(
+        [headers, params, body, auth_ref], ensure_ascii=False, sort_keys=True, default=str
+    )
+    return (api_key, method, url, payload)
+
+
+_UNSET = object()
+# first byte of any JSON value (or a UTF-8 BOM), so scalar bodies (123, "ok", true) decode like r.json() did
+_JSON_START = frozenset(b'{["-0123456789tfn\xef')
+
+
+def _looks_like_json(content_type: str, content: bytes) -> bool:
+    ct = content_type.lower()
+    if "json" in ct:
+        return True
+    head = content[:64].lstrip()
+    return bool(head) and head[0] in _JSON_START
+
+
+class HttpResponse:
+    """
+    Upstream response with demand-driven decoding: .data (JSON) and .text are decoded on first access
+    and cached, so each is done at most once and only when parse_response needs it.
+    Media responses (is_media) carry media_bytes or a spooled media_file and are never decoded.
+    """
+
+    __slots__ = (
+        "status_code",
+        "content",
+        "encoding",
+        "content_type",
+        "is_media",
+        "media_bytes",
+        "media_file",
+        "headers",
+        "_data",
+        "_text",
+    )
+
+    def __init__(
+        self,
+        status_code: int,
+        content: bytes = b"",
+        encoding: str = "utf-8",
+        content_type: str = "",
+        is_media: bool = False,
+        media_bytes: bytes | None = None,
+        media_file: TempMediaFile | None = None,
+        headers: httpx.Headers | None = None,
+    ) -> None:
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.content_type = content_type
+        self.is_media = is_media
+        self.media_bytes = media_bytes
+        self.media_file = media_file
+        self.headers = headers if headers is not None else httpx.Headers()
+        self._data: Any = _UNSET
+        self._text: str | None = None
+
+    @property
+    def data(self) -> Any:
+        """Parsed JSON body, or None when the body is not JSON. Bodies that cannot start a JSON value are not parsed."""
+        if self._data is _UNSET:
+            data = None
+            if not self.is_media and self.content and _looks_like_json(self.content_type, self.content):
+                try:
+                    data = jsonlib.loads(self.content)
+                except ValueError:
+                    data = None
+            self._data = data
+        return self._data
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "" if self.is_media else self.content.decode(self.encoding, errors="replace")
+        return self._text
+
+
+class ResponseTooLarge(Exception):
+    """Response body exceeded max_response_bytes."""
+
+
+_BODY_METHODS = frozenset({"POST", "PUT", "PATCH"})
+_METHODS = frozenset({"GET", "DELETE"}) | _BODY_METHODS
+
+# Streamed media bodies stay in memory up to this size, larger ones are spooled to a temp file.
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+
+def media_suffix(content_type: str | None, result_type: str | None = None) -> str:
+    """File suffix for a media body; shared by the spooler and the senders in main.py and tool_gen."""
+    ct = content_type or ""
+    if "png" in ct:
+        return ".png"
+    if "gif" in ct:
+        return ".gif"
+    if "video" in ct or result_type == "video":
+        return ".mp4"
+    if "audio" in ct or result_type == "audio":
+        return ".wav"
+    return ".jpg"
+
+
+def _check_declared_length(r: httpx.Response, max_bytes: int | None) -> None:
+    if not max_bytes:
+        return
+    declared = r.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise ResponseTooLarge(f"content-length {declared} > {max_bytes}")
+
+
+async def _read_body(
+    r: httpx.Response,
+    max_bytes: int | None,
+    spool_suffix: str | None = None,
+) -> tuple[bytes | None, TempMediaFile | None]:
+    """
+    Stream the body enforcing max_bytes. With spool_suffix set, bodies over SPOOL_MEMORY_BYTES are
+    written chunk by chunk to a TempMediaFile instead of being kept in memory.
+    """
+    chunks: list[bytes] = []
+    total = 0
+    f = None
+    try:
+        async for chunk in r.aiter_bytes():
+            total += len(chunk)
+            if max_bytes and total > max_bytes:
+                raise ResponseTooLarge(f"body > {max_bytes}")
+            if f is not None:
+                f.write(chunk)
+                continue
+            chunks.append(chunk)
+            if spool_suffix is not None and total > SPOOL_MEMORY_BYTES:
+                f = tempfile.NamedTemporaryFile(delete=False, prefix="apidog_", suffix=spool_suffix)
+                for c in chunks:
+                    f.write(c)
+                chunks = []
+        if f is None:
+            return b"".join(chunks), None
+        f.close()
+        return None, TempMediaFile(f.name, total)
+    except BaseException:
+        if f is not None:
+            f.close()
+            Path(f.name).unlink(missing_ok=True)
+        raise
+
+
 async def execute_request(
     api: dict,
     url: str,
@@ -30,64 +202,98 @@ async def execute_request(
     body: Any,
     auth: dict[str, Any],
     timeout: float | None = None,
-) -> tuple[int, Any, str, bytes | None, str | None]:
+    follow_redirects: bool = True,
+    pool_limits: dict[str, Any] | None = None,
+    max_response_bytes: int | None = None,
+    request_timeout: float | None = None,
+    capture: capture_mod.Capture | None = None,
+) -> HttpResponse:
     """
-    Run httpx request. Returns (status_code, data, text, content_bytes, content_type).
-    When status is 200 and Content-Type is image/video/audio, content_bytes and content_type are set.
+    Run httpx request on the pooled client for url's host and return an undecoded HttpResponse.
+    When status is 200 and Content-Type is image/video/audio, the body is in media_bytes, or, for
+    response_media_from=body, possibly spooled to media_file. Bodies over max_response_bytes raise ResponseTooLarge.
+    request_timeout overrides the client timeout for this request only (e.g. trimmed to a retry deadline).
+    capture records the exchange (record mode) or serves it from the capture file (replay mode).
+    headers and params are copied before auth is applied, so retries and hedges reuse the caller's clean dicts.
     """
+    headers = dict(headers)
+    params = dict(params)
+    extensions: dict[str, Any] = {}
+    if capture is not None:
+        # identity taken before auth is applied, so it is stable across attempts and auth.json changes
+        capture_api = api.get("id") or url
+        capture_key = hash_key(request_key(capture_api, method, url, headers, params, body, api))
+        extensions[capture_mod.KEY_EXTENSION] = capture_key
+        extensions[capture_mod.API_EXTENSION] = capture_api
+        capture_params = dict(params)
     apply_auth(api, auth, headers, params)
     timeout_val = timeout if timeout is not None and timeout > 0 else 30.0
+    if method not in _METHODS:
+        raise ValueError(f"不支持的请求方法: {method}")
+    stream_media = (api.get("response_media_from") or "url").lower() == "body"
+
+    if (tr := trace_mod.current()) is not None:
+        extensions["trace"] = tr.httpx_hook()
 
     try:
-        async with httpx.AsyncClient(timeout=timeout_val, follow_redirects=True) as client:
-            if method == "GET":
-                r = await client.get(url, params=params, headers=headers)
-            elif method == "POST":
-                r = await client.post(
-                    url,
-                    params=params,
-                    json=body if isinstance(body, (dict, list)) else None,
-                    content=body if isinstance(body, str) else None,
-                    headers=headers,
+        with trace_mod.span("client"):
+            client = get_client(
+                url, timeout_val, follow_redirects, pool_limits, capture.transport if capture is not None else None
+            )
+        request = client.build_request(
+            method,
+            url,
+            params=params,
+            headers=headers,
+            json=body if method in _BODY_METHODS and isinstance(body, (dict, list)) else None,
+            content=body if method in _BODY_METHODS and isinstance(body, str) else None,
+            timeout=request_timeout if request_timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            extensions=extensions,
+        )
+        sent = time.perf_counter()
+        r = await client.send(request, stream=True)
+        ttfb = time.perf_counter() - sent
+        try:
+            _check_declared_length(r, max_response_bytes)
+            ct = r.headers.get("content-type") or ""
+            content_type = ct.split(";")[0].strip()
+            if r.status_code == 200 and _is_media_content_type(ct):
+                suffix = media_suffix(content_type, api.get("response_type")) if stream_media else None
+                with trace_mod.span("download"):
+                    media_bytes, media_file = await _read_body(r, max_response_bytes, suffix)
+                if capture is not None and capture.recording:
+                    await asyncio.to_thread(
+                        capture.record, capture_api, capture_key, method, url, capture_params, body,
+                        r.status_code, r.headers, media_bytes, media_file.path if media_file else None,
+                        ttfb, time.perf_counter() - sent, capture_mod.auth_secrets(auth),
+                    )
+                return HttpResponse(
+                    r.status_code,
+                    content_type=content_type,
+                    is_media=True,
+                    media_bytes=media_bytes,
+                    media_file=media_file,
+                    headers=r.headers,
                 )
-            elif method == "PUT":
-                r = await client.put(
-                    url,
-                    params=params,
-                    json=body if isinstance(body, (dict, list)) else None,
-                    content=body if isinstance(body, str) else None,
-                    headers=headers,
+            with trace_mod.span("download"):
+                content, _ = await _read_body(r, max_response_bytes)
+            if capture is not None and capture.recording:
+                await asyncio.to_thread(
+                    capture.record, capture_api, capture_key, method, url, capture_params, body,
+                    r.status_code, r.headers, content, None, ttfb, time.perf_counter() - sent,
+                    capture_mod.auth_secrets(auth),
                 )
-            elif method == "PATCH":
-                r = await client.patch(
-                    url,
-                    params=params,
-                    json=body if isinstance(body, (dict, list)) else None,
-                    content=body if isinstance(body, str) else None,
-                    headers=headers,
-                )
-            elif method == "DELETE":
-                r = await client.delete(url, params=params, headers=headers)
-            else:
-                raise ValueError(f"不支持的请求方法: {method}")
-
-            try:
-                data = r.json()
-            except Exception:
-                data = None
-
-            text = r.text or ""
-            content_bytes: bytes | None = None
-            content_type: str | None = None
-            if r.status_code == 200:
-                ct = r.headers.get("content-type") or ""
-                if _is_media_content_type(ct):
-                    content_bytes = r.content
-                    content_type = ct.split(";")[0].strip()
-
-            return (r.status_code, data, text, content_bytes, content_type)
-
-    except httpx.TimeoutException:
+            return HttpResponse(
+                r.status_code,
+                content=content or b"",
+                encoding=r.encoding or "utf-8",
+                content_type=content_type,
+                headers=r.headers,
+            )
+        finally:
+            await r.aclose()
+
+    except (httpx.TimeoutException, ResponseTooLarge):
         raise
     except Exception:
         logger.exception("ApiDog request error")
@@ -3,42 +3,42 @@
 
 from __future__ import annotations
 
-import json
-from typing import Any
+from typing import TYPE_CHECKING
 
+from .json_path import MISSING, PathAccessor, compile_path, dump_capped, format_value
 from .types import CallResult, ResultType
 
+if TYPE_CHECKING:
+    from .request import HttpResponse
 
-def _get_nested(obj: Any, path: str) -> Any:
-    for part in path.split("."):
-        if isinstance(obj, dict) and part in obj:
-            obj = obj[part]
-        else:
-            return None
-    return obj
+# Max chars of a text reply; serialization stops once this is reached.
+MESSAGE_LIMIT = 5000
 
 
 def parse_response(
     api: dict,
-    status_code: int,
-    data: Any,
-    text: str,
-    content_bytes: bytes | None = None,
-    content_type: str | None = None,
+    resp: HttpResponse,
+    accessor: PathAccessor | None = None,
 ) -> CallResult:
     """
-    Build CallResult from request result.
-    When response_media_from == "body", use content_bytes/content_type;
-    otherwise use data/text to extract URL (existing logic).
+    Build CallResult from request result, decoding only what the API's response settings need.
+    When response_media_from == "body", use the media body (bytes or spooled file)/content_type;
+    otherwise extract the URL from the JSON body (existing logic).
+    accessor is the precompiled response_path (compiled here when not given).
     """
     response_type = (api.get("response_type") or "text").lower()
     response_path = (api.get("response_path") or "").strip()
     media_from = (api.get("response_media_from") or "url").lower()
+    if accessor is None and response_path:
+        accessor = compile_path(response_path)
+    status_code = resp.status_code
 
     if status_code >= 400:
-        msg = text
+        data = resp.data
         if isinstance(data, dict) and "message" in data:
-            msg = data.get("message", msg)
+            msg = data.get("message", "")
+        else:
+            msg = resp.text
         return CallResult(
             success=False,
             message=f"请求失败 (HTTP {status_code})。{msg}"[:500],
@@ -46,29 +46,32 @@ def parse_response(
         )
 
     if response_type == "text":
-        if response_path and isinstance(data, dict):
-            content = _get_nested(data, response_path)
-            if content is None:
-                content = str(data)
-            else:
-                content = str(content) if not isinstance(content, str) else content
+        data = resp.data
+        content = MISSING
+        if accessor is not None and data is not None:
+            content = accessor.get(data)
+        if content is not MISSING and content is not None:
+            msg = format_value(content, MESSAGE_LIMIT, len(resp.content))
+        elif accessor is not None and isinstance(data, dict):
+            # response_path missed: the whole object as Python text, as before compiled paths
+            msg = str(data)[:MESSAGE_LIMIT]
         elif data is not None:
-            content = json.dumps(data, ensure_ascii=False, indent=2)
+            msg = dump_capped(data, MESSAGE_LIMIT, size_hint=len(resp.content))
         else:
-            content = text or ""
-        msg = content[:5000] if len(content) > 5000 else content
+            msg = resp.text[:MESSAGE_LIMIT]
         return CallResult(success=True, message=msg, result_type="text")
 
     if response_type in ("image", "video", "audio"):
         if media_from == "body":
-            if content_bytes and len(content_bytes) > 0:
+            if resp.media_bytes or resp.media_file is not None:
                 return CallResult(
                     success=True,
                     message="",
                     result_type=response_type,
                     media_url=None,
-                    media_bytes=content_bytes,
-                    media_content_type=content_type or "",
+                    media_bytes=resp.media_bytes or None,
+                    media_content_type=resp.content_type or "",
+                    media_file=resp.media_file,
                 )
             return CallResult(
                 success=False,
@@ -76,8 +79,11 @@ def parse_response(
                 result_type="text",
             )
         # url branch
-        if response_path and isinstance(data, dict):
-            url = _get_nested(data, response_path)
+        data = resp.data
+        if accessor is not None and data is not None:
+            url = accessor.get(data)
+            if isinstance(url, list):
+                url = next((u for u in url if isinstance(u, str) and u), None)
         elif isinstance(data, dict):
             url = data.get("url")
             if url is None and isinstance(data.get("data"), dict):
@@ -97,6 +103,6 @@ def parse_response(
             result_type="text",
         )
 
-    out = json.dumps(data if data is not None else text, ensure_ascii=False, indent=2)
-    msg = out[:5000] if len(out) > 5000 else out
+    data = resp.data
+    msg = dump_capped(data if data is not None else resp.text, MESSAGE_LIMIT, size_hint=len(resp.content))
     return CallResult(success=True, message=msg, result_type="text")
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Retry policy: exponential backoff with full jitter, Retry-After on 429/503, overall deadline budget."""
+
+from __future__ import annotations
+
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+# statuses whose Retry-After header is honoured
+RETRY_AFTER_STATUSES = frozenset({429, 503})
+
+
+def _num(raw: dict, name: str, default: float, minimum: float = 0.0) -> float:
+    val = raw.get(name)
+    if isinstance(val, (int, float)) and not isinstance(val, bool) and val >= minimum:
+        return float(val)
+    return default
+
+
+def parse_retry_after(value: str | None, now: float | None = None) -> float | None:
+    """Retry-After as seconds from now: delta-seconds or an HTTP-date. None when absent or unparseable."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+class RetryPolicy:
+    """
+    Effective retry settings for one API. Attempt n (0-based) waits a random time in
+    [0, min(max_backoff_seconds, backoff_seconds * multiplier ** n)] (full jitter; jitter=false waits the cap).
+    A Retry-After on 429/503 replaces the computed delay; if it exceeds max_backoff_seconds the call is not retried.
+    deadline_seconds caps the total time spent on all attempts and waits.
+    """
+
+    __slots__ = (
+        "max_attempts",
+        "backoff_seconds",
+        "multiplier",
+        "max_backoff_seconds",
+        "jitter",
+        "respect_retry_after",
+        "deadline_seconds",
+        "retry_statuses",
+    )
+
+    def __init__(
+        self,
+        max_attempts: int = 0,
+        backoff_seconds: float = 1.0,
+        multiplier: float = 2.0,
+        max_backoff_seconds: float = 30.0,
+        jitter: bool = True,
+        respect_retry_after: bool = True,
+        deadline_seconds: float | None = None,
+        retry_statuses: frozenset[int] = frozenset(),
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.multiplier = multiplier
+        self.max_backoff_seconds = max_backoff_seconds
+        self.jitter = jitter
+        self.respect_retry_after = respect_retry_after
+        self.deadline_seconds = deadline_seconds
+        self.retry_statuses = retry_statuses
+
+    def deadline(self, start: float) -> float | None:
+        """Monotonic time after which no attempt may run, or None without a budget."""
+        return None if self.deadline_seconds is None else start + self.deadline_seconds
+
+    def delay(self, attempt: int, status_code: int | None = None, retry_after: str | None = None) -> float | None:
+        """Seconds to wait before retrying after attempt (0-based), or None if the server asked for longer than allowed."""
+        if self.respect_retry_after and status_code in RETRY_AFTER_STATUSES:
+            wait = parse_retry_after(retry_after)
+            if wait is not None:
+                return wait if wait <= self.max_backoff_seconds else None
+        cap = min(self.max_backoff_seconds, self.backoff_seconds * self.multiplier ** attempt)
+        return random.uniform(0.0, cap) if self.jitter else cap
+
+
+def parse_retry_config(
+    raw: Any,
+    base: dict[str, Any] | None = None,
+) -> dict[str, Any] | None:
+    """
+    Parse a retry object {"max_attempts", "backoff_seconds", "backoff_multiplier", "max_backoff_seconds",
+    "jitter", "respect_retry_after", "deadline_seconds"} on top of base. Returns None when retries are off.
+    """
+    if not isinstance(raw, dict):
+        return None
+    base = base or {}
+    max_a = raw.get("max_attempts", base.get("max_attempts"))
+    if not isinstance(max_a, (int, float)) or isinstance(max_a, bool) or max_a <= 0:
+        return None
+    deadline = raw.get("deadline_seconds", base.get("deadline_seconds"))
+    if not isinstance(deadline, (int, float)) or isinstance(deadline, bool) or deadline <= 0:
+        deadline = None
+    return {
+        "max_attempts": int(max_a),
+        "backoff_seconds": _num(raw, "backoff_seconds", base.get("backoff_seconds", 1.0)),
+        "backoff_multiplier": _num(raw, "backoff_multiplier", base.get("backoff_multiplier", 2.0), 1.0),
+        "max_backoff_seconds": _num(raw, "max_backoff_seconds", base.get("max_backoff_seconds", 30.0)),
+        "jitter": raw.get("jitter", base.get("jitter", True)) is not False,
+        "respect_retry_after": raw.get("respect_retry_after", base.get("respect_retry_after", True)) is not False,
+        "deadline_seconds": float(deadline) if deadline is not None else None,
+    }
+
+
+def build_policy(retry: dict[str, Any] | None, retry_statuses: frozenset[int]) -> RetryPolicy:
+    """RetryPolicy from a parsed retry dict (None -> no retries)."""
+    if not retry:
+        return RetryPolicy(retry_statuses=retry_statuses)
+    return RetryPolicy(
+        max_attempts=retry["max_attempts"],
+        backoff_seconds=retry["backoff_seconds"],
+        multiplier=retry["backoff_multiplier"],
+        max_backoff_seconds=retry["max_backoff_seconds"],
+        jitter=retry["jitter"],
+        respect_retry_after=retry["respect_retry_after"],
+        deadline_seconds=retry["deadline_seconds"],
+        retry_statuses=retry_statuses,
+    )
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""Single-flight: concurrent callers with the same key share one in-flight coroutine. Nothing is kept after completion."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+# key: (loop_id, caller key) -> in-flight task
+_inflight: dict[tuple[int, Hashable], asyncio.Task] = {}
+
+
+async def do(key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Await fn() unless an identical call (same key) is already running, in which case await that one.
+    Every waiter gets the same result object. A cancelled waiter does not cancel the shared task.
+    """
+    full_key = (id(asyncio.get_running_loop()), key)
+    task = _inflight.get(full_key)
+    if task is None:
+        task = asyncio.ensure_future(fn())
+        _inflight[full_key] = task
+
+        def _done(t: asyncio.Task, k: tuple = full_key) -> None:
+            if _inflight.get(k) is t:
+                del _inflight[k]
+
+        task.add_done_callback(_done)
+    return await asyncio.shield(task)
+
+
+def inflight_count() -> int:
+    return len(_inflight)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+""""Did you mean" suggestions for unknown API names: a bigram index over ids, commands and names."""
+
+from __future__ import annotations
+
+import heapq
+from collections import Counter
+from itertools import chain
+from typing import Any, Callable, Sequence
+
+DEFAULT_LIMIT = 3
+# Dice similarity of the bigram sets; below this a candidate is noise, not a typo
+MIN_SCORE = 0.3
+# candidates ranked before the permission filter; enough that hidden APIs rarely starve the result
+_CANDIDATE_FACTOR = 4
+# a bigram in more than this share of indexed keys (e.g. the "^测" of 测试1..测试5000) does not select candidates,
+# it only adds to the score of those a rarer bigram found; small registries (up to COMMON_GRAM_MIN keys) are exact
+COMMON_GRAM_FRACTION = 0.05
+COMMON_GRAM_MIN = 64
+
+
+def _grams(text: str) -> frozenset[str]:
+    """Bigrams of text (lowercased, whitespace removed) with ^/$ padding, so 1-2 char names still index."""
+    s = "^" + "".join(text.lower().split()) + "$"
+    return frozenset(s[i : i + 2] for i in range(len(s) - 1))
+
+
+class SuggestIndex:
+    """
+    Inverted index from bigram to (entry, key) postings over each entry's id, command and name. A lookup
+    counts shared bigrams via the postings of the query's bigrams only, so a miss costs one pass over a
+    handful of short lists instead of an edit distance against every API. Bigrams common to most APIs are
+    skipped as candidate sources (see COMMON_GRAM_FRACTION). Built once per registry.
+    """
+
+    __slots__ = ("_entries", "_labels", "_sizes", "_postings", "_common_cap", "_common_sets")
+
+    def __init__(self, entries: Sequence[Any]) -> None:
+        self._entries = tuple(entries)
+        labels: list[str] = []
+        sizes: list[int] = []
+        # gram -> ids into _sizes / _owner (one id per distinct indexed key)
+        postings: dict[str, list[int]] = {}
+        owner: list[int] = []
+        for n, entry in enumerate(self._entries):
+            api = entry.api
+            label = api.get("command") or api.get("id")
+            labels.append(label if isinstance(label, str) else "?")
+            seen: set[str] = set()
+            for key in (api.get("id"), api.get("command"), api.get("name")):
+                if not isinstance(key, str) or not key.strip() or key in seen:
+                    continue
+                seen.add(key)
+                grams = _grams(key)
+                kid = len(sizes)
+                sizes.append(len(grams))
+                owner.append(n)
+                for g in grams:
+                    postings.setdefault(g, []).append(kid)
+        self._labels = tuple(labels)
+        self._sizes = tuple(zip(sizes, owner))
+        self._postings = {g: tuple(ids) for g, ids in postings.items()}
+        self._common_cap = cap = max(COMMON_GRAM_MIN, int(len(sizes) * COMMON_GRAM_FRACTION))
+        self._common_sets = {g: frozenset(ids) for g, ids in postings.items() if len(ids) > cap}
+
+    def suggest(
+        self,
+        query: str,
+        visible: Callable[[Any], bool] | None = None,
+        limit: int = DEFAULT_LIMIT,
+    ) -> list[str]:
+        """
+        Up to limit display names (command, else id) of entries similar to query, best first.
+        visible(entry) filters out APIs the caller may not use; it only runs on the top candidates.
+        """
+        grams = _grams(query or "")
+        if limit <= 0 or len(grams) < 2:
+            return []
+        postings = self._postings
+        cap = self._common_cap
+        rare: list[tuple[int, ...]] = []
+        frequent: list[str] = []
+        for g in grams:
+            ids = postings.get(g)
+            if ids is not None:
+                if len(ids) <= cap:
+                    rare.append(ids)
+                else:
+                    frequent.append(g)
+        common = Counter(chain.from_iterable(rare))
+        if frequent:
+            if not rare:
+                # every bigram is common ("测2"): candidates are the first cap keys, in file order, of the rarest
+                g = min(frequent, key=lambda g: len(postings[g]))
+                frequent.remove(g)
+                common.update(postings[g][:cap])
+            # common bigrams only add to candidates already found, one C-level set intersection each
+            candidates = common.keys()
+            for g in frequent:
+                common.update(self._common_sets[g].intersection(candidates))
+        if not common:
+            return []
+        qn = len(grams)
+        best: dict[int, float] = {}
+        sizes = self._sizes
+        for kid, c in common.items():
+            size, n = sizes[kid]
+            score = 2.0 * c / (qn + size)
+            if score >= MIN_SCORE and score > best.get(n, 0.0):
+                best[n] = score
+        ranked = heapq.nlargest(limit * _CANDIDATE_FACTOR, best.items(), key=lambda kv: (kv[1], -kv[0]))
+        out: list[str] = []
+        for n, _ in ranked:
+            if visible is not None and not visible(self._entries[n]):
+                continue
+            label = self._labels[n]
+            if label not in out:
+                out.append(label)
+                if len(out) >= limit:
+                    break
+        return out
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Per-call timing spans under a trace id, and a ring buffer of recent slow calls."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, ContextManager, Iterator
+
+from .types import CallContext
+
+DEFAULT_SLOW_CALL_SECONDS = 1.0
+# slow calls kept for GET /api/trace/slow, oldest dropped first
+SLOW_CALLS_KEPT = 100
+
+# httpx/httpcore trace events ("connection.connect_tcp.started", "http11.receive_response_headers.complete", ...)
+# by step -> span name; connect_tcp includes DNS resolution. Steps not listed are ignored.
+_HTTP_PHASES = {
+    "connect_tcp": "connect",
+    "connect_unix_socket": "connect",
+    "start_tls": "tls",
+    "send_request_headers": "send_headers",
+    "send_request_body": "send_body",
+    "receive_response_headers": "ttfb",
+}
+
+_current: ContextVar[Trace | None] = ContextVar("apidog_trace", default=None)
+
+
+def parse_slow_call_ms(raw: Any) -> float:
+    """config.json slow_call_ms -> seconds; 0 keeps every call, invalid values use the default."""
+    if isinstance(raw, bool) or not isinstance(raw, (int, float)) or raw < 0:
+        return DEFAULT_SLOW_CALL_SECONDS
+    return float(raw) / 1000.0
+
+
+class Trace:
+    """
+    Spans of one call: (name, offset from call start, duration) in seconds, appended as phases finish.
+    A phase that runs more than once (retries, hedges) simply appears more than once.
+    """
+
+    __slots__ = (
+        "trace_id",
+        "api_key",
+        "user_id",
+        "group_id",
+        "started_at",
+        "start",
+        "end",
+        "spans",
+        "slow_seconds",
+    )
+
+    def __init__(self, context: CallContext | None = None) -> None:
+        self.trace_id = os.urandom(8).hex()
+        self.api_key: str | None = None
+        self.user_id = context.user_id if context is not None else None
+        self.group_id = context.group_id if context is not None else None
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.spans: list[tuple[str, float, float]] = []
+        self.slow_seconds = DEFAULT_SLOW_CALL_SECONDS
+
+    def add(self, name: str, start: float, end: float | None = None) -> None:
+        """Record a phase from perf_counter() start to end (default: now)."""
+        if end is None:
+            end = time.perf_counter()
+        self.spans.append((name, start - self.start, end - start))
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, t)
+
+    @contextmanager
+    def activate(self) -> Iterator[Trace]:
+        """
+        Make this trace current for the enclosed block (nesting restores the outer one). The block must not
+        yield from an async generator: the ContextVar would stay set in the consumer's task across the yield.
+        """
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def finish(self) -> None:
+        """Close the trace and keep it in the slow-call buffer when it resolved an API and took its slow_seconds."""
+        if self.end is not None:
+            return
+        self.end = time.perf_counter()
+        if self.api_key is not None and self.duration >= self.slow_seconds:
+            with _slow_lock:
+                _slow.append(self)
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def httpx_hook(self) -> Callable[[str, dict], Any]:
+        """Callback for httpx's "trace" request extension; turns connection/http events into spans."""
+        pending: dict[str, float] = {}
+
+        async def hook(event_name: str, info: dict) -> None:
+            step_path, _, state = event_name.rpartition(".")
+            name = _HTTP_PHASES.get(step_path.rpartition(".")[2])
+            if name is None:
+                return
+            if state == "started":
+                pending[step_path] = time.perf_counter()
+            elif state in ("complete", "failed"):
+                t = pending.pop(step_path, None)
+                if t is not None:
+                    self.add(name, t)
+
+        return hook
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "api_key": self.api_key,
+            "user_id": self.user_id,
+            "group_id": self.group_id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "spans": [
+                {"name": n, "offset_ms": round(o * 1000, 3), "duration_ms": round(d * 1000, 3)}
+                for n, o, d in self.spans
+            ],
+        }
+
+    def format(self) -> str:
+        """Multi-line breakdown for chat replies."""
+        lines = [f"trace_id={self.trace_id}  总耗时 {self.duration * 1000:.1f} ms", "阶段耗时:"]
+        for n, o, d in sorted(self.spans, key=lambda s: s[1]):
+            lines.append(f"· {n}: {d * 1000:.1f} ms（+{o * 1000:.1f} ms）")
+        return "\n".join(lines)
+
+
+_slow_lock = threading.Lock()
+_slow: deque[Trace] = deque(maxlen=SLOW_CALLS_KEPT)
+
+
+def current() -> Trace | None:
+    return _current.get()
+
+
+def span(name: str) -> ContextManager[None]:
+    """Span on the current trace, or a no-op outside a traced call."""
+    tr = _current.get()
+    return tr.span(name) if tr is not None else nullcontext()
+
+
+@contextmanager
+def tracing(context: CallContext | None = None) -> Iterator[Trace]:
+    """New Trace, current for the enclosed block and finished on exit (see Trace.activate and Trace.finish)."""
+    tr = Trace(context)
+    try:
+        with tr.activate():
+            yield tr
+    finally:
+        tr.finish()
+
+
+def slow_calls() -> list[dict[str, Any]]:
+    """Recent slow calls, newest first."""
+    with _slow_lock:
+        traces = list(_slow)
+    return [t.to_dict() for t in reversed(traces)]
+
+
+def clear_slow_calls() -> None:
+    with _slow_lock:
+        _slow.clear()
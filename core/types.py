@@ -3,6 +3,8 @@
 
 from __future__ import annotations
 
+import os
+import weakref
 from typing import Literal
 
 ResultType = Literal["text", "image", "video", "audio"]
@@ -11,15 +13,35 @@ ResultType = Literal["text", "image", "video", "audio"]
 class CallContext:
     """Platform-agnostic call context for permission and placeholders."""
 
-    __slots__ = ("user_id", "group_id")
+    __slots__ = ("user_id", "group_id", "is_admin")
 
     def __init__(
         self,
         user_id: str | None = None,
         group_id: str | None = None,
+        is_admin: bool = False,
     ) -> None:
         self.user_id = user_id
         self.group_id = group_id
+        self.is_admin = is_admin
+
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+class TempMediaFile:
+    """Temp file holding a streamed media body; the file is removed once the last reference is dropped."""
+
+    __slots__ = ("path", "size", "_finalizer", "__weakref__")
+
+    def __init__(self, path: str, size: int) -> None:
+        self.path = path
+        self.size = size
+        self._finalizer = weakref.finalize(self, _unlink_quietly, path)
 
 
 class CallResult:
@@ -32,6 +54,8 @@ class CallResult:
         "media_url",
         "media_bytes",
         "media_content_type",
+        "media_path",
+        "media_file",
     )
 
     def __init__(
@@ -42,6 +66,8 @@ class CallResult:
         media_url: str | None = None,
         media_bytes: bytes | None = None,
         media_content_type: str | None = None,
+        media_path: str | None = None,
+        media_file: TempMediaFile | None = None,
     ) -> None:
         self.success = success
         self.message = message
@@ -49,3 +75,7 @@ class CallResult:
         self.media_url = media_url
         self.media_bytes = media_bytes
         self.media_content_type = media_content_type
+        # Local file holding the media body (e.g. a disk cache blob); owned by ApiDog, callers must not delete it.
+        self.media_path = media_path if media_path is not None else (media_file.path if media_file else None)
+        # Keeps a streamed temp file alive for as long as this result (or a cache entry holding it) exists.
+        self.media_file = media_file
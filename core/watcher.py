@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Poll the data files' stat info and hot-reload the loader cache when one is edited on disk."""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Callable
+
+from . import loader
+from .log_helper import logger
+
+POLL_INTERVAL_SECONDS = 0.5
+
+
+def _stamp(path: Path) -> tuple[int, int, int] | None:
+    """(mtime_ns, size, inode), or None when the file does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class ConfigWatcher:
+    """
+    Background thread that stats apis/config/auth/groups/schedules.json every interval seconds.
+    Changed files are re-read and published via loader.refresh, then on_change(names) is called.
+    The inode is part of the stamp, so atomic replace (write temp + rename) is detected too.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        on_change: Callable[[set[str]], None] | None = None,
+        interval: float = POLL_INTERVAL_SECONDS,
+    ) -> None:
+        self.data_dir = data_dir
+        self.on_change = on_change
+        self.interval = interval
+        self._stamps = self._scan()
+        # stamps of edits that failed to parse, so a broken file is not re-read (and re-logged) every poll
+        self._failed: dict[str, tuple[int, int, int] | None] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _scan(self) -> dict[str, tuple[int, int, int] | None]:
+        return {name: _stamp(self.data_dir / fname) for fname, name in loader.DATA_FILES.items()}
+
+    def poll(self) -> set[str]:
+        """
+        Check once; reload and return the names of files published. A file that fails to parse keeps its old
+        stamp (the last good version stays live) and is retried as soon as it changes again.
+        """
+        stamps = self._scan()
+        changed = {
+            name
+            for name, st in stamps.items()
+            if st != self._stamps.get(name) and (name not in self._failed or st != self._failed[name])
+        }
+        if not changed:
+            return changed
+        try:
+            published = loader.refresh(self.data_dir, changed)
+        except Exception:
+            published = set()
+            logger.exception("ApiDog config reload failed: %s", sorted(changed))
+        for name in changed:
+            if name in published:
+                self._stamps[name] = stamps[name]
+                self._failed.pop(name, None)
+            else:
+                self._failed[name] = stamps[name]
+        if not published:
+            return published
+        logger.info("ApiDog 配置文件已变更，已重新加载: %s", ", ".join(sorted(published)))
+        if self.on_change is not None:
+            try:
+                self.on_change(published)
+            except Exception:
+                logger.exception("ApiDog config change callback failed")
+        return published
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="apidog-config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 2.0) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+
+
+_lock = threading.Lock()
+_watcher: ConfigWatcher | None = None
+
+
+def start_watcher(data_dir: Path, on_change: Callable[[set[str]], None] | None = None) -> ConfigWatcher:
+    """Start the process-wide watcher for data_dir (replacing any previous one). Warms the loader cache first."""
+    global _watcher
+    loader.refresh(data_dir, loader.DATA_FILES.values())
+    with _lock:
+        old, _watcher = _watcher, ConfigWatcher(data_dir, on_change)
+        _watcher.start()
+        new = _watcher
+    if old is not None:
+        old.stop()
+    return new
+
+
+def stop_watcher() -> None:
+    global _watcher
+    with _lock:
+        old, _watcher = _watcher, None
+    if old is not None:
+        old.stop()
@@ -16,17 +16,29 @@ from astrbot.api.star import Context, Star, StarTools, register
 from astrbot.api.message_components import Image, Plain, Record, Video
 
 from .api import create_app
-from .core import CallContext, CallResult, run
-from .core.loader import get_api_port, load_apis, load_config
+from .core import CallContext, CallResult, close_captures, close_clients, close_disk_caches, run
+from .core import trace as trace_mod
+from .core.loader import get_api_port
 from .core.log_helper import set_apidog_logger
-from .core.command_gen import block_content_is_pass, inject_commands_into_main
-from .core.tool_gen import (
-    apis_for_llm_tools,
-    execute_apidog_llm_tool,
-    inject_llm_tools_into_main,
-    llm_tool_block_content_is_pass,
-)
-from .runtime import start_scheduler, stop_scheduler
+from .core.request import media_suffix
+from .core.watcher import start_watcher, stop_watcher
+from .runtime import Dispatcher, reload_schedules, start_scheduler, stop_scheduler
+from .runtime.router import command_router
+
+_ROUTE_EXTRA = "apidog_route"
+
+
+class _StandaloneCommandFilter(filter.CustomFilter):
+    """Passes woken messages whose first word(s) are an as_cmd command; the route is stashed on the event."""
+
+    def filter(self, event: AstrMessageEvent, cfg: Any) -> bool:
+        if not event.is_at_or_wake_command:
+            return False
+        route = command_router.match(event.get_message_str().strip())
+        if route is None:
+            return False
+        event.set_extra(_ROUTE_EXTRA, route)
+        return True
 
 
 @register(
@@ -40,6 +52,10 @@ class ApiDogStar(Star):
         super().__init__(context)
         set_apidog_logger(_ab_logger)
         self._data_dir = Path(StarTools.get_data_dir(None))
+        try:
+            start_watcher(self._data_dir, on_change=self._on_data_files_changed)
+        except Exception:
+            _ab_logger.exception("配置文件监听启动失败")
         start_scheduler(self._data_dir, send_message=self._send_scheduled_result)
         self._api_app = create_app(self._data_dir)
         port = get_api_port(self._data_dir)
@@ -49,61 +65,59 @@ class ApiDogStar(Star):
         self._uvicorn_server = uvicorn.Server(config)
         self._uvicorn_thread = threading.Thread(target=self._uvicorn_server.run, daemon=True)
         self._uvicorn_thread.start()
-        main_path = Path(__file__).resolve()
-        try:
-            apis = load_apis(self._data_dir)
-            _ = load_config(self._data_dir)
-        except Exception:
-            apis = []
-        if block_content_is_pass(main_path):
-            try:
-                inject_commands_into_main(main_path, apis)
-                enabled_cmd = [
-                    a for a in apis
-                    if a.get("enabled", True) is not False and a.get("as_cmd", False) is True
-                ]
-                if enabled_cmd:
-                    self._pending_reload_after_inject = True
-                    _ab_logger.info("已根据配置写回独立指令到 main.py，重载插件后生效")
-            except Exception:
-                _ab_logger.exception("首次加载写回独立指令失败")
-        if llm_tool_block_content_is_pass(main_path):
-            try:
-                inject_llm_tools_into_main(main_path, apis)
-                if apis_for_llm_tools(apis):
-                    self._pending_reload_after_inject = True
-                    _ab_logger.info("已根据配置写回 LLM 工具（@filter.llm_tool）到 main.py，重载插件后生效")
-            except Exception:
-                _ab_logger.exception("首次加载写回 LLM 工具失败")
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._dispatcher = Dispatcher(self, self._data_dir)
 
     async def initialize(self) -> None:
-        """注册保存后自动重载当前插件的回调（供配置页 PUT 后调用）。"""
+        """注册独立指令与 LLM 工具；注册配置页修改端口后自动重载当前插件的回调。"""
+        self._loop = asyncio.get_running_loop()
+        try:
+            self._dispatcher.sync()
+        except Exception:
+            _ab_logger.exception("注册独立指令 / LLM 工具失败")
+        self._api_app.state.on_apis_changed = self._schedule_dispatcher_sync
         try:
             pm = getattr(self.context, "_star_manager", None)
             if pm is not None and getattr(self, "name", None):
-                loop = asyncio.get_running_loop()
-                self._api_app.state.reload_trigger = (pm, self.name, loop)
-                if getattr(self, "_pending_reload_after_inject", False):
-                    try:
-                        plugin_name = self.name
-
-                        async def _reload_self() -> None:
-                            await pm.reload(plugin_name)
-
-                        loop.call_soon_threadsafe(
-                            lambda: asyncio.ensure_future(_reload_self(), loop=loop)
-                        )
-                    except Exception:
-                        _ab_logger.exception("调度插件自重载失败")
-                    finally:
-                        if hasattr(self, "_pending_reload_after_inject"):
-                            del self._pending_reload_after_inject
+                self._api_app.state.reload_trigger = (pm, self.name, self._loop)
         except Exception:
             _ab_logger.debug("ApiDog 未设置自动重载回调: %s", exc_info=True)
 
+    def _schedule_dispatcher_sync(self) -> None:
+        """Thread-safe: re-sync commands / LLM tools with the registry on the event loop."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        def _sync() -> None:
+            try:
+                self._dispatcher.sync()
+            except Exception:
+                _ab_logger.exception("同步独立指令 / LLM 工具失败")
+
+        loop.call_soon_threadsafe(_sync)
+
+    def _on_data_files_changed(self, names: set[str]) -> None:
+        """Watcher callback (runs on the watcher thread): loader caches are already refreshed."""
+        if "schedules" in names:
+            reload_schedules(self._data_dir)
+        if "apis" in names or "config" in names:
+            self._schedule_dispatcher_sync()
+
     async def terminate(self) -> None:
-        """Plugin unload: stop scheduler and uvicorn."""
+        """Plugin unload: stop the config watcher, close pooled http clients, stop scheduler and uvicorn."""
+        stop_watcher()
+        try:
+            self._dispatcher.clear()
+        except Exception:
+            _ab_logger.exception("移除独立指令 / LLM 工具失败")
+        try:
+            await close_clients()
+        except Exception:
+            _ab_logger.exception("关闭 HTTP 连接池失败")
         stop_scheduler()
+        close_disk_caches()
+        close_captures()
         if getattr(self, "_uvicorn_server", None) is not None:
             self._uvicorn_server.should_exit = True
             thread = getattr(self, "_uvicorn_thread", None)
@@ -121,17 +135,13 @@ class ApiDogStar(Star):
             return [Video.fromURL(url=result.media_url)], []
         if result.result_type == "audio" and result.media_url:
             return [Record(url=result.media_url)], []
+        if result.media_path and result.result_type in ("image", "video", "audio"):
+            # ApiDog-owned file (e.g. disk cache blob): send in place, never delete
+            if result.result_type == "image":
+                return [Image.fromFileSystem(path=result.media_path)], []
+            return [Plain(f"（媒体已收到，{result.result_type}）")], []
         if result.media_bytes and result.result_type in ("image", "video", "audio"):
-            suffix = ".jpg"
-            if result.media_content_type:
-                if "png" in result.media_content_type:
-                    suffix = ".png"
-                elif "gif" in result.media_content_type:
-                    suffix = ".gif"
-                elif "video" in result.media_content_type or result.result_type == "video":
-                    suffix = ".mp4"
-                elif "audio" in result.media_content_type or result.result_type == "audio":
-                    suffix = ".wav"
+            suffix = media_suffix(result.media_content_type, result.result_type)
             try:
                 with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as f:
                     f.write(result.media_bytes)
@@ -160,8 +170,21 @@ class ApiDogStar(Star):
         ctx: CallContext,
         extra_config: dict[str, Any] | None,
     ):
-        """Run API with raw_args and yield message results to event. Shared by /api and generated commands."""
-        result = await run(self._data_dir, raw_args, ctx, extra_config)
+        """Run API with raw_args and yield message results to event. Shared by /api and standalone commands."""
+        tr = trace_mod.Trace(ctx)
+        try:
+            with tr.activate():
+                result = await run(self._data_dir, raw_args, ctx, extra_config)
+            # each yield hands the result to the bot's respond stage, so this span covers the platform send;
+            # it runs with the trace no longer current, as the yields suspend us inside the caller's task
+            with tr.span("platform_send"):
+                async for x in self._send_result(event, result):
+                    yield x
+        finally:
+            tr.finish()
+
+    async def _send_result(self, event: AstrMessageEvent, result: CallResult):
+        """Yield the message results for one CallResult."""
         if not result.success:
             yield event.plain_result(result.message)
             return
@@ -184,17 +207,15 @@ class ApiDogStar(Star):
                 except Exception:
                     yield event.plain_result(f"音频链接: {result.media_url}")
                 return
+        if result.media_path and result.result_type in ("image", "video", "audio"):
+            # ApiDog-owned file (e.g. disk cache blob): send in place, never delete
+            if result.result_type == "image":
+                yield event.chain_result([Image.fromFileSystem(path=result.media_path)])
+            else:
+                yield event.plain_result(f"（媒体已收到，{result.result_type} 从字节发送暂用链接或文件）")
+            return
         if result.media_bytes and result.result_type in ("image", "video", "audio"):
-            suffix = ".jpg"
-            if result.media_content_type:
-                if "png" in result.media_content_type:
-                    suffix = ".png"
-                elif "gif" in result.media_content_type:
-                    suffix = ".gif"
-                elif "video" in result.media_content_type or result.result_type == "video":
-                    suffix = ".mp4"
-                elif "audio" in result.media_content_type or result.result_type == "audio":
-                    suffix = ".wav"
+            suffix = media_suffix(result.media_content_type, result.result_type)
             try:
                 with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as f:
                     f.write(result.media_bytes)
@@ -211,17 +232,8 @@ class ApiDogStar(Star):
             return
         yield event.plain_result(result.message)
 
-    @filter.command("api")
-    async def cmd_api(self, event: AstrMessageEvent) -> None:
-        """通过接口名调用配置的 API。用法: /api <接口名> [参数...]，例如 /api 天气 北京"""
-        raw = event.message_str.strip()
-        for prefix in ("/api ", "/api\t", "api ", "api\t"):
-            if raw.startswith(prefix):
-                raw = raw[len(prefix):].strip()
-                break
-        if not raw:
-            yield event.plain_result("用法: /api <接口名> [参数...]，例如 /api 天气 北京")
-            return
+    @staticmethod
+    def _call_context(event: AstrMessageEvent) -> CallContext:
         try:
             user_id = str(event.get_sender_id())
         except Exception:
@@ -231,21 +243,43 @@ class ApiDogStar(Star):
             group_id = str(gid) if gid is not None else None
         except Exception:
             group_id = None
-        ctx = CallContext(user_id=user_id, group_id=group_id)
-        extra_config = None
+        try:
+            is_admin = bool(event.is_admin())
+        except Exception:
+            is_admin = False
+        return CallContext(user_id=user_id, group_id=group_id, is_admin=is_admin)
+
+    def _extra_config(self) -> dict[str, Any] | None:
         try:
             cfg = self.context.cfg_get("apidog")
             if isinstance(cfg, dict):
-                extra_config = cfg
+                return cfg
         except Exception:
             pass
+        return None
+
+    @filter.command("api")
+    async def cmd_api(self, event: AstrMessageEvent) -> None:
+        """通过接口名调用配置的 API。用法: /api <接口名> [参数...]，例如 /api 天气 北京"""
+        raw = event.message_str.strip()
+        for prefix in ("/api ", "/api\t", "api ", "api\t"):
+            if raw.startswith(prefix):
+                raw = raw[len(prefix):].strip()
+                break
+        if not raw:
+            yield event.plain_result("用法: /api <接口名> [参数...]，例如 /api 天气 北京")
+            return
+        ctx = self._call_context(event)
+        extra_config = self._extra_config()
         async for x in self._run_and_send(event, raw, ctx, extra_config):
             yield x
 
-    # --- BEGIN GENERATED COMMANDS ---
-    pass
-    # --- END GENERATED COMMANDS ---
-
-    # --- BEGIN GENERATED LLM TOOLS ---
-    pass
-    # --- END GENERATED LLM TOOLS ---
+    @filter.custom_filter(_StandaloneCommandFilter)
+    async def cmd_standalone(self, event: AstrMessageEvent) -> None:
+        """ApiDog 独立指令（as_cmd）的统一入口，按指令名路由到对应接口。"""
+        route = event.get_extra(_ROUTE_EXTRA) or command_router.match(event.get_message_str().strip())
+        if route is None:
+            return
+        raw_args = route.api_key + (" " + route.args if route.args else "")
+        async for x in self._run_and_send(event, raw_args, self._call_context(event), self._extra_config()):
+            yield x
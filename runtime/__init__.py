@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
-"""Runtime components (scheduler, etc.) separate from bot command entry."""
+"""Runtime components (scheduler, command/tool dispatcher) separate from bot command entry."""
 
 from __future__ import annotations
 
 from pathlib import Path
 
-from .scheduler import start_scheduler, stop_scheduler
+from .dispatcher import Dispatcher
+from .scheduler import reload_schedules, start_scheduler, stop_scheduler
 
-__all__ = ["start_scheduler", "stop_scheduler"]
+__all__ = ["Dispatcher", "reload_schedules", "start_scheduler", "stop_scheduler"]
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Keep as_cmd command routes and as_tool LLM tools on the running bot in step with the loaded API registry."""
+
+from __future__ import annotations
+
+import itertools
+from pathlib import Path
+from typing import Any, Callable
+
+from ..core.loader import ApiRegistry, load_registry
+from ..core.log_helper import logger
+from ..core.tool_gen import execute_apidog_llm_tool
+from .router import CommandRouter, command_router
+
+# tool handlers get distinct names so the bot can tell them apart in logs and listings
+_handler_ids = itertools.count(1)
+
+
+def _one_line(s: Any) -> str:
+    return " ".join(str(s or "").split())
+
+
+def desired_handlers(registry: ApiRegistry) -> tuple[dict[str, str], dict[str, tuple[str, str]]]:
+    """
+    From the enabled APIs: ({command: api_key} for as_cmd, {tool_name: (description, args_description)}
+    for as_tool). First API in file order wins a name.
+    """
+    commands: dict[str, str] = {}
+    tools: dict[str, tuple[str, str]] = {}
+    for entry in registry.enabled:
+        api = entry.api
+        desc = _one_line(api.get("description"))
+        if api.get("as_cmd", False) is True:
+            cmd_name = api.get("command") or api.get("id")
+            api_key = api.get("id") or api.get("command")
+            if isinstance(cmd_name, str) and cmd_name and isinstance(api_key, str):
+                commands.setdefault(cmd_name, api_key)
+        if api.get("as_tool", False) is True:
+            api_key = api.get("id") or api.get("command")
+            if isinstance(api_key, str) and api_key:
+                args_desc = _one_line(api.get("args_desc") or api.get("tool_args_desc") or "无需填写则留空。")
+                tools.setdefault(api_key, (desc or f"调用接口：{api_key}", args_desc))
+    return commands, tools
+
+
+class Dispatcher:
+    """
+    Keeps the bot's ApiDog commands and LLM tools equal to the current registry. Commands are routes in a
+    CommandRouter served by one handler in main.py; LLM tools are diffed against what is registered and only
+    the difference is added/removed. Nothing is written to main.py and the plugin is not reloaded.
+    Call sync() on the event loop thread.
+    """
+
+    def __init__(self, star: Any, data_dir: Path, router: CommandRouter = command_router) -> None:
+        self._star = star
+        self._context = star.context
+        self._data_dir = data_dir
+        self._module = type(star).__module__
+        self._router = router
+        self._version: int | None = None
+        # tool name -> (description, args_description)
+        self._tools: dict[str, tuple[str, str]] = {}
+
+    def sync(self) -> None:
+        registry = load_registry(self._data_dir)
+        if registry.version == self._version:
+            return
+        self._version = registry.version
+        commands, tools = desired_handlers(registry)
+        self._router.update(commands)
+        for name in [n for n, spec in self._tools.items() if tools.get(n) != spec]:
+            self._unregister_tool(name)
+        for name, spec in tools.items():
+            if name not in self._tools:
+                self._register_tool(name, spec)
+        logger.debug("ApiDog handlers synced commands=%d tools=%d", len(self._router), len(self._tools))
+
+    def clear(self) -> None:
+        """Remove everything this dispatcher registered (plugin unload)."""
+        self._router.update({})
+        for name in list(self._tools):
+            self._unregister_tool(name)
+        self._version = None
+
+    def _named(self, fn: Callable, prefix: str, doc: str) -> Callable:
+        fn.__module__ = self._module
+        fn.__name__ = fn.__qualname__ = f"{prefix}_{next(_handler_ids)}"
+        fn.__doc__ = doc
+        return fn
+
+    def _register_tool(self, name: str, spec: tuple[str, str]) -> None:
+        get_manager = getattr(self._context, "get_llm_tool_manager", None)
+        if get_manager is None:
+            logger.warning("当前 AstrBot 不支持动态注册 LLM 工具，工具 %s 未生效", name)
+            return
+        desc, args_desc = spec
+        star = self._star
+
+        async def tool(event: Any, args: str = "") -> str:
+            return await execute_apidog_llm_tool(star, event, name, args)
+
+        tool = self._named(tool, "apidog_tool", desc)
+        try:
+            manager = get_manager()
+            manager.add_func(name, [{"type": "string", "name": "args", "description": args_desc}], desc, tool)
+            func = manager.get_func(name)
+            if func is not None:
+                # lets the bot tie the tool to this plugin (activation state, tool listing)
+                func.handler_module_path = self._module
+        except Exception:
+            logger.exception("注册 LLM 工具失败: %s", name)
+            return
+        self._tools[name] = spec
+
+    def _unregister_tool(self, name: str) -> None:
+        del self._tools[name]
+        try:
+            self._context.get_llm_tool_manager().remove_func(name)
+        except Exception:
+            logger.exception("移除 LLM 工具失败: %s", name)
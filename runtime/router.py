@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Standalone command router: one dict lookup per message, however many as_cmd APIs exist."""
+
+from __future__ import annotations
+
+from typing import Mapping, NamedTuple
+
+
+class Route(NamedTuple):
+    command: str
+    api_key: str
+    args: str
+
+
+class CommandRouter:
+    """
+    Maps command names to API keys. Routes are keyed by the first word of the command; commands with
+    spaces ("天气 预报") sit in a per-first-word list, longest first. update() swaps the whole table in
+    one assignment, so match() never sees a half-built table.
+    """
+
+    __slots__ = ("_table",)
+
+    def __init__(self, commands: Mapping[str, str] | None = None) -> None:
+        self._table: dict[str, tuple[tuple[tuple[str, ...], str, str], ...]] = {}
+        if commands:
+            self.update(commands)
+
+    def update(self, commands: Mapping[str, str]) -> None:
+        """Replace all routes with {command: api_key}."""
+        grouped: dict[str, list[tuple[tuple[str, ...], str, str]]] = {}
+        for command, api_key in commands.items():
+            words = tuple(command.split())
+            if words:
+                grouped.setdefault(words[0], []).append((words, command, api_key))
+        self._table = {
+            head: tuple(sorted(routes, key=lambda r: -len(r[0])))
+            for head, routes in grouped.items()
+        }
+
+    def match(self, message: str) -> Route | None:
+        """Route for a message (wake prefix already removed), with the remaining text as args."""
+        table = self._table
+        if not table or not message:
+            return None
+        parts = message.split(None, 1)
+        if not parts:
+            return None
+        routes = table.get(parts[0])
+        if routes is None:
+            return None
+        for words, command, api_key in routes:
+            n = len(words)
+            split = parts if n == 1 else message.split(None, n)
+            if tuple(split[:n]) == words:
+                return Route(command, api_key, split[n].strip() if len(split) > n else "")
+        return None
+
+    def __len__(self) -> int:
+        return sum(len(r) for r in self._table.values())
+
+
+# Process-wide router for the plugin's as_cmd commands; the dispatcher keeps it in sync with the registry.
+command_router = CommandRouter()
@@ -10,7 +10,7 @@ from typing import Any, Awaitable, Callable
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
-from ..core import run
+from ..core import close_clients_nowait, run
 from ..core.loader import load_schedules
 from ..core.log_helper import logger
 from ..core.types import CallContext, CallResult
@@ -135,7 +135,7 @@ def start_scheduler(data_dir: Path, send_message: SendMessageFn | None = None) -
 
 
 def stop_scheduler() -> None:
-    """Stop the scheduler and clear state. Call on plugin unload."""
+    """Stop the scheduler, close pooled http clients and clear state. Call on plugin unload."""
     global _scheduler, _started, _data_dir, _send_message
     if _scheduler is not None:
         try:
@@ -144,6 +144,7 @@ def stop_scheduler() -> None:
         except Exception:
             logger.exception("Scheduler shutdown error")
         _scheduler = None
+    close_clients_nowait()
     _started = False
     _data_dir = None
     _send_message = None
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Shared fixtures: core importable as a top-level package, a scripted local upstream and data directories."""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+class _Upstream(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _UpstreamHandler)
+        # (status, body) answered in order; once empty every request gets 200 {"ok": true}
+        self.responses: list[tuple[int, bytes]] = []
+        self.requests: list[dict[str, str]] = []
+        # seconds each response is held back, so concurrent callers overlap
+        self.delay = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # as in bench.stub: no Nagle delay between the header and body writes
+    disable_nagle_algorithm = True
+    server: _Upstream
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.requests.append(dict(parse_qsl(urlsplit(self.path).query)))
+            status, body = self.server.responses.pop(0) if self.server.responses else (200, b'{"ok": true}')
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def upstream():
+    server = _Upstream()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def write_data(tmp_path):
+    """write_data(apis=[...], auth={...}, config={...}, groups={...}) -> data dir with those JSON files."""
+
+    def write(apis=None, auth=None, config=None, groups=None) -> Path:
+        files = {"apis.json": {"apis": apis or []}, "auth.json": auth or {}, "config.json": config or {}}
+        if groups is not None:
+            files["groups.json"] = groups
+        for name, content in files.items():
+            (tmp_path / name).write_text(json.dumps(content, ensure_ascii=False), encoding="utf-8")
+        return tmp_path
+
+    return write
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+import core
+from core import cache as cache_mod
+from core import disk_cache
+from core.types import CallResult
+
+PERSIST = (3600.0, 16, 1 << 20, True)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_caches():
+    cache_mod._caches.clear()
+    yield
+    cache_mod._caches.clear()
+    disk_cache.close_all()
+
+
+def _image(data):
+    return CallResult(success=True, message="", result_type="image", media_bytes=data)
+
+
+def test_promoted_disk_hit_whose_blob_was_evicted_is_a_miss(tmp_path):
+    async def go():
+        disk = disk_cache.get_disk_cache(tmp_path)
+        disk.put("a", disk_cache.hash_key("k1"), _image(b"\x89PNG one"), 3600)
+        promoted = await cache_mod.lookup(tmp_path, "a", PERSIST, "k1")
+        assert promoted.media_path is not None
+        # another key of the same API pushes k1 and its blob out of the disk tier
+        disk.put("a", disk_cache.hash_key("k2"), _image(b"\x89PNG two"), 3600, max_entries=1)
+        return await cache_mod.lookup(tmp_path, "a", PERSIST, "k1")
+
+    assert asyncio.run(go()) is None
+    assert cache_mod.get_cache("a", PERSIST).stats()["entries"] == 0
+
+
+def _text(msg):
+    return CallResult(success=True, message=msg, result_type="text")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_mod.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = cache_mod.ResponseCache(ttl=10, max_entries=8, max_bytes=1 << 20)
+    cache.put("k", _text("v"))
+    clock[0] += 9.9
+    assert cache.get("k").message == "v"
+    clock[0] += 0.1
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+    cache.put("short", _text("v"), ttl=1)
+    clock[0] += 1
+    assert cache.get("short") is None
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = cache_mod.ResponseCache(ttl=60, max_entries=2, max_bytes=1 << 20)
+    cache.put("a", _text("1"))
+    cache.put("b", _text("2"))
+    assert cache.get("a") is not None  # b is now the least recently used
+    cache.put("c", _text("3"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    sized = cache_mod.ResponseCache(ttl=60, max_entries=100, max_bytes=25)
+    for k in "xyz":
+        sized.put(k, _text("0123456789"))
+    assert [sized.get(k) is not None for k in "xyz"] == [False, True, True]
+    sized.put("huge", _text("x" * 26))  # larger than the whole budget: not cached, nothing evicted
+    assert sized.stats()["entries"] == 2
+    assert sized.stats()["evictions"] == 1
+
+
+def test_disk_hit_is_promoted_for_its_remaining_ttl(tmp_path, clock):
+    async def go():
+        disk = disk_cache.get_disk_cache(tmp_path)
+        disk.put("a", disk_cache.hash_key("k"), _text("from disk"), 5)
+        hit = await cache_mod.lookup(tmp_path, "a", PERSIST, "k")
+        memory = cache_mod.get_cache("a", PERSIST)
+        assert memory.get("k") is hit
+        clock[0] += 6  # past the disk entry's remaining 5s, though the API's ttl is 3600
+        assert memory.get("k") is None
+        return hit
+
+    assert asyncio.run(go()).message == "from disk"
+
+
+def test_cached_call_skips_the_upstream(upstream, write_data):
+    api = {"id": "c", "command": "c", "url": upstream.url + "/c", "params": {"q": "{{args.0}}"}}
+    data_dir = write_data(apis=[{**api, "cache": {"ttl_seconds": 60}}])
+
+    async def go():
+        try:
+            first = await core.run(data_dir, "c x", core.CallContext("u1"))
+            second = await core.run(data_dir, "c x", core.CallContext("u2"))
+            other = await core.run(data_dir, "c y", core.CallContext("u1"))
+            return first, second, other
+        finally:
+            await core.close_clients()
+
+    first, second, other = asyncio.run(go())
+    assert first.success and second.message == first.message and other.success
+    assert [r["q"] for r in upstream.requests] == ["x", "y"]
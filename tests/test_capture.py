@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+import json
+
+import core
+from core import capture
+
+
+def _lines(data_dir):
+    path = data_dir / capture.DEFAULT_FILE
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def _call(data_dir, raw_args):
+    async def go():
+        try:
+            return await core.run(data_dir, raw_args, core.CallContext("u1"))
+        finally:
+            await core.close_clients()
+
+    return asyncio.run(go())
+
+
+def test_capture_path_must_stay_inside_data_dir(tmp_path):
+    assert capture.parse_capture_config({"mode": "record", "file": "../out.jsonl"}, tmp_path) is None
+    assert capture.parse_capture_config({"mode": "record", "file": "/tmp/out.jsonl"}, tmp_path) is None
+    config = capture.parse_capture_config({"mode": "record", "file": "rec/a.jsonl"}, tmp_path)
+    assert config["path"] == str((tmp_path / "rec" / "a.jsonl").resolve())
+    assert capture.parse_capture_config({"mode": "off"}, tmp_path) is None
+
+
+def test_redact_walks_nested_values():
+    secrets = capture.auth_secrets({"k": {"type": "api_key", "key": "apikey", "value": "SECRET123"}, "x": "raw"})
+    assert secrets == ("SECRET123",)
+    assert capture.redact({"a": ["Bearer SECRET123"], "SECRET123": 1}, secrets) == {"a": ["Bearer ***"], "***": 1}
+
+
+def test_retried_request_keeps_key_and_never_records_auth(upstream, write_data):
+    upstream.responses = [(503, b'{"err": 1}')]
+    data_dir = write_data(
+        apis=[{
+            "id": "t",
+            "command": "t",
+            "url": upstream.url + "/x",
+            "params": {"q": "{{args.0}}", "echo": "{{config.k}}"},
+            "auth": "k",
+            "retry": {"max_attempts": 1, "backoff_seconds": 0},
+        }],
+        auth={"k": {"type": "api_key", "in": "query", "key": "apikey", "value": "SECRET123"}},
+        config={"capture": {"mode": "record"}},
+    )
+    result = _call(data_dir, "t hello")
+    assert result.success
+    # both attempts carried the credential upstream
+    assert [r.get("apikey") for r in upstream.requests] == ["SECRET123", "SECRET123"]
+    first, second = _lines(data_dir)
+    assert (first["status"], second["status"]) == (503, 200)
+    assert first["key"] == second["key"]
+    assert second["params"] == {"q": "hello", "echo": "***"}
+    assert "SECRET123" not in (data_dir / capture.DEFAULT_FILE).read_text(encoding="utf-8")
+
+
+def test_replay_serves_recording_offline(upstream, write_data):
+    apis = [{"id": "t", "command": "t", "url": upstream.url + "/x", "params": {"q": "{{args.0}}"}}]
+    upstream.responses = [(200, b'{"v": "recorded"}')]
+    data_dir = write_data(apis=apis, config={"capture": {"mode": "record"}})
+    assert "recorded" in _call(data_dir, "t a").message
+    write_data(apis=apis, config={"capture": {"mode": "replay"}})
+    core.loader.invalidate_config(data_dir)
+    upstream.responses = [(200, b'{"v": "live"}')]
+    assert "recorded" in _call(data_dir, "t a").message
+    miss = _call(data_dir, "t other")
+    assert not miss.success
+    assert len(upstream.requests) == 1
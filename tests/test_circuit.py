@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+
+from core import circuit
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _settings(**kw):
+    return circuit.parse_breaker_config({"failure_threshold": 2, "reset_seconds": 10, **kw})
+
+
+def test_opens_after_threshold_then_half_opens_and_closes(clock):
+    b = circuit.CircuitBreaker("t", _settings())
+    for _ in range(2):
+        assert b.allow()
+        b.record(False)
+    assert b.state == circuit.OPEN
+    assert not b.allow()
+    clock[0] += 10
+    assert b.allow()
+    assert b.state == circuit.HALF_OPEN
+    assert not b.allow()  # one probe at a time
+    b.record(True)
+    assert b.state == circuit.CLOSED
+    assert b.consecutive_failures == 0
+
+
+def test_failed_probe_reopens(clock):
+    b = circuit.CircuitBreaker("t", _settings(failure_threshold=1))
+    b.allow()
+    b.record(False)
+    clock[0] += 10
+    assert b.allow()
+    b.record(False)
+    assert b.state == circuit.OPEN
+    assert b.times_opened == 2
+    assert b.retry_in() == 10
+
+
+def test_success_resets_the_failure_count(clock):
+    b = circuit.CircuitBreaker("t", _settings())
+    b.record(False)
+    b.record(True)
+    b.record(False)
+    assert b.state == circuit.CLOSED
+
+
+def test_abandoned_probe_frees_its_slot(clock):
+    b = circuit.CircuitBreaker("t", _settings(failure_threshold=1))
+    b.record(False)
+    clock[0] += 10
+    assert b.allow()
+    b.abandon()
+    assert b.allow()
+
+
+def test_host_breakers_with_different_settings_keep_their_state():
+    url = "http://breaker-host.example/x"
+    a = _settings(scope="host")
+    b = _settings(scope="host", failure_threshold=5)
+    first = circuit.get_breaker("a", url, a)
+    first.record(False)
+    first.record(False)
+    assert circuit.get_breaker("b", url, b) is not first
+    assert circuit.get_breaker("a", url, a) is first
+    assert first.state == circuit.OPEN
+    labels = [k for k in circuit.stats() if k.startswith("host:breaker-host.example")]
+    assert len(labels) == 2
+
+
+def test_api_breaker_is_replaced_when_settings_change():
+    old = circuit.get_breaker("replaced", "http://x", _settings())
+    new = circuit.get_breaker("replaced", "http://x", _settings(failure_threshold=3))
+    assert new is not old
+    assert "api:replaced" in circuit.stats()
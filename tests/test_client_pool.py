@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+import core
+from core import client_pool
+
+
+@pytest.fixture(autouse=True)
+def _empty_pool():
+    client_pool._drain()
+    yield
+    client_pool._drain()
+
+
+def test_same_host_and_settings_share_a_client():
+    async def go():
+        a = client_pool.get_client("http://example.com/a", 10)
+        b = client_pool.get_client("HTTP://EXAMPLE.com/b?x=1", 10.0)
+        await client_pool.close_clients()
+        return a, b
+
+    a, b = asyncio.run(go())
+    assert a is b
+
+
+@pytest.mark.parametrize(
+    "url, timeout, redirects, limits",
+    [
+        ("http://other.com/", 10, True, None),
+        ("https://example.com/", 10, True, None),
+        ("http://example.com:8080/", 10, True, None),
+        ("http://example.com/", 5, True, None),
+        ("http://example.com/", 10, False, None),
+        ("http://example.com/", 10, True, {**client_pool.DEFAULT_POOL_LIMITS, "max_connections": 7}),
+    ],
+)
+def test_different_host_or_settings_get_their_own_client(url, timeout, redirects, limits):
+    async def go():
+        a = client_pool.get_client("http://example.com/", 10)
+        b = client_pool.get_client(url, timeout, redirects, limits)
+        await client_pool.close_clients()
+        return a, b
+
+    a, b = asyncio.run(go())
+    assert a is not b
+
+
+def test_closed_client_is_replaced():
+    async def go():
+        a = client_pool.get_client("http://example.com/", 10)
+        await a.aclose()
+        b = client_pool.get_client("http://example.com/", 10)
+        replaced = b is not a and not b.is_closed
+        await client_pool.close_clients()
+        return replaced
+
+    assert asyncio.run(go())
+
+
+def test_close_clients_closes_and_empties_the_pool():
+    async def go():
+        clients = [client_pool.get_client(f"http://h{i}.com/", 10) for i in range(3)]
+        await client_pool.close_clients()
+        assert not client_pool._clients
+        fresh = client_pool.get_client("http://h0.com/", 10)
+        await client_pool.close_clients()
+        return clients, fresh
+
+    clients, fresh = asyncio.run(go())
+    assert all(c.is_closed for c in clients)
+    assert fresh not in clients
+
+
+def test_close_clients_nowait_on_an_idle_loop():
+    # the unload path (stop_scheduler) runs outside the loop that owns the clients
+    loop = asyncio.new_event_loop()
+    try:
+        async def make():
+            return client_pool.get_client("http://example.com/", 10)
+
+        client = loop.run_until_complete(make())
+        client_pool.close_clients_nowait()
+        assert client.is_closed
+        assert not client_pool._clients
+    finally:
+        loop.close()
+
+
+def test_each_loop_gets_its_own_client():
+    async def make():
+        return client_pool.get_client("http://example.com/", 10)
+
+    first = asyncio.run(make())
+    second = asyncio.run(make())
+    assert first is not second
+
+
+def test_calls_to_one_upstream_reuse_the_pooled_client(upstream, write_data):
+    data_dir = write_data(apis=[{"id": "t", "command": "t", "url": upstream.url + "/t"}])
+
+    async def go():
+        await core.run(data_dir, "t", core.CallContext("u1"))
+        first = dict(client_pool._clients)
+        await core.run(data_dir, "t", core.CallContext("u1"))
+        second = dict(client_pool._clients)
+        await core.close_clients()
+        return first, second
+
+    first, second = asyncio.run(go())
+    assert len(first) == 1
+    assert [c for _, c in second.values()] == [c for _, c in first.values()]
+    assert len(upstream.requests) == 2
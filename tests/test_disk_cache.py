@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import itertools
+
+import pytest
+
+from core import disk_cache
+from core.types import CallResult
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    clock = itertools.count(1_000_000)
+    monkeypatch.setattr(disk_cache.time, "time", lambda: float(next(clock)))
+    inst = disk_cache.DiskCache(tmp_path / "cache")
+    yield inst
+    inst.close()
+
+
+def _text(msg):
+    return CallResult(success=True, message=msg, result_type="text")
+
+
+def _image(data):
+    return CallResult(success=True, message="", result_type="image", media_bytes=data)
+
+
+def test_entry_cap_evicts_least_recently_used(cache):
+    cache.put("a", "k1", _text("one"), 3600, max_entries=2)
+    cache.put("a", "k2", _text("two"), 3600, max_entries=2)
+    assert cache.get("a", "k1") is not None  # k1 is now the most recently used
+    cache.put("a", "k3", _text("three"), 3600, max_entries=2)
+    assert cache.get("a", "k2") is None
+    assert cache.get("a", "k1") is not None
+    assert cache.get("a", "k3") is not None
+
+
+def test_byte_cap_is_per_api(cache):
+    for i in range(5):
+        cache.put("a", f"k{i}", _text("x" * 100), 3600, max_bytes=250)
+        cache.put("b", f"k{i}", _text("x" * 100), 3600)
+    assert cache.summary() == {"entries": 7, "bytes": 700}
+    assert [cache.get("a", f"k{i}") is not None for i in range(5)] == [False, False, False, True, True]
+
+
+def test_evicted_blob_is_removed_unless_still_referenced(cache):
+    shared, own = b"\x89PNG" + b"1" * 64, b"\x89PNG" + b"2" * 64
+    cache.put("a", "k1", _image(shared), 3600, max_entries=1)
+    cache.put("b", "k1", _image(shared), 3600)
+    cache.put("a", "k2", _image(own), 3600, max_entries=1)
+    path = cache.get("b", "k1")[0].media_path
+    assert path is not None and open(path, "rb").read() == shared
+    cache.put("a", "k3", _text("t"), 3600, max_entries=1)
+    assert len(list(cache.blob_dir.glob("*/*"))) == 1
+
+
+def test_prune_removes_expired_rows_but_not_unindexed_blobs(cache):
+    cache.put("a", "old", _image(b"\x89PNG old"), 0.5)
+    # a blob another writer has stored but not indexed yet must survive a prune
+    pending = cache.blob_dir / "ab" / ("ab" + "0" * 62)
+    pending.parent.mkdir(parents=True)
+    pending.write_bytes(b"pending")
+    cache.prune()
+    assert cache.summary()["entries"] == 0
+    assert [p.name for p in cache.blob_dir.glob("*/*")] == [pending.name]
+
+
+def test_expired_entry_is_a_miss(cache):
+    cache.put("a", "k", _text("v"), 0.5)
+    assert cache.get("a", "k") is None
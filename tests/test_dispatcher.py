@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+
+import bench  # noqa: F401  registers the repository root as the package "apidog" (runtime imports ..core)
+from apidog.core import loader
+from apidog.runtime.dispatcher import Dispatcher
+from apidog.runtime.router import CommandRouter
+
+
+class _Func:
+    def __init__(self, handler):
+        self.handler = handler
+        self.handler_module_path = None
+
+
+class _ToolManager:
+    def __init__(self):
+        self.funcs = {}
+        self.added = []
+        self.removed = []
+
+    def add_func(self, name, params, desc, handler):
+        self.funcs[name] = _Func(handler)
+        self.added.append(name)
+
+    def get_func(self, name):
+        return self.funcs.get(name)
+
+    def remove_func(self, name):
+        del self.funcs[name]
+        self.removed.append(name)
+
+
+class _Context:
+    def __init__(self):
+        self.manager = _ToolManager()
+
+    def get_llm_tool_manager(self):
+        return self.manager
+
+
+class _Star:
+    def __init__(self):
+        self.context = _Context()
+
+
+def _save(data_dir, apis):
+    (data_dir / "apis.json").write_text(json.dumps({"apis": apis}, ensure_ascii=False), encoding="utf-8")
+    loader.refresh(data_dir, ["apis"])
+
+
+def _api(api_id, command, **flags):
+    return {"id": api_id, "command": command, "url": "http://127.0.0.1:1/x", **flags}
+
+
+def test_sync_follows_apis_added_changed_and_removed(write_data):
+    data_dir = write_data()
+    star, router = _Star(), CommandRouter()
+    dispatcher = Dispatcher(star, data_dir, router)
+    manager = star.context.manager
+
+    _save(data_dir, [_api("weather", "天气", as_cmd=True, as_tool=True, description="查天气"), _api("plain", "p")])
+    dispatcher.sync()
+    assert router.match("天气 北京").api_key == "weather"
+    assert router.match("p") is None  # not as_cmd
+    assert manager.added == ["weather"]
+    assert manager.funcs["weather"].handler_module_path == type(star).__module__
+
+    # unchanged registry version: nothing is redone
+    dispatcher.sync()
+    assert manager.added == ["weather"]
+
+    _save(
+        data_dir,
+        [
+            _api("weather", "天气", as_cmd=True, as_tool=True, description="查询天气"),
+            _api("news", "新闻", as_cmd=True, as_tool=True),
+        ],
+    )
+    dispatcher.sync()
+    assert router.match("新闻").api_key == "news"
+    # a changed description re-registers that tool only
+    assert manager.removed == ["weather"]
+    assert sorted(manager.added) == ["news", "weather", "weather"]
+
+    _save(data_dir, [_api("news", "新闻", as_tool=True)])
+    dispatcher.sync()
+    assert router.match("天气 北京") is None
+    assert router.match("新闻") is None
+    assert sorted(manager.funcs) == ["news"]
+
+    dispatcher.clear()
+    assert manager.funcs == {}
+    assert len(router) == 0
+
+
+def test_first_api_in_file_order_wins_a_command(write_data):
+    data_dir = write_data()
+    router = CommandRouter()
+    _save(
+        data_dir,
+        [_api("a", "同名", as_cmd=True), _api("b", "同名", as_cmd=True), _api("c", "c", enabled=False, as_cmd=True)],
+    )
+    Dispatcher(_Star(), data_dir, router).sync()
+    assert router.match("同名").api_key == "a"
+    assert router.match("c") is None
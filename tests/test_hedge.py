@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+
+from core import concurrency, hedge, rate_limit
+
+
+def _run(send, settings, limiters, api_key, global_limit):
+    return asyncio.run(hedge.run(send, settings, limiters, api_key, global_limit, lambda r: True))
+
+
+def test_hedge_skipped_for_concurrency_keeps_rate_limit_slot():
+    api_key = "hedge_no_slot"
+    limiters = [concurrency.ConcurrencyLimiter("api:" + api_key, (1, 10, 5.0))]
+    global_limit = (3, 60)
+    # the primary itself is one global call (recorded by run() before the fetch)
+    assert rate_limit.check_and_record_all(global_limit, None, None, api_key)[0]
+
+    async def slow():
+        await asyncio.sleep(0.3)
+        return "ok"
+
+    assert _run(slow, (0.05, 3), limiters, api_key, global_limit) == "ok"
+    stats = hedge.stats()[api_key]
+    assert stats["hedges_fired"] == 0
+    assert stats["hedges_skipped"] == 3
+    # the skipped hedges used no window slots: two more real calls still fit
+    assert rate_limit.check_and_record_all(global_limit, None, None, api_key)[0]
+    assert rate_limit.check_and_record_all(global_limit, None, None, api_key)[0]
+    assert not rate_limit.check_and_record_all(global_limit, None, None, api_key)[0]
+    assert limiters[0].in_flight == 0
+
+
+def test_rate_limited_hedge_returns_its_concurrency_slot():
+    api_key = "hedge_rate_limited"
+    limiters = [concurrency.ConcurrencyLimiter("api:" + api_key, (5, 10, 5.0))]
+    global_limit = (1, 60)
+    assert rate_limit.check_and_record_all(global_limit, None, None, api_key)[0]
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "ok"
+
+    assert _run(slow, (0.05, 2), limiters, api_key, global_limit) == "ok"
+    assert hedge.stats()[api_key]["hedges_skipped"] == 2
+    assert limiters[0].in_flight == 0
+    assert limiters[0].try_acquire()
+
+
+def test_slow_primary_is_beaten_by_hedge():
+    api_key = "hedge_wins"
+    calls = []
+
+    async def send():
+        calls.append(None)
+        await asyncio.sleep(0.5 if len(calls) == 1 else 0.01)
+        return len(calls)
+
+    assert _run(send, (0.05, 1), [], api_key, None) == 2
+    assert hedge.stats()[api_key]["hedges_won"] == 1
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from core import help as help_mod
+from core import loader
+
+
+def test_non_dict_params_do_not_break_the_registry(write_data):
+    data_dir = write_data(
+        apis=[
+            {"id": "bad", "command": "bad", "url": "http://x", "params": ["{{args.0}}"]},
+            {"id": "good", "command": "good", "url": "http://x", "params": {"q": "{{args.0}}"}},
+        ]
+    )
+    registry = loader.load_registry(data_dir)
+    assert registry.find("good").help.detail.endswith("示例: /api good <q>")
+    bad = registry.find("bad").help.detail
+    assert "参数: 无" in bad
+    assert bad.endswith("示例: /api bad")
+
+
+def test_detail_lists_positional_and_named_params():
+    entry = help_mod.HelpEntry(
+        {"id": "w", "command": "天气", "params": {"city": "{{args.0}}", "unit": "{{named.unit|c}}", "k": "{{named.k}}"}}
+    )
+    assert "参数: city；k, unit(可选)" in entry.detail
+    assert entry.detail.endswith("示例: /api 天气 <city> 或 /api 天气 <city> k=<值> unit=<值>")
+
+
+def test_pages_and_search():
+    entries = tuple(help_mod.HelpEntry({"id": f"api{i}", "name": "测试" if i % 2 else "其他"}) for i in range(45))
+    first = help_mod.render_help(entries)
+    assert "第 1/3 页，共 45 个接口。下一页: /api help page=2" in first
+    assert "· api44" in help_mod.render_help(entries, page=99)
+    found = help_mod.render_help(entries, query="测试")
+    assert "共 22 个匹配" in found
+    assert "· api0 " not in found
+    assert help_mod.render_help(entries, target="api3") == entries[3].detail
+    assert help_mod.render_help(entries, target="nope") == "未找到接口: nope。"
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+
+from core.json_path import MISSING, compile_path, dump_capped, format_value
+
+DATA = {
+    "data": {
+        "items": [{"id": 1, "url": "u1"}, {"id": 2, "url": "u2"}, {"id": 3}],
+        "0": "zero-key",
+        "a[0]b": "literal",
+        "a[x]": "literal-x",
+    },
+    "a": [["n0"], ["n1"]],
+}
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("data.items.0.url", "u1"),
+        ("data.items[1].url", "u2"),
+        ("data.items[-1].id", 3),
+        ("data.items[*].url", ["u1", "u2"]),
+        ("data.items.*.id", [1, 2, 3]),
+        ("data.items[0:2].id", [1, 2]),
+        ("data.items[::2].id", [1, 3]),
+        ("data.0", "zero-key"),
+        ("a[1][0]", "n1"),
+        ("data..items.0.id", 1),
+    ],
+)
+def test_paths(path, expected):
+    assert compile_path(path).get(DATA) == expected
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["data.items[5].url", "data.items.9", "data.missing", "data.items[0].url.deeper", "a.0.x"],
+)
+def test_unresolved_is_missing(path):
+    assert compile_path(path).get(DATA) is MISSING
+
+
+def test_malformed_parts_fall_back_to_a_plain_key():
+    # text after a bracket and non-numeric indexes are not silently truncated
+    assert compile_path("data.a[0]b").get(DATA) == "literal"
+    assert compile_path("data.a[x]").get(DATA) == "literal-x"
+    assert compile_path("a[0]b").get(DATA) is MISSING
+    assert compile_path("a[0]x[1]").get(DATA) is MISSING
+    assert compile_path("data.items[1:2:3:4]").get(DATA) is MISSING
+
+
+def test_plain_dotted_keys_match_the_original_lookup():
+    def original(obj, path):
+        for part in path.split("."):
+            if isinstance(obj, dict) and part in obj:
+                obj = obj[part]
+            else:
+                return None
+        return obj
+
+    data = {"a": {"b": {"c": "v"}, "x": 1}}
+    for path in ("a.b.c", "a.x", "a.b", "a.nope", "nope"):
+        got = compile_path(path).get(data)
+        assert (None if got is MISSING else got) == original(data, path)
+
+
+def test_format_value_caps_output():
+    assert format_value(["a", {"k": 1}, 2], 100) == 'a\n{"k":1}\n2'
+    assert len(format_value("x" * 50, 10)) == 10
+
+
+def test_dump_capped_is_the_same_with_and_without_size_hint():
+    obj = {"k": ["中文", 1.5, None, {"n": True}], "s": "x" * 300}
+    for limit in (10, 100, 10_000):
+        for indent in (None, 2):
+            streamed = dump_capped(obj, limit, indent=indent)
+            assert dump_capped(obj, limit, indent=indent, size_hint=400) == streamed
+            assert dump_capped(obj, limit, indent=indent, size_hint=10**9) == streamed
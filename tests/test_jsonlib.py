@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from core import jsonlib
+from core.request import HttpResponse
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(jsonlib, "_orjson", None)
+    elif jsonlib._orjson is None:
+        pytest.skip("orjson not installed")
+    return request.param
+
+
+def test_dumps_is_the_same_on_both_backends(backend):
+    obj = {"a": 1, "b": ["中文", None, 1.5], "c": {}}
+    assert jsonlib.dumps(obj) == '{"a":1,"b":["中文",null,1.5],"c":{}}'
+    assert jsonlib.dumps(obj, indent=True) == json.dumps(obj, ensure_ascii=False, indent=2)
+    assert jsonlib.loads(jsonlib.dumps(obj)) == obj
+
+
+def test_stdlib_dumps_rejects_nan(monkeypatch):
+    monkeypatch.setattr(jsonlib, "_orjson", None)
+    with pytest.raises(ValueError):
+        jsonlib.dumps({"x": float("nan")})
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        (b"123", 123),
+        (b' "ok"', "ok"),
+        (b"true", True),
+        (b"-1.5", -1.5),
+        (b"\xef\xbb\xbf{\"a\": 1}", {"a": 1}),
+        (b"[1]", [1]),
+        (b"<html>", None),
+        (b"hello", None),
+        (b"123 apples", None),
+    ],
+)
+def test_text_typed_bodies_decode_like_response_json(backend, content, expected):
+    assert HttpResponse(200, content, content_type="text/plain").data == expected
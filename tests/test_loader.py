@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+
+from core import loader
+
+CONFIG = {"timeout_seconds": 10}
+
+
+def _api(api_id, **extra):
+    return {"id": api_id, "command": api_id + "-cmd", "url": "http://x/" + api_id, **extra}
+
+
+def _entries(registry):
+    return {e.api_id: e for e in registry.enabled}
+
+
+def test_unchanged_apis_are_reused_with_the_same_config():
+    old = loader.ApiRegistry([_api("a"), _api("b")], CONFIG)
+    new = loader.ApiRegistry([_api("a"), _api("b", method="POST")], dict(CONFIG), old)
+    assert _entries(new)["a"] is _entries(old)["a"]
+    assert _entries(new)["b"] is not _entries(old)["b"]
+    assert _entries(new)["b"].method == "POST"
+    assert new.version > old.version
+
+
+def test_config_change_recompiles_everything():
+    old = loader.ApiRegistry([_api("a")], CONFIG)
+    new = loader.ApiRegistry([_api("a")], {"timeout_seconds": 3}, old)
+    assert _entries(new)["a"] is not _entries(old)["a"]
+
+
+def test_lookups_take_the_first_enabled_api_in_file_order():
+    apis = [
+        _api("a", enabled=False),
+        _api("a", command="second"),
+        {"id": "c", "command": "second", "url": "http://x/c"},
+    ]
+    registry = loader.ApiRegistry(apis, CONFIG)
+    assert registry.find("a").api is apis[1]
+    assert registry.find("second").api is apis[1]
+    assert registry.find("a-cmd") is None
+    assert registry.find("c").api is apis[2]
+    # find_by_id sees disabled APIs too
+    assert registry.find_by_id("a") is apis[0]
+
+
+def test_load_registry_is_cached_until_refresh(write_data):
+    data_dir = write_data(apis=[_api("a"), _api("b")])
+    loader.refresh(data_dir, loader.DATA_FILES.values())
+    first = loader.load_registry(data_dir)
+    assert loader.load_registry(data_dir) is first
+
+    (data_dir / "apis.json").write_text(json.dumps({"apis": [_api("a"), _api("c")]}), encoding="utf-8")
+    assert loader.load_registry(data_dir) is first
+    assert loader.refresh(data_dir, ["apis"]) == {"apis"}
+    second = loader.load_registry(data_dir)
+    assert second is not first
+    assert sorted(_entries(second)) == ["a", "c"]
+    assert _entries(second)["a"] is _entries(first)["a"]
+
+
+def test_refresh_with_new_config_recompiles(write_data):
+    data_dir = write_data(apis=[_api("a")])
+    loader.refresh(data_dir, loader.DATA_FILES.values())
+    first = loader.load_registry(data_dir)
+    (data_dir / "config.json").write_text(json.dumps({"timeout_seconds": 3}), encoding="utf-8")
+    loader.refresh(data_dir, ["config"])
+    second = loader.load_registry(data_dir)
+    assert _entries(second)["a"] is not _entries(first)["a"]
+    assert _entries(second)["a"].client_opts["timeout_seconds"] == 3
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+import core
+from core import metrics
+
+
+@pytest.fixture(autouse=True)
+def _clean():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def _call(data_dir, raw_args, context=None):
+    async def go():
+        try:
+            return await core.run(data_dir, raw_args, context or core.CallContext("u1"))
+        finally:
+            await core.close_clients()
+
+    return asyncio.run(go())
+
+
+def test_histogram_buckets_are_upper_inclusive_and_cumulative():
+    h = metrics.Histogram((1.0, 10.0))
+    for v in (0.5, 1.0, 5.0, 10.0, 11.0):
+        h.observe(v)
+    assert h.counts == [2, 2, 1]
+    assert h.cumulative() == [(1.0, 2), (10.0, 4), (float("inf"), 5)]
+    assert h.to_dict() == {"count": 5, "sum": 27.5, "buckets": [[1.0, 2], [10.0, 4], ["+Inf", 5]]}
+
+
+def test_record_call_splits_outcomes():
+    metrics.record_call("a", True, 0.01, cache_hit=True)
+    metrics.record_call("a", False, 0.02, "rate_limit")
+    metrics.record_call("a", False, 0.03, "timeout")
+    metrics.record_call("a", False, 0.04)
+    metrics.record_retry("a")
+    metrics.record_response_size("a", 300)
+    a = metrics.stats()["a"]
+    assert (a["calls"], a["successes"], a["rate_limited"], a["retries"], a["cache_hits"]) == (4, 1, 1, 1, 1)
+    assert a["errors"] == {"timeout": 1, "error": 1}
+    assert a["latency_seconds"]["count"] == 4
+    assert a["response_size_bytes"]["buckets"][:2] == [[256, 0], [1024, 1]]
+
+
+def test_prometheus_text_escapes_labels():
+    metrics.record_call('we"ird\\', False, 0.2, "http_502")
+    text = metrics.prometheus_text()
+    assert 'apidog_calls_total{api="we\\"ird\\\\"} 1' in text
+    assert 'apidog_errors_total{api="we\\"ird\\\\",type="http_502"} 1' in text
+    assert 'apidog_call_duration_seconds_bucket{api="we\\"ird\\\\",le="0.25"} 1' in text
+    assert 'apidog_call_duration_seconds_bucket{api="we\\"ird\\\\",le="+Inf"} 1' in text
+    assert text.endswith("\n")
+
+
+def test_run_records_configured_apis_only(upstream, write_data):
+    upstream.responses = [(200, b'{"ok": true}'), (500, b'{"err": 1}')]
+    data_dir = write_data(
+        apis=[{"id": "t", "command": "测试", "url": upstream.url + "/t", "retry": False}]
+    )
+    assert _call(data_dir, "测试").success
+    assert not _call(data_dir, "t").success
+    _call(data_dir, "nope")
+    stats = metrics.stats()
+    assert list(stats) == ["t"]
+    t = stats["t"]
+    assert (t["calls"], t["successes"], t["errors"]) == (2, 1, {"http_500": 1})
+    assert t["response_size_bytes"]["count"] == 2
+    assert t["response_size_bytes"]["sum"] == len(b'{"ok": true}') + len(b'{"err": 1}')
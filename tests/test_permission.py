@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+
+from core import loader, permission
+from core.types import CallContext
+
+GROUPS = {
+    "user_groups": {"admins": ["1", 2], "vip": ["3"]},
+    "group_groups": {"main": ["100"]},
+}
+
+
+def _check(api, user="1", group=None):
+    return permission.check_permission(api, CallContext(user, group), GROUPS)
+
+
+def test_list_of_groups():
+    api = {"allowed_user_groups": ["admins", "vip"]}
+    assert _check(api, "1")[0]
+    assert _check(api, "2")[0]
+    assert _check(api, "3")[0]
+    assert _check(api, "4") == (False, "你不在该 API 的允许用户组中。")
+
+
+@pytest.mark.parametrize("raw", [None, [], "", {}])
+def test_unset_or_empty_is_unrestricted(raw):
+    assert _check({"allowed_user_groups": raw}, "4")[0]
+
+
+def test_string_is_one_group_name():
+    api = {"allowed_user_groups": "admins"}
+    assert _check(api, "1")[0]
+    assert not _check(api, "3")[0]
+
+
+@pytest.mark.parametrize("raw", [{"admins": True}, 5, True])
+def test_other_types_deny(raw):
+    assert not _check({"allowed_user_groups": raw}, "1")[0]
+    ok, msg = _check({"allowed_group_groups": raw}, "1", "100")
+    assert not ok
+    assert msg == "当前群不在该 API 的允许群组中。"
+
+
+def test_group_restriction():
+    api = {"allowed_group_groups": ["main"]}
+    assert _check(api, "9", "100")[0]
+    assert _check(api, "9", None) == (False, "该接口仅限群聊使用。")
+    assert not _check(api, "9", "101")[0]
+
+
+def test_group_index_reverse_maps():
+    index = permission.GroupIndex(
+        {
+            "user_groups": {"admins": ["1", 2], "vip": [2, "3"], "bad": "1", 7: ["4"]},
+            "group_groups": {"main": [100], "side": ["100", "200"]},
+        }
+    )
+    assert index.user_groups == {"admins": {"1", "2"}, "vip": {"2", "3"}, "7": {"4"}}
+    assert index.groups_of_user == {"1": {"admins"}, "2": {"admins", "vip"}, "3": {"vip"}, "4": {"7"}}
+    assert index.groups_of_group == {"100": {"main", "side"}, "200": {"side"}}
+    assert isinstance(index.groups_of_user["2"], frozenset)
+
+
+@pytest.mark.parametrize("raw", [None, {}, {"user_groups": ["admins"], "group_groups": "main"}])
+def test_group_index_tolerates_missing_or_malformed_sections(raw):
+    index = permission.GroupIndex(raw)
+    assert index.groups_of_user == {} and index.groups_of_group == {}
+
+
+def test_group_index_matches_raw_dict_check():
+    index = permission.GroupIndex(GROUPS)
+    api = {"allowed_user_groups": ["vip"], "allowed_group_groups": ["main"]}
+    for ctx in (CallContext("3", "100"), CallContext("1", "100"), CallContext("3", None), CallContext("3", "9")):
+        assert permission.check_permission(api, ctx, index) == permission.check_permission(api, ctx, GROUPS)
+
+
+def _registry():
+    return loader.ApiRegistry(
+        [
+            {"id": "open", "url": "http://x"},
+            {"id": "vip", "url": "http://x", "allowed_user_groups": ["vip"]},
+            {"id": "main", "url": "http://x", "allowed_group_groups": ["main"]},
+        ],
+        {},
+    )
+
+
+def _ids(entries):
+    return [e.api_id for e in entries]
+
+
+def test_allowed_entries_filters_in_file_order_and_caches():
+    registry, index = _registry(), permission.GroupIndex(GROUPS)
+    first = permission.allowed_entries(registry, index, CallContext("3", "100"))
+    assert _ids(first) == ["open", "vip", "main"]
+    assert permission.allowed_entries(registry, index, CallContext("3", "100")) is first
+    assert _ids(permission.allowed_entries(registry, index, CallContext("1", None))) == ["open"]
+
+
+def test_allowed_entries_follow_a_reload():
+    registry, index = _registry(), permission.GroupIndex(GROUPS)
+    ctx = CallContext("1", None)
+    assert _ids(permission.allowed_entries(registry, index, ctx)) == ["open"]
+    index = permission.GroupIndex({"user_groups": {"vip": ["1"]}})
+    assert _ids(permission.allowed_entries(registry, index, ctx)) == ["open", "vip"]
+    registry = loader.ApiRegistry([{"id": "new", "url": "http://x"}], {}, registry)
+    assert _ids(permission.allowed_entries(registry, index, ctx)) == ["new"]
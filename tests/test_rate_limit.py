@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from core import rate_limit
+from core.rate_limit import RateLimiter
+
+
+class _ListWindow:
+    """The original list-based sliding window: keep calls newer than now - window, allow while under max."""
+
+    def __init__(self, max_count, window_seconds):
+        self.max_count = max_count
+        self.window = window_seconds
+        self.rec = []
+
+    def check_and_record(self, now):
+        self.rec = [t for t in self.rec if t > now - self.window]
+        if len(self.rec) >= self.max_count:
+            return False
+        self.rec.append(now)
+        return True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.mark.parametrize("max_count, window", [(1, 1), (3, 10), (5, 2), (0, 5)])
+def test_ring_window_matches_list_window(clock, max_count, window):
+    rng = random.Random(max_count * 100 + window)
+    limiter = RateLimiter()
+    reference = _ListWindow(max_count, window)
+    for _ in range(2000):
+        # steps include exact window boundaries
+        clock[0] += rng.choice([0.0, 0.25, 0.5, 1.0, window, window / 3])
+        ok, _ = limiter.acquire([("k", (max_count, window), "msg")])
+        assert ok == reference.check_and_record(clock[0])
+
+
+def test_call_leaving_the_window_exactly_frees_its_slot(clock):
+    limiter = RateLimiter()
+    checks = [("k", (2, 10), "msg")]
+    assert limiter.acquire(checks)[0]
+    clock[0] += 5
+    assert limiter.acquire(checks)[0]
+    assert limiter.acquire(checks) == (False, "msg")
+    clock[0] += 5  # the first call is now exactly window seconds old
+    assert limiter.acquire(checks)[0]
+
+
+def test_user_rejection_still_uses_a_global_slot(clock):
+    limiter = RateLimiter()
+    glob = (("global", "a"), (10, 60), "global")
+    user = (("user", "u", "a"), (1, 60), "user")
+    assert limiter.acquire([glob, user]) == (True, "")
+    for _ in range(5):
+        assert limiter.acquire([glob, user]) == (False, "user")
+    # as with the original separate checks, the 5 calls rejected per user were recorded globally
+    assert all(limiter.acquire([glob])[0] for _ in range(4))
+    assert limiter.acquire([glob]) == (False, "global")
+
+
+def test_global_then_user_matches_the_original_checks(clock):
+    rng = random.Random(7)
+    limiter = RateLimiter()
+    ref_global, ref_users = _ListWindow(6, 10), {u: _ListWindow(2, 10) for u in "ab"}
+    for _ in range(2000):
+        clock[0] += rng.choice([0.0, 0.5, 1.0, 5.0])
+        user = rng.choice("ab")
+        got = limiter.acquire([("g", (6, 10), "global"), ((user,), (2, 10), "user")])
+        if not ref_global.check_and_record(clock[0]):
+            expected = (False, "global")
+        elif not ref_users[user].check_and_record(clock[0]):
+            expected = (False, "user")
+        else:
+            expected = (True, "")
+        assert got == expected
+
+
+def test_limit_change_keeps_recent_calls(clock):
+    limiter = RateLimiter()
+    for _ in range(3):
+        assert limiter.acquire([("k", (5, 60), "m")])[0]
+    assert not limiter.acquire([("k", (2, 60), "m")])[0]
+    assert limiter.acquire([("k", (4, 60), "m")])[0]
+
+
+def test_idle_keys_are_swept_and_key_count_is_capped(clock):
+    limiter = RateLimiter(max_keys=3, sweep_interval=5)
+    for i in range(3):
+        limiter.acquire([(i, (1, 1), "m")])
+    clock[0] += 10
+    limiter.acquire([("fresh", (1, 1), "m")])
+    assert len(limiter) == 1
+    for i in range(10):
+        limiter.acquire([(("burst", i), (1, 60), "m")])
+    assert len(limiter) <= 4
+
+
+def test_module_helpers_use_separate_global_and_user_windows():
+    key = "rl_helpers"
+    assert rate_limit.check_and_record((1, 60), "u1", key)[0]
+    assert rate_limit.check_and_record((1, 60), "u1", key) == (False, "调用过于频繁，请稍后再试。")
+    assert rate_limit.check_and_record((1, 60), "u2", key)[0]
+    assert rate_limit.check_and_record_global((1, 60), key)[0]
+    assert rate_limit.check_and_record_global((1, 60), key) == (False, "该接口调用过于频繁，请稍后再试。")
+    assert rate_limit.parse_rate_limit({"rate_limit": {"max": "3", "window_seconds": 60}}) == (3, 60)
+    assert rate_limit.parse_rate_limit({"rate_limit": {"max": 3}}) is None
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+
+from core.request import media_suffix
+
+
+@pytest.mark.parametrize(
+    "content_type, result_type, suffix",
+    [
+        ("image/png", "image", ".png"),
+        ("image/gif", "image", ".gif"),
+        ("image/jpeg", "image", ".jpg"),
+        ("video/mp4", "video", ".mp4"),
+        ("audio/mpeg", "audio", ".wav"),
+        # no content type: the result type decides, so spooled and in-memory bodies agree
+        (None, "video", ".mp4"),
+        ("", "audio", ".wav"),
+        ("application/octet-stream", "image", ".jpg"),
+    ],
+)
+def test_media_suffix(content_type, result_type, suffix):
+    assert media_suffix(content_type, result_type) == suffix
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+
+from core.request import HttpResponse
+from core.response import MESSAGE_LIMIT, parse_response
+
+
+def _json(data) -> HttpResponse:
+    return HttpResponse(200, json.dumps(data, ensure_ascii=False).encode(), content_type="application/json")
+
+
+def test_response_path_miss_shows_the_object_as_before():
+    data = {"code": 1, "msg": "无结果"}
+    result = parse_response({"response_path": "data.text"}, _json(data))
+    assert result.success
+    assert result.message == str(data)
+
+
+def test_without_response_path_the_body_is_indented_json():
+    data = {"code": 0, "list": [1, 2]}
+    assert parse_response({}, _json(data)).message == json.dumps(data, ensure_ascii=False, indent=2)
+    big = {"text": "字" * (MESSAGE_LIMIT * 10)}
+    message = parse_response({}, _json(big)).message
+    assert message == json.dumps(big, ensure_ascii=False, indent=2)[:MESSAGE_LIMIT]
+
+
+def test_response_path_hit():
+    data = {"data": {"items": [{"t": "a"}, {"t": "b"}]}}
+    assert parse_response({"response_path": "data.items[*].t"}, _json(data)).message == "a\nb"
+    assert parse_response({"response_path": "data.items[0]"}, _json(data)).message == '{"t":"a"}'
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+import time
+from email.utils import formatdate
+
+import core
+from core import loader, retry
+from core.retry import RetryPolicy, build_policy, parse_retry_config
+
+
+def test_backoff_is_capped_exponential_without_jitter():
+    policy = RetryPolicy(max_attempts=5, backoff_seconds=1, multiplier=2, max_backoff_seconds=5, jitter=False)
+    assert [policy.delay(n) for n in range(5)] == [1, 2, 4, 5, 5]
+
+
+def test_full_jitter_stays_under_the_cap():
+    policy = RetryPolicy(max_attempts=3, backoff_seconds=1, multiplier=3, max_backoff_seconds=30)
+    assert all(0 <= policy.delay(2) <= 9 for _ in range(200))
+
+
+def test_retry_after_replaces_backoff_only_for_429_and_503():
+    policy = RetryPolicy(max_attempts=3, backoff_seconds=1, max_backoff_seconds=10, jitter=False)
+    assert policy.delay(0, 429, "3") == 3
+    assert policy.delay(0, 503, "3") == 3
+    assert policy.delay(0, 500, "3") == 1
+    assert policy.delay(0, 429, "60") is None  # longer than max_backoff_seconds: give up
+    assert policy.delay(0, 429, "soon") == 1
+    ignoring = RetryPolicy(max_attempts=3, backoff_seconds=1, jitter=False, respect_retry_after=False)
+    assert ignoring.delay(0, 429, "60") == 1
+
+
+def test_retry_after_http_date():
+    now = time.time()
+    assert 19 <= retry.parse_retry_after(formatdate(now + 20, usegmt=True), now) <= 20
+    assert retry.parse_retry_after(formatdate(now - 20, usegmt=True), now) == 0.0
+
+
+def test_deadline_budget():
+    assert RetryPolicy(deadline_seconds=None).deadline(100.0) is None
+    assert RetryPolicy(deadline_seconds=2.5).deadline(100.0) == 102.5
+    policy = RetryPolicy(max_attempts=3, backoff_seconds=1, jitter=False)
+    now = time.monotonic()
+    assert core._retry_wait(policy, 0, now + 5) == 1
+    # a wait that would end past the deadline rules out the retry
+    assert core._retry_wait(policy, 1, now + 1.5) is None
+    assert core._retry_wait(policy, 0, None) == 1
+
+
+def test_parse_retry_config_inherits_and_disables():
+    base = parse_retry_config({"max_attempts": 2, "backoff_seconds": 0.5, "deadline_seconds": 10})
+    override = parse_retry_config({"max_attempts": 4}, base)
+    assert override["backoff_seconds"] == 0.5
+    assert override["deadline_seconds"] == 10
+    assert parse_retry_config({"max_attempts": 0}) is None
+    assert parse_retry_config({"max_attempts": True}) is None
+    assert build_policy(None, frozenset({503})).max_attempts == 0
+
+
+def test_deadline_stops_retries_of_a_failing_upstream(upstream, write_data):
+    upstream.responses = [(503, b"{}")] * 10
+    data_dir = write_data(
+        apis=[{
+            "id": "t",
+            "command": "t",
+            "url": upstream.url + "/x",
+            "retry": {"max_attempts": 5, "backoff_seconds": 0.2, "jitter": False, "deadline_seconds": 0.5},
+        }],
+    )
+
+    async def go():
+        try:
+            started = time.monotonic()
+            result = await core.run(data_dir, "t", core.CallContext("u1"))
+            return result, time.monotonic() - started
+        finally:
+            await core.close_clients()
+
+    result, elapsed = asyncio.run(go())
+    assert not result.success
+    # attempt 0, wait 0.2s, attempt 1; the next 0.4s wait would cross the 0.5s deadline
+    assert len(upstream.requests) == 2
+    assert elapsed < 0.5
+
+
+def test_per_api_retry_needs_its_own_max_attempts():
+    global_config = {"retry": parse_retry_config({"max_attempts": 3, "backoff_seconds": 2})}
+    assert loader.merge_client_options(global_config, {"retry": {"backoff_seconds": 0.1}})["retry"] is None
+    assert loader.merge_client_options(global_config, {"retry": False})["retry"] is None
+    override = loader.merge_client_options(global_config, {"retry": {"max_attempts": 1}})["retry"]
+    assert override["max_attempts"] == 1
+    assert override["backoff_seconds"] == 2
+    assert loader.merge_client_options(global_config, {})["retry_policy"].max_attempts == 3
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import bench  # noqa: F401  registers the repository root as the package "apidog" (runtime imports ..core)
+from apidog.runtime.router import CommandRouter, Route
+
+
+def test_first_word_routes_and_args():
+    router = CommandRouter({"天气": "weather", "新闻": "news"})
+    assert router.match("天气 北京 明天") == Route("天气", "weather", "北京 明天")
+    assert router.match("  天气\t北京 ") == Route("天气", "weather", "北京")
+    assert router.match("天气") == Route("天气", "weather", "")
+    assert router.match("今天天气") is None
+    assert router.match("") is None
+    assert len(router) == 2
+
+
+def test_names_that_share_a_prefix_do_not_capture_each_other():
+    router = CommandRouter({"天气": "weather", "天气预报": "forecast"})
+    assert router.match("天气预报 北京") == Route("天气预报", "forecast", "北京")
+    assert router.match("天气 预报") == Route("天气", "weather", "预报")
+    assert router.match("天气预") is None
+
+
+def test_multi_word_commands_match_longest_first():
+    router = CommandRouter({"天气": "weather", "天气 预报": "forecast", "天气 预报 周": "weekly"})
+    assert router.match("天气 预报 周 北京") == Route("天气 预报 周", "weekly", "北京")
+    assert router.match("天气 预报 北京") == Route("天气 预报", "forecast", "北京")
+    assert router.match("天气  预报") == Route("天气 预报", "forecast", "")
+    assert router.match("天气 北京") == Route("天气", "weather", "北京")
+
+
+def test_aliases_route_to_the_same_api_and_update_replaces_all():
+    router = CommandRouter({"weather": "weather", "天气": "weather"})
+    assert router.match("weather x").api_key == router.match("天气 x").api_key == "weather"
+    router.update({"新闻": "news"})
+    assert router.match("天气 x") is None
+    assert router.match("新闻").api_key == "news"
+    router.update({})
+    assert router.match("新闻") is None
+    assert len(router) == 0
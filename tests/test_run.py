@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+
+import core
+
+
+def _call(data_dir, raw_args, context):
+    async def go():
+        try:
+            return await core.run(data_dir, raw_args, context)
+        finally:
+            await core.close_clients()
+
+    return asyncio.run(go())
+
+
+def test_debug_keyword_is_admin_only(write_data):
+    data_dir = write_data(apis=[{"id": "t", "command": "t", "url": "http://127.0.0.1:1/x"}])
+    result = _call(data_dir, "debug t", core.CallContext("u1"))
+    assert result.message == "仅管理员可使用 /api debug。"
+
+
+def test_api_named_debug_is_not_shadowed(upstream, write_data):
+    data_dir = write_data(apis=[{"id": "debug", "command": "调试", "url": upstream.url + "/d"}])
+    result = _call(data_dir, "debug", core.CallContext("u1"))
+    assert result.success
+    assert len(upstream.requests) == 1
+
+
+def test_unknown_api_suggests_close_names(write_data):
+    data_dir = write_data(apis=[{"id": "weather", "command": "天气", "url": "http://127.0.0.1:1/x"}])
+    result = _call(data_dir, "天汽", core.CallContext("u1"))
+    assert not result.success
+    assert "天气" in result.message
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+import core
+from core import singleflight
+
+
+def _gather(data_dir, raw_args, n):
+    async def go():
+        try:
+            return await asyncio.gather(*(core.run(data_dir, raw_args, core.CallContext(f"u{i}")) for i in range(n)))
+        finally:
+            await core.close_clients()
+
+    return asyncio.run(go())
+
+
+def _api(upstream, **extra):
+    return {
+        "id": "sf",
+        "command": "sf",
+        "url": upstream.url + "/q",
+        "params": {"city": "{{args.0}}"},
+        "coalesce": True,
+        **extra,
+    }
+
+
+def test_identical_concurrent_calls_share_one_upstream_request(upstream, write_data):
+    upstream.delay = 0.2
+    data_dir = write_data(apis=[_api(upstream)])
+    results = _gather(data_dir, "sf 北京", 10)
+    assert len(upstream.requests) == 1
+    assert all(r.success and r.message == results[0].message for r in results)
+    assert singleflight.inflight_count() == 0
+
+
+def test_different_arguments_are_not_coalesced(upstream, write_data):
+    upstream.delay = 0.1
+    data_dir = write_data(apis=[_api(upstream)])
+
+    async def go():
+        try:
+            return await asyncio.gather(
+                core.run(data_dir, "sf 北京", core.CallContext("u1")),
+                core.run(data_dir, "sf 上海", core.CallContext("u2")),
+            )
+        finally:
+            await core.close_clients()
+
+    asyncio.run(go())
+    assert sorted(r["city"] for r in upstream.requests) == ["上海", "北京"]
+
+
+def test_upstream_error_reaches_every_waiter(upstream, write_data):
+    upstream.delay = 0.2
+    upstream.responses = [(500, b'{"message": "boom"}')]
+    data_dir = write_data(apis=[_api(upstream, retry=False)])
+    results = _gather(data_dir, "sf 北京", 5)
+    assert len(upstream.requests) == 1
+    assert all(not r.success and "HTTP 500" in r.message for r in results)
+
+
+def test_exception_reaches_every_waiter_and_the_key_is_released():
+    calls = []
+
+    async def boom():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    async def go():
+        outcomes = await asyncio.gather(*(singleflight.do("k", boom) for _ in range(4)), return_exceptions=True)
+        # a later call with the same key starts a fresh flight
+        again = await asyncio.gather(singleflight.do("k", boom), return_exceptions=True)
+        return outcomes, again
+
+    outcomes, again = asyncio.run(go())
+    assert len(calls) == 2
+    assert all(isinstance(o, RuntimeError) for o in outcomes + again)
+    assert singleflight.inflight_count() == 0
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def go():
+        first = asyncio.ensure_future(singleflight.do("c", slow))
+        second = asyncio.ensure_future(singleflight.do("c", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(go()) == "done"
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import random
+
+from core import suggest
+from core.suggest import SuggestIndex
+
+
+class _Entry:
+    def __init__(self, api):
+        self.api = api
+
+
+def _index(apis):
+    return SuggestIndex([_Entry(a) for a in apis])
+
+
+def _numbered(n):
+    return [{"id": f"bench_{i}", "command": f"测试{i}", "name": f"基准接口 {i}"} for i in range(n)]
+
+
+def _exact(apis, query, limit=3):
+    """Dice score against every key, as the index computes it before any bigram is capped."""
+    q = suggest._grams(query)
+    scored = []
+    for n, api in enumerate(apis):
+        keys = {api[k] for k in ("id", "command", "name")}
+        score = max(2.0 * len(q & suggest._grams(k)) / (len(q) + len(suggest._grams(k))) for k in keys)
+        if score >= suggest.MIN_SCORE:
+            scored.append((-score, n))
+    return [apis[n]["command"] for _, n in sorted(scored)[:limit]]
+
+
+def test_ranking_prefers_the_closest_name():
+    index = _index(
+        [
+            {"id": "weather", "command": "天气"},
+            {"id": "weather_week", "command": "一周天气"},
+            {"id": "news", "command": "新闻", "name": "今日新闻"},
+        ]
+    )
+    assert index.suggest("天汽") == ["天气"]
+    assert index.suggest("weathr") == ["天气", "一周天气"]
+    assert index.suggest("今日新问") == ["新闻"]
+    assert index.suggest("weathr", limit=1) == ["天气"]
+    assert index.suggest("weathr", visible=lambda e: e.api["id"] != "weather") == ["一周天气"]
+    assert index.suggest("完全无关") == []
+    assert index.suggest("") == []
+
+
+def test_large_registry_matches_exact_scoring():
+    apis = _numbered(1000)
+    index = _index(apis)
+    rng = random.Random(3)
+    queries = ["测式50", "benhc_999", "基准 接口 77", "测2"] + [f"bnch_{rng.randrange(1000)}" for _ in range(20)]
+    for q in queries:
+        assert index.suggest(q) == _exact(apis, q), q
+
+
+def test_common_bigrams_alone_do_not_select_candidates():
+    weather = {"id": "weather", "command": "天气", "name": "天气"}
+    # a small registry scores every key sharing any bigram
+    assert _index([weather] + _numbered(10)).suggest("测试天气") == ["天气", "测试0", "测试1"]
+    # in a large one "^测" and "测试" are in every 测试N, so only 天气 shares a bigram rare enough to count
+    assert _index([weather] + _numbered(500)).suggest("测试天气") == ["天气"]
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import re
+
+import pytest
+
+from core.parse_args import compile_template, parse_args, resolve_placeholders
+
+_PLACEHOLDER = re.compile(r"\{\{(?:args\.(\d+)|named\.([^}|]+)(?:\|([^}]*))?|config\.([^}]+))\}\}")
+
+
+def _original(value, args, named, config):
+    """The per-call regex substitution compiled templates replace."""
+    if isinstance(value, str):
+
+        def repl(m):
+            if m.group(1) is not None:
+                idx = int(m.group(1))
+                return args[idx] if idx < len(args) else ""
+            if m.group(2) is not None:
+                default = m.group(3)
+                return named.get(m.group(2).strip(), default.strip() if default is not None else "")
+            v = config
+            for part in m.group(4).strip().split("."):
+                v = v.get(part, "") if isinstance(v, dict) else ""
+            return str(v) if v != "" else ""
+
+        return _PLACEHOLDER.sub(repl, value)
+    if isinstance(value, dict):
+        return {k: _original(v, args, named, config) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_original(v, args, named, config) for v in value]
+    return value
+
+
+TEMPLATES = [
+    "plain text",
+    "{{args.0}}",
+    "q={{args.0}}&page={{args.5}}",
+    "{{named.city|北京}}-{{named.days| 3 }}-{{named.none}}",
+    "{{ named.city }}",
+    "Bearer {{config.token}}",
+    "{{config.nested.key}}/{{config.nested.missing}}/{{config.token.x}}",
+    "{{config.zero}}{{config.empty}}{{config.flag}}",
+    "{{args.x}} {{unknown.1}} {{args.0",
+    "{{args.0}}{{args.0}}{{args.1}}",
+    {"q": "{{args.0}}", "static": {"lang": "zh", "n": 3, "list": ["{{named.city}}", None, True]}},
+    ["{{args.1}}", {"k": "{{config.token}}"}],
+    None,
+    42,
+]
+ARGS = ["北京", "hello world"]
+NAMED = {"city": "上海", "days": "7"}
+CONFIG = {"token": "secret", "nested": {"key": "v"}, "zero": 0, "empty": "", "flag": False}
+
+
+@pytest.mark.parametrize("template", TEMPLATES)
+@pytest.mark.parametrize("args, named", [(ARGS, NAMED), ([], {}), (["only"], {"city": ""})])
+def test_compiled_template_matches_original_substitution(template, args, named):
+    expected = _original(template, args, named, CONFIG)
+    assert compile_template(template).render(args, named, CONFIG) == expected
+    assert resolve_placeholders(template, args, named, CONFIG) == expected
+
+
+def test_containers_with_placeholders_are_fresh_per_render():
+    static = {"lang": "zh"}
+    template = compile_template({"a": {"b": "{{args.0}}"}, "s": static})
+    first = template.render(["1"], {}, {})
+    first["a"]["b"] = "changed"
+    assert template.render(["1"], {}, {})["a"] == {"b": "1"}
+    # static subtrees are shared with the source, never copied
+    assert first["s"] is static
+
+
+def test_parse_args_quoting_and_named():
+    args, named = parse_args('天气 北京 "hello world" city=上海 "q=a b"')
+    assert args == ["天气", "北京", "hello world"]
+    assert named == {"city": "上海", "q": "a b"}
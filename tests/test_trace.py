@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+
+from core import trace as trace_mod
+
+
+def test_nested_tracing_restores_the_outer_trace():
+    with trace_mod.tracing() as outer:
+        with trace_mod.tracing() as inner:
+            assert trace_mod.current() is inner
+        assert trace_mod.current() is outer
+        assert inner.end is not None
+    assert trace_mod.current() is None
+
+
+def test_send_phase_runs_outside_the_contextvar_scope():
+    """The _run_and_send shape: activate only around the call, time the yields on the trace directly."""
+    seen = []
+
+    async def run_and_send(tr):
+        try:
+            with tr.activate():
+                tr.api_key = "a"
+                await asyncio.sleep(0)
+            with tr.span("platform_send"):
+                for i in range(2):
+                    yield i
+        finally:
+            tr.finish()
+
+    async def consume():
+        tr = trace_mod.Trace()
+        tr.slow_seconds = 0.0
+        async for _ in run_and_send(tr):
+            seen.append(trace_mod.current())
+        return tr
+
+    trace_mod.clear_slow_calls()
+    tr = asyncio.run(consume())
+    assert seen == [None, None]
+    assert [s[0] for s in tr.spans] == ["platform_send"]
+    assert [c["trace_id"] for c in trace_mod.slow_calls()] == [tr.trace_id]
+    # finish is idempotent
+    tr.finish()
+    assert len(trace_mod.slow_calls()) == 1
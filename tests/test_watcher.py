@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+import os
+
+from core import loader
+from core.watcher import ConfigWatcher
+
+
+def _save(path, text, bump):
+    path.write_text(text, encoding="utf-8")
+    # distinct mtimes even on coarse-grained filesystems
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump * 1_000_000_000))
+
+
+def _keys(data_dir):
+    return sorted(e.api_id for e in loader.load_registry(data_dir).enabled)
+
+
+def test_broken_save_keeps_last_good_registry(write_data):
+    data_dir = write_data(apis=[{"id": "a", "url": "http://x"}, {"id": "b", "url": "http://x"}])
+    loader.refresh(data_dir, loader.DATA_FILES.values())
+    published = []
+    watcher = ConfigWatcher(data_dir, published.append)
+    apis = data_dir / "apis.json"
+
+    _save(apis, '{"apis": [{"id": "a", "url": "http://x"},]', 1)
+    assert watcher.poll() == set()
+    assert _keys(data_dir) == ["a", "b"]
+    assert published == []
+    # the broken version is not re-read every poll, but the next edit is picked up
+    assert watcher.poll() == set()
+    _save(apis, json.dumps({"apis": [{"id": "c", "url": "http://x"}]}), 2)
+    assert watcher.poll() == {"apis"}
+    assert _keys(data_dir) == ["c"]
+    assert published == [{"apis"}]
+
+
+def test_refresh_publishes_only_files_that_parse(write_data):
+    data_dir = write_data(apis=[{"id": "a", "url": "http://x"}], auth={"k": {"value": "v1"}})
+    loader.refresh(data_dir, loader.DATA_FILES.values())
+    (data_dir / "apis.json").write_text('{"apis": {"id": "a"}}', encoding="utf-8")
+    (data_dir / "auth.json").write_text('{"k": {"value": "v2"}}', encoding="utf-8")
+    assert loader.refresh(data_dir, ["apis", "auth"]) == {"auth"}
+    assert _keys(data_dir) == ["a"]
+    assert loader.load_auth(data_dir) == {"k": {"value": "v2"}}
+
+
+def test_deleted_file_is_still_detected(write_data):
+    data_dir = write_data(apis=[{"id": "a", "url": "http://x"}])
+    (data_dir / "groups.json").write_text("{}", encoding="utf-8")
+    loader.refresh(data_dir, loader.DATA_FILES.values())
+    watcher = ConfigWatcher(data_dir)
+    (data_dir / "groups.json").unlink()
+    assert watcher.poll() == {"groups"}